@@ -3,19 +3,28 @@ import sys
 import asyncio
 import subprocess
 import os
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+import json
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
+from fastapi.responses import StreamingResponse, JSONResponse, PlainTextResponse
 from dataclasses import dataclass
-from contextlib import asynccontextmanager
-import tldextract
+from contextlib import asynccontextmanager, contextmanager, nullcontext
+from concurrent.futures import ThreadPoolExecutor
 import logging
 from config import *
-from outils.dataset import Data
-from outils.filesmanager import FileManager, AWSFileManager
-from outils.webcrawling import Crawling
-from models.embeddings import Embeddings
-from models.faissmanager import Faiss
-from models.LLM import Fireworks_LLM
-from models.RAG import LangChainRAGAgent
+from outils.filesmanager import FOLDER_ARTIFACTS
+from outils.mmapstore import TenantStore
+from models.RAG import run_blocking
+from pipeline_workers import PipelineWorkerPool
+from pipeline_queue import PipelineJob, PipelineJobQueue
+from pipeline_state import PipelineStateBackend, MemoryPipelineState, create_pipeline_state
+from memory_monitor import MemorySampler, process_snapshot
+from models.bm25 import BM25Index
+from models.cache import SemanticCache, TranslationCache
+from models.conversation import ConversationStore
+from models.singleflight import SingleFlight
+from models.registry import ModelRegistry
+from models.metrics import REGISTRY as metrics
+from model_factory import Model, DataRequest, create_model, extract_aws_folder_path, get_aws_folder_path
 from load_settings import settings
 import psutil
 import time
@@ -32,92 +41,322 @@ _uvicorn_logger = logging.getLogger("uvicorn.error")
 logger = _uvicorn_logger if _uvicorn_logger.handlers else logging.getLogger(__name__)
 
 
-@dataclass
-class Model:
+# Built folder artifacts on local disk, memory-mapped by every API worker of this host
+tenant_store = TenantStore(settings.tenant_store_path) if settings.tenant_store_path else None
+
+# Shared by every folder model so that a single memory cap applies
+semantic_cache = SemanticCache(
+    threshold=settings.semantic_cache_threshold,
+    ttl_seconds=settings.semantic_cache_ttl_s,
+    max_entries=settings.semantic_cache_max_entries,
+    max_bytes=settings.semantic_cache_max_mb * 1024 ** 2,
+) if settings.semantic_cache_enabled else None
+
+conversation_store = ConversationStore(
+    max_turns=settings.conversation_max_turns,
+    token_budget=settings.conversation_token_budget,
+    max_sessions=settings.conversation_max_sessions,
+    idle_ttl_seconds=settings.conversation_idle_ttl_s,
+)
+
+# Shared by every model: translations do not depend on the folder
+translation_cache = TranslationCache(
+    max_entries=settings.translation_cache_max_entries,
+    ttl_seconds=settings.translation_cache_ttl_s,
+    path=settings.translation_cache_path,
+) if settings.translation_cache_enabled else None
+
+# Identical queries in flight on the same folder share one answer computation
+single_flight = SingleFlight() if settings.single_flight_enabled else None
+
+# Cold tenant loads (S3 downloads, index builds) run here rather than on the retrieval threads,
+# so that a few of them cannot hold up the searches of resident tenants
+model_load_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="model-load")
+
+def create_folder_model(folder: str = None) -> Model:
+    """Build a model wired to the caches, conversation store and single-flight group of this worker."""
+    return create_model(settings, folder, semantic_cache=semantic_cache, translation_cache=translation_cache,
+                        conversations=conversation_store, single_flight=single_flight)
+
+def load_lexical_index(model: Model, raw: bytes = None) -> BM25Index:
+    """Load the folder's BM25 index, building it from the chunks if it was never persisted.
+
+    `raw` is the already downloaded index, if any. Must be called after `create_faiss_index`,
+    which flattens `model.data.chunks`.
     """
-    Core application model that aggregates all major components.
+    try:
+        if raw is None:
+            raw = model.aws_file.download_file_from_aws("bm25", type_file="bin")
+        return BM25Index.from_bytes(raw)
+    except Exception as e:
+        logger.info(f"No persisted BM25 index ({e}); building it from chunks.")
+        return BM25Index().build(model.data.chunks or [])
 
-    Attributes:
-        data (Data): Central data container for documents, embeddings, and index structures.
-        crawling (Crawling): Module responsible for web scraping and content extraction.
-        embeddings (Embeddings): Handles embedding generation and related operations.
-        file (FileManager): Manages file storage, loading, and persistence.
-        faiss (Faiss): Handles FAISS index creation, querying, and updates.
-        llm (Fireworks_LLM): Interface to the Fireworks language model for text generation and QA tasks.
+def load_language_profile(model: Model, metadata: dict = None) -> dict:
+    """Load the folder's language profile from its metadata, computing it for folders ingested without one.
+
+    `metadata` is the already downloaded metadata.json, if any. Returns None, leaving
+    `documents_language` unset, when no profile can be computed.
     """
+    try:
+        if metadata is None:
+            metadata = model.aws_file.download_file_from_aws("metadata", type_file="json")
+        profile = (metadata or {}).get("language")
+    except Exception as e:
+        logger.info(f"No folder metadata ({e}).")
+        profile = None
+    if not profile:
+        logger.info("No persisted language profile; computing it from documents.")
+        try:
+            profile = model.llm.language_profile(model.data.documents or {})
+        except Exception as e:
+            # Without a documents language queries are simply not translated
+            logger.warning(f"Could not profile the documents' language ({e}).")
+            profile = None
+    model.data.documents_language = (profile or {}).get("dominant")
+    return profile
+
+def load_translation_cache():
+    """Read back persisted translations, then warm the cache from query logs when configured."""
+    if translation_cache is None:
+        return
+    if translation_cache.path:
+        os.makedirs(os.path.dirname(translation_cache.path) or ".", exist_ok=True)
+    try:
+        loaded = translation_cache.load()
+        if settings.translation_cache_warm_path:
+            loaded += translation_cache.load(settings.translation_cache_warm_path)
+        logger.info(f"Translation cache warmed with {loaded} entries.")
+    except OSError as e:
+        logger.warning(f"Could not load the translation cache: {e}")
 
-    data: Data = None
-    crawling: Crawling = None
-    embeddings: Embeddings = None
-    file: FileManager = None
-    faiss: Faiss = None
-    llm: Fireworks_LLM = None
-    rag_langchain: LangChainRAGAgent = None
-    aws_file: AWSFileManager = None
+class StartupReport:
+    """Status and per-phase timings of the background warm-up, served by the readiness probe."""
 
-@dataclass
-class DataRequest:
-    """Request payload for RAG/chat endpoints.
+    def __init__(self):
+        self.status = "starting"
+        self.error = None
+        self.phases_ms: dict[str, float] = {}
+        self._start = time.perf_counter()
+        self.total_ms = None
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases_ms[name] = round((time.perf_counter() - start) * 1000, 2)
 
-    Attributes:
-        query (str): The user question or query text.
-        url (str): Optional URL used to select a domain-specific model.
-        mode (str): Optional mode flag.
-        k (int): Number of retrieved documents to use (default: 5).
-    """
+    def finish(self, error: Exception = None):
+        self.status = "failed" if error else "ready"
+        self.error = str(error) if error else None
+        self.total_ms = round((time.perf_counter() - self._start) * 1000, 2)
 
-    query: str = None
-    url: str = None
-    mode: str = None
-    k: int = 5
-    max_depth: int = 200
-    data_folder: str = None
-
-def create_model(settings: Settings):
-    model = Model()
-
-    model.data = Data(fireworks_api_key=settings.fireworks_api_key)
-    model.crawling = Crawling()
-    model.embeddings = Embeddings(model.data, settings.model_embeddings_name)
-    model.file = FileManager(model.data)
-    model.faiss = Faiss(model.data, model.embeddings)
-    model.llm = Fireworks_LLM(model.data, settings.model_llm_name, settings.deployment_type)
-    model.rag_langchain = LangChainRAGAgent(model.data, model.faiss, model.llm)
-    model.aws_file = AWSFileManager(
-        data=model.data,
-        base_prefix=settings.base_prefix,
-        aws_access_key_id=settings.aws_access_key_id,
-        aws_secret_access_key=settings.aws_secret_access_key,
-        aws_region=settings.aws_region,
-        aws_s3_bucket_name=settings.aws_s3_bucket_name_backend
-    )
+    def to_dict(self) -> dict:
+        return {"status": self.status, "error": self.error, "total_ms": self.total_ms, "phases_ms": self.phases_ms}
 
-    return model
+def publish_folder_artifacts(model: Model, folder: str, language_profile: dict = None, build_id: str = None):
+    """Save a folder's built artifacts to the tenant store and switch `model` to the mapped copy.
+
+    Other workers then map the same files instead of building their own copy. Failing to write
+    the store only costs that sharing, so the in-memory artifacts are kept in that case, and the
+    previous version is invalidated since it no longer matches the stored artifacts.
+
+    Args:
+        model (Model): Model holding the built artifacts.
+        folder (str): Folder the artifacts belong to.
+        language_profile (dict, optional): Language profile stored with the artifacts. Defaults to None.
+        build_id (str, optional): Id of the S3 build the artifacts were downloaded from. Defaults to None.
+    """
+    if tenant_store is None:
+        return
+    try:
+        tenant_store.save(folder, model.data, language_profile, build_id)
+        tenant_store.load(folder, model.data)
+    except (OSError, AttributeError) as e:
+        logger.warning(f"Could not publish folder {folder} to the tenant store: {e}")
+        try:
+            tenant_store.invalidate(folder)
+        except OSError:
+            pass
 
-def create_default_model(settings: Settings):
-    model = create_model(settings)
+def rebuild_folder_artifacts(model: Model, folder: str):
+    """Reload a resident folder model from its newly stored artifacts and publish it to the tenant store.
+
+    Blocking: downloads the artifacts and builds the indexes, so it is run in a thread.
+    """
+    build_id = model.aws_file.artifacts_build_id() if tenant_store is not None else None
+    model.aws_file.load_folder_data()
+    model.faiss.create_faiss_index()
+    model.data.bm25 = load_lexical_index(model)
+    publish_folder_artifacts(model, folder, load_language_profile(model), build_id)
+
+def load_folder_artifacts(model: Model, folder: str, report: StartupReport = None):
+    """Load a folder's artifacts into `model` and build its indexes, timing each phase in `report`.
+
+    A folder already published to the tenant store from its current S3 build is memory-mapped from
+    it. Otherwise all artifacts, including the optional BM25 index and metadata, are downloaded
+    concurrently, and the built indexes are published for the other workers.
+    """
+    phase = report.phase if report is not None else (lambda name: nullcontext())
+    build_id = None
+    if tenant_store is not None:
+        try:
+            with phase("map_store"):
+                build_id = model.aws_file.artifacts_build_id()
+                manifest = tenant_store.load(folder, model.data, build_id)
+            if manifest is not None:
+                return
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning(f"Could not map folder {folder} from the tenant store, downloading it: {e}")
+    timings = {}
+    with phase("download"):
+        artifacts = model.aws_file.download_files_from_aws(
+            {**FOLDER_ARTIFACTS, "bm25": ("bm25", "bin"), "metadata": ("metadata", "json")},
+            optional=("bm25", "metadata"),
+            timings=timings,
+        )
+    if report is not None:
+        report.phases_ms.update({f"download_{name}": ms for name, ms in timings.items()})
+    for name in FOLDER_ARTIFACTS:
+        setattr(model.data, name, artifacts[name])
+    with phase("faiss_index"):
+        model.faiss.create_faiss_index()
+    with phase("bm25_index"):
+        model.data.bm25 = load_lexical_index(model, artifacts["bm25"])
+    with phase("language_profile"):
+        profile = load_language_profile(model, artifacts["metadata"] or {})
+    with phase("publish_store"):
+        publish_folder_artifacts(model, folder, profile, build_id)
+
+def create_default_model(settings: Settings, report: StartupReport = None):
+    model = create_folder_model(settings.default_folder)
     response = model.aws_file.create_folder_in_aws(settings.default_folder, recreate=False)
     if response:
-        model.data.documents = model.aws_file.download_file_from_aws("crawled_data", type_file="json")
-        model.data.embeddings = model.aws_file.download_file_from_aws("embeddings", type_file="npy")
-        model.data.chunks = model.aws_file.download_file_from_aws("crawled_chunks", type_file="json")
-        model.data.sources = model.aws_file.download_file_from_aws("crawled_sources", type_file="json")
-        model.faiss.create_faiss_index()
-        model.data.documents_language = "french"
-        model.data.query_language = "french"
+        load_folder_artifacts(model, settings.default_folder, report)
     else:
         raise ValueError("Could not initialize default model; check AWS S3 settings and default folder.")
     return model
 
+def load_folder_model(folder: str) -> Model:
+    """Build a folder's model from its stored artifacts on first request, e.g. after a restart or an eviction."""
+    start = time.perf_counter()
+    model = create_folder_model(folder)
+    if not model.aws_file.use_folder_in_aws(folder):
+        raise ValueError(f"No stored data for folder: {folder}")
+    load_folder_artifacts(model, folder)
+    logger.info(f"Loaded model of folder {folder} in {time.perf_counter() - start:.2f}s.")
+    save_recent_folders(first=folder)
+    return model
+
+# Number of recently used folders remembered across restarts
+RECENT_FOLDERS_KEPT = 50
+
+def read_recent_folders() -> list[str]:
+    """Return the folders used before the last shutdown, most recent first."""
+    path = settings.recent_folders_path
+    if not path or not os.path.exists(path):
+        return []
+    try:
+        with open(path, encoding="utf-8") as f:
+            folders = json.load(f)
+        return [folder for folder in folders if isinstance(folder, str)]
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not read recent folders: {e}")
+        return []
+
+def save_recent_folders(first: str = None):
+    """Persist the recently used folders so that the next start can prefetch them."""
+    path = settings.recent_folders_path
+    models = getattr(app.state, "models", None)
+    if not path or models is None:
+        return
+    folders = ([first] if first else []) + models.recent() + read_recent_folders()
+    folders = list(dict.fromkeys(folders))[:RECENT_FOLDERS_KEPT]
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(folders, f)
+        os.replace(f"{path}.tmp", path)
+    except OSError as e:
+        logger.warning(f"Could not save recent folders: {e}")
+
+def prefetch_recent_folders():
+    """Load the most recently used folders in the background, within the registry's memory budget."""
+    models = app.state.models
+    for folder in read_recent_folders()[:settings.model_prefetch_count]:
+        if models.nbytes >= models.max_bytes:
+            break
+        try:
+            models.get_or_load(folder)
+        except Exception as e:
+            logger.info(f"Could not prefetch folder {folder}: {e}")
+
+def model_nbytes(model: Model) -> int:
+    return model.data.nbytes() if model.data is not None else 0
+
+def warm_up(report: StartupReport):
+    """Load the default model and caches after the server has started accepting connections."""
+    try:
+        with report.phase("translation_cache"):
+            load_translation_cache()
+        with report.phase("default_model"):
+            app.state.model = create_default_model(settings, report)
+        report.finish()
+    except Exception as e:
+        logger.exception(f"Warm-up failed: {e}")
+        report.finish(e)
+    logger.info(f"Startup report: {report.to_dict()}")
+    prefetch_recent_folders()
+
+def require_default_model() -> Model:
+    """Return the default model, or answer 503 while it is still warming up."""
+    model = getattr(app.state, "model", None)
+    if model is None:
+        raise HTTPException(status_code=503, detail="The default model is warming up; retry shortly.",
+                            headers={"Retry-After": "5"})
+    return model
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Lifespan context manager to initialize and clean up ML models on app startup/shutdown."""
+    """Lifespan context manager to initialize and clean up ML models on app startup/shutdown.
 
-    app.state.model = create_default_model(settings)
-    app.state.models = {}
+    Startup returns immediately: the default model, the caches and the recently used tenants are
+    loaded in the background, and `/health/ready` reports when the default model can serve.
+    """
+
+    app.state.model = None
+    app.state.startup = StartupReport()
+    app.state.models = ModelRegistry(
+        loader=load_folder_model,
+        sizer=model_nbytes,
+        max_bytes=settings.model_registry_max_mb * 1024 ** 2,
+    )
+    app.state.pipeline_workers = None
+    if settings.pipeline_workers > 0:
+        app.state.pipeline_workers = PipelineWorkerPool(
+            size=settings.pipeline_workers,
+            max_steps_per_worker=settings.pipeline_worker_max_steps,
+        )
+        app.state.pipeline_workers.start()
+    for job in pipeline_jobs.restore():
+        pipeline_manager.start_run(job.client_id, force=True)
+    pipeline_jobs.start()
+    heartbeat = asyncio.create_task(heartbeat_pipeline_runs())
+    poll = asyncio.create_task(poll_pipeline_queue())
+    warm = asyncio.create_task(asyncio.to_thread(warm_up, app.state.startup))
     
     yield
     
+    warm.cancel()
+    heartbeat.cancel()
+    poll.cancel()
+    await memory_sampler.stop()
+    await pipeline_jobs.stop()
+    if app.state.pipeline_workers is not None:
+        await asyncio.to_thread(app.state.pipeline_workers.stop)
+    save_recent_folders()
     model = None
 
 
@@ -149,44 +388,6 @@ else:
     logger.info("CORS middleware not added for production environment.")
 
 
-def extract_domain(url: str) -> str:
-    """Extract the domain from a given URL.
-
-    Args:
-        url (str): The input URL.
-
-    Returns:
-        str: The extracted domain.
-    """
-    ext = tldextract.extract(url)
-    return f"{ext.domain}_{ext.suffix}"
-
-def extract_aws_folder_path(url: str) -> str:
-    """Extract the AWS folder path from a given URL.
-
-    Args:
-        url (str): The input URL.
-
-    Returns:
-        str: The extracted AWS folder path.
-    """
-    
-    name = re.sub(r'[^A-Za-z0-9]+', '_', url)
-    name = name.replace("_", "")
-
-    if not name:
-        raise ValueError("Could not extract domain from URL.")
-    
-    return name.lower()
-
-def get_aws_folder_path(data: dict | DataRequest, url: str) -> str:
-    if (isinstance(data, DataRequest) and (data.data_folder == settings.default_folder)) or \
-       (isinstance(data, dict) and (data.get("data_folder", None) == settings.default_folder)):
-        aws_folder_path = settings.default_folder
-    else:
-        aws_folder_path = extract_aws_folder_path(url)
-    return aws_folder_path
-
 def get_clearml_step_command(step: str, url: str, folder: str, extra_args: list = None):
     current_dir = os.path.dirname(os.path.abspath(__file__))
     script_path = os.path.join(current_dir, "clearml_pipeline.py")
@@ -198,27 +399,30 @@ def get_clearml_step_command(step: str, url: str, folder: str, extra_args: list
 
 # --- Pipeline Manager for connection resilience ---
 class PipelineManager:
-    def __init__(self):
+    def __init__(self, backend: PipelineStateBackend = None):
+        """WebSocket connections of this worker, over run state and progress history kept in `backend`.
+
+        With a shared backend, a client reconnecting to another worker is replayed the progress of
+        its run and keeps receiving it, and a second worker does not start a duplicate run.
+        """
+        self.backend = backend or MemoryPipelineState()
         self.active_connections: dict[str, WebSocket] = {}
-        self.state: dict[str, dict] = {}
-        self.history: dict[str, list[dict]] = {}
-        self.in_progress: dict[str, bool] = {}
-        self.last_activity: dict[str, float] = {}
+        # Sequence number of the last message delivered to each local connection
+        self.cursors: dict[str, int] = {}
 
     async def connect(self, websocket: WebSocket, client_id: str):
         # Cleanup old/stale clients before registering a new/returning one
         await self.cleanup_expired()
         # Endpoint must call websocket.accept() before
         self.active_connections[client_id] = websocket
-        self.last_activity[client_id] = time.time()
-        # Replay full history in order
-        hist = self.history.get(client_id, [])
-        for msg in hist:
-            await self._send_to(client_id, msg)
+        # Replay the history of a run in progress; a finished run's history is not replayed
+        self.cursors[client_id] = 0 if self.is_running(client_id) else self.backend.last_seq(client_id)
+        await self.flush(client_id)
 
     def disconnect(self, client_id: str):
         if client_id in self.active_connections:
             del self.active_connections[client_id]
+        self.cursors.pop(client_id, None)
 
     async def _send_to(self, client_id: str, data: dict):
         ws = self.active_connections.get(client_id)
@@ -233,56 +437,77 @@ class PipelineManager:
                     pass
                 self.disconnect(client_id)
 
+    async def flush(self, client_id: str):
+        """Send the local connection of a client the messages it has not received yet, from any worker."""
+        if client_id not in self.active_connections:
+            return
+        for seq, msg in self.backend.history(client_id, after=self.cursors.get(client_id, 0)):
+            self.cursors[client_id] = seq
+            await self._send_to(client_id, msg)
+            if client_id not in self.active_connections:
+                return
+
     async def send_update(self, client_id: str, data: dict):
-        # Persist last state and append to history
-        self.state[client_id] = data
-        self.history.setdefault(client_id, []).append(data)
-        self.last_activity[client_id] = time.time()
-        await self._send_to(client_id, data)
-
-    def start_run(self, client_id: str):
-        # Start a fresh history for a new pipeline run
-        self.history[client_id] = []
-        self.state.pop(client_id, None)
-        self.in_progress[client_id] = True
-        self.last_activity[client_id] = time.time()
+        # Persist in the shared history, then deliver to the client if it is connected to this worker
+        self.backend.append(client_id, data)
+        await self.flush(client_id)
+
+    def start_run(self, client_id: str, force: bool = False) -> bool:
+        """Start a fresh history for a new pipeline run; False when the client already has one running."""
+        return self.backend.try_start(client_id, force=force)
 
     def finish_run(self, client_id: str):
-        # Mark run finished and clear persisted history/state
-        self.in_progress[client_id] = False
-        self.history.pop(client_id, None)
-        self.state.pop(client_id, None)
-        self.last_activity[client_id] = time.time()
+        self.backend.finish(client_id)
 
     def is_running(self, client_id: str) -> bool:
-        return self.in_progress.get(client_id, False)
+        return self.backend.is_running(client_id)
+
+    def touch(self, client_id: str):
+        self.backend.touch(client_id)
 
     async def cleanup_expired(self, max_age_seconds: int = 24 * 60 * 60):
-        now = time.time()
-        # Consider all known client_ids across maps
-        all_ids = set(self.last_activity.keys()) | set(self.history.keys()) | set(self.state.keys()) | set(self.active_connections.keys()) | set(self.in_progress.keys())
-        for cid in list(all_ids):
-            last = self.last_activity.get(cid, 0)
-            if now - last > max_age_seconds:
-                ws = self.active_connections.pop(cid, None)
-                if ws:
-                    try:
-                        await ws.close()
-                    except Exception:
-                        pass
-                self.history.pop(cid, None)
-                self.state.pop(cid, None)
-                self.in_progress.pop(cid, None)
-                self.last_activity.pop(cid, None)
-
-pipeline_manager = PipelineManager()
-
-async def _process_and_send_line(line, sender, step_name: str, channel: str) -> bool:
+        for cid in self.backend.cleanup(max_age_seconds):
+            ws = self.active_connections.pop(cid, None)
+            self.cursors.pop(cid, None)
+            if ws:
+                try:
+                    await ws.close()
+                except Exception:
+                    pass
+
+pipeline_manager = PipelineManager(create_pipeline_state(
+    settings.pipeline_state_backend,
+    path=settings.pipeline_state_path,
+    url=settings.pipeline_state_url,
+    max_history=settings.pipeline_history_max,
+    stale_after_s=settings.pipeline_run_stale_s,
+))
+
+PIPELINE_STAGE_SECONDS = metrics.histogram(
+    "pipeline_stage_seconds", "Duration of pipeline stages by outcome.", ("folder", "stage", "status"),
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600),
+)
+CRAWLED_PAGES = metrics.counter("pipeline_crawled_pages_total", "Pages crawled by the pipeline.", ("folder",))
+CRAWL_PAGES_PER_SECOND = metrics.gauge(
+    "pipeline_crawl_pages_per_second", "Crawl throughput of the last crawling step.", ("folder",))
+EMBEDDING_BATCHES = metrics.counter(
+    "pipeline_embedding_batches_total", "Chunk batches embedded by the pipeline.", ("folder",))
+EMBEDDING_BATCHES_PER_SECOND = metrics.gauge(
+    "pipeline_embedding_batches_per_second", "Embedding throughput of the last embedding step.", ("folder",))
+
+# Steps reporting "PROGRESS: x% - ... done/total", and the counters of their throughput
+STEP_THROUGHPUT = {
+    "crawling": (CRAWLED_PAGES, CRAWL_PAGES_PER_SECOND),
+    "embedding": (EMBEDDING_BATCHES, EMBEDDING_BATCHES_PER_SECOND),
+}
+
+async def _process_and_send_line(line, sender, step_name: str, channel: str, progress: dict = None) -> bool:
     """Process a raw line from a stream and send a structured message via WebSocket.
 
     Handles both bytes and str input, extracts progress percentage if present,
     and sends an appropriate JSON payload. Returns False if a RuntimeError occurs
-    (e.g., WebSocket closed) so callers can break their read loop.
+    (e.g., WebSocket closed) so callers can break their read loop. With a `progress`
+    dict, the "done/total" count of progress lines is stored in `progress["done"]`.
     """
     try:
         if isinstance(line, bytes):
@@ -295,6 +520,9 @@ async def _process_and_send_line(line, sender, step_name: str, channel: str) ->
             match = re.search(r"PROGRESS:\s*(\d+)%", decoded_line)
             if match:
                 percentage = int(match.group(1))
+                count = re.search(r"(\d+)/\d+", decoded_line[match.end():])
+                if count and progress is not None:
+                    progress["done"] = int(count.group(1))
 
         if percentage is not None:
             msg = {"step": step_name, "status": "in_progress", "value": percentage}
@@ -305,7 +533,7 @@ async def _process_and_send_line(line, sender, step_name: str, channel: str) ->
     except RuntimeError:
         return False
 
-async def stream_subprocess_output(cmd_args, sender, step_name: str):
+async def stream_subprocess_output(cmd_args, sender, step_name: str, progress: dict = None):
     """Start a subprocess and stream its stdout/stderr to the WebSocket.
 
     Uses asyncio.create_subprocess_exec on non-Windows platforms.
@@ -324,7 +552,7 @@ async def stream_subprocess_output(cmd_args, sender, step_name: str):
             while True:
                 line = await stream.readline()
                 if line:
-                    should_continue = await _process_and_send_line(line, sender, step_name, channel)
+                    should_continue = await _process_and_send_line(line, sender, step_name, channel, progress)
                     if not should_continue:
                         break
                 else:
@@ -349,7 +577,7 @@ async def stream_subprocess_output(cmd_args, sender, step_name: str):
         while True:
             line = await asyncio.to_thread(fp.readline)
             if line:
-                should_continue = await _process_and_send_line(line, sender, step_name, channel)
+                should_continue = await _process_and_send_line(line, sender, step_name, channel, progress)
                 if not should_continue:
                     break
             else:
@@ -361,6 +589,38 @@ async def stream_subprocess_output(cmd_args, sender, step_name: str):
     )
     return await asyncio.to_thread(process.wait)
 
+async def run_pipeline_step(step: str, url: str, folder: str, sender, max_depth: int = None) -> int:
+    """Run a pipeline step on the worker pool, or as a subprocess when the pool is disabled or unavailable.
+
+    Either way the step's output is streamed to `sender` and its exit code is returned. The pages
+    crawled or batches embedded, as reported by its progress lines, feed the throughput metrics.
+    """
+    progress = {}
+    start = time.perf_counter()
+    returncode = await _run_pipeline_step(step, url, folder, sender, max_depth, progress)
+    throughput = STEP_THROUGHPUT.get(step)
+    if throughput is not None and progress.get("done"):
+        total, rate = throughput
+        total.inc(progress["done"], folder=folder)
+        rate.set(progress["done"] / max(time.perf_counter() - start, 1e-3), folder=folder)
+    return returncode
+
+async def _run_pipeline_step(step: str, url: str, folder: str, sender, max_depth: int, progress: dict) -> int:
+    pool = getattr(app.state, "pipeline_workers", None)
+    if pool is not None and pool.available:
+        kwargs = {"max_depth": max_depth} if max_depth is not None else {}
+        try:
+            return await pool.run(
+                (step, url, folder), kwargs,
+                on_line=lambda channel, line: _process_and_send_line(line, sender, step, channel, progress),
+            )
+        except RuntimeError as e:
+            logger.warning(f"{e}; running {step} as a subprocess.")
+
+    extra_args = ["--max_depth", str(max_depth)] if max_depth is not None else None
+    cmd_args = get_clearml_step_command(step, url, folder, extra_args)
+    return await stream_subprocess_output(cmd_args, sender, step, progress)
+
 async def websocket_initialization(sender, data: dict) -> bool:
     url = data.get("url", None)
 
@@ -369,13 +629,12 @@ async def websocket_initialization(sender, data: dict) -> bool:
         return False    
     await sender({"step": "initializing", "status": "start"})
 
-    aws_folder_path = get_aws_folder_path(data, url)
+    aws_folder_path = get_aws_folder_path(data, url, settings.default_folder)
 
-    cmd_args = get_clearml_step_command("initializing", url, aws_folder_path, None)
-    returncode = await stream_subprocess_output(cmd_args, sender, "initializing")
+    returncode = await run_pipeline_step("initializing", url, aws_folder_path, sender)
 
     if returncode == 0:
-        model = create_model(settings)
+        model = create_folder_model(aws_folder_path)
         model.aws_file.create_folder_in_aws(aws_folder_path, recreate=False)
         app.state.models[aws_folder_path] = model
         await sender({"step": "initializing", "status": "done"})
@@ -393,15 +652,15 @@ async def websocket_crawling(sender, data: dict) -> bool:
         return False
     await sender({"step": "crawling", "status": "start"})
     
-    aws_folder_path = get_aws_folder_path(data, url)
+    aws_folder_path = get_aws_folder_path(data, url, settings.default_folder)
 
-    cmd_args = get_clearml_step_command("crawling", url, aws_folder_path, ["--max_depth", str(max_depth)])
-    returncode = await stream_subprocess_output(cmd_args, sender, "crawling")
+    returncode = await run_pipeline_step("crawling", url, aws_folder_path, sender, max_depth=max_depth)
 
     if returncode == 0:
         model = app.state.models.get(aws_folder_path, None)
         if model:
             model.data.documents = model.aws_file.download_file_from_aws("crawled_data", type_file="json")
+            app.state.models.resize(aws_folder_path)
         await sender({"step": "crawling", "status": "done"})
         return True
     else:
@@ -415,17 +674,16 @@ async def websocket_embedding(sender, data: dict) -> bool:
         return False
     await sender({"step": "embedding", "status": "start"})
 
-    aws_folder_path = get_aws_folder_path(data, url)
+    aws_folder_path = get_aws_folder_path(data, url, settings.default_folder)
 
-    cmd_args = get_clearml_step_command("embedding", url, aws_folder_path, None)
-    returncode = await stream_subprocess_output(cmd_args, sender, "embedding")
+    returncode = await run_pipeline_step("embedding", url, aws_folder_path, sender)
 
     if returncode == 0:
         model = app.state.models.get(aws_folder_path, None)
         if model:
-            model.data.chunks = model.aws_file.download_file_from_aws("crawled_chunks", type_file="json")
-            model.data.sources = model.aws_file.download_file_from_aws("crawled_sources", type_file="json")
-            model.data.embeddings = model.aws_file.download_file_from_aws("embeddings", type_file="npy")
+            model.aws_file.load_folder_data(("chunks", "sources", "embeddings"))
+            load_language_profile(model)
+            app.state.models.resize(aws_folder_path)
         await sender({"step": "embedding", "status": "done"})
         return True
     else:
@@ -441,12 +699,16 @@ async def websocket_indexing(sender, data: dict) -> bool:
     await sender({"step": "indexing", "status": "start"})
 
     try:
-        aws_folder_path = get_aws_folder_path(data, url)
+        aws_folder_path = get_aws_folder_path(data, url, settings.default_folder)
         model = app.state.models.get(aws_folder_path, None)
         if model:
-            model.data.embeddings = model.aws_file.download_file_from_aws("embeddings", type_file="npy")
-            model.data.sources = model.aws_file.download_file_from_aws("crawled_sources", type_file="json")
-            model.faiss.create_faiss_index()
+            await asyncio.to_thread(rebuild_folder_artifacts, model, aws_folder_path)
+            app.state.models.resize(aws_folder_path)
+        elif tenant_store is not None:
+            # No resident copy to publish from: the next load builds the folder from the new artifacts
+            tenant_store.invalidate(aws_folder_path)
+        if semantic_cache is not None:
+            semantic_cache.invalidate(aws_folder_path)
         await sender({"step": "indexing", "status": "done"})
         return True
     except Exception as e:
@@ -458,6 +720,18 @@ async def websocket_indexing(sender, data: dict) -> bool:
 def root():
     return {"message": "API is running. Visit /docs for API documentation."}
 
+@app.get("/health/live")
+def health_live():
+    """Liveness probe: the process is up and serving HTTP."""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+def health_ready():
+    """Readiness probe: 200 once the default model is loaded, 503 (with the startup report) before."""
+    report = app.state.startup.to_dict()
+    status_code = 200 if app.state.model is not None else 503
+    return JSONResponse(status_code=status_code, content={**report, "ready": status_code == 200})
+
 @app.get("/admin/api/config")
 def admin_get_config():
     """Retrieve the current application configuration settings.
@@ -470,27 +744,97 @@ def admin_get_config():
     }
     return config
 
+@app.get("/admin/api/models/stats")
+def admin_models_stats():
+    """Report the memory use and hit/miss/eviction counters of the per-folder model registry."""
+    return app.state.models.stats()
+
+@app.get("/admin/api/pipeline/jobs")
+def admin_pipeline_jobs():
+    """Report the queued and running pipeline jobs."""
+    return pipeline_jobs.stats()
+
+@app.get("/admin/api/pipeline/workers")
+def admin_pipeline_workers():
+    """Report the pipeline worker pool: workers, busy workers, steps run and crashes."""
+    pool = app.state.pipeline_workers
+    return pool.stats() if pool is not None else {"workers": 0, "available": False}
+
+def cache_metrics() -> list[tuple]:
+    """Scrape-time hit/miss counters and sizes of the shared caches and of the model registry.
+
+    Semantic cache lookups are labeled by tenant folder; the other caches are not per tenant.
+    """
+    caches = {"semantic": semantic_cache, "translation": translation_cache,
+              "model_registry": getattr(app.state, "models", None)}
+    stats = {name: cache.stats() for name, cache in caches.items() if cache is not None}
+    lookups = []
+    for name, s in stats.items():
+        # The semantic cache holds answers per tenant: report its lookups per folder
+        by_folder = s["folders"].items() if "folders" in s else [(None, s)]
+        for folder, counts in by_folder:
+            labels = {"cache": name} if folder is None else {"cache": name, "folder": folder}
+            lookups += [({**labels, "result": result}, counts[key])
+                        for result, key in (("hit", "hits"), ("miss", "misses"))]
+    return [
+        ("cache_requests_total", "counter", "Cache lookups by cache and result, and by folder for the semantic cache.",
+         lookups),
+        ("cache_entries", "gauge", "Entries held by each cache.",
+         [({"cache": name}, s["entries"] if "entries" in s else s["models"]) for name, s in stats.items()]),
+    ]
+
+metrics.collector(cache_metrics)
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Serve this worker's metrics in the Prometheus text format.
+
+    Chat phase latencies, LLM tokens and semantic cache lookups are labeled by tenant folder, as are
+    pipeline stage durations and crawl and embedding throughput.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+def folder_memory(folder: str, model: Model, accounted: int = None) -> dict:
+    """Memory held by a folder: bytes per artifact, its semantic cache entries and conversation
+    histories, and what the registry accounts for it."""
+    breakdown = model.data.memory_breakdown() if model.data is not None else {}
+    cache = semantic_cache.folder_nbytes(folder) if semantic_cache is not None else 0
+    conversations = conversation_store.folder_nbytes(folder)
+    return {
+        "folder": folder,
+        **breakdown,
+        "cache": cache,
+        "conversations": conversations,
+        "total": sum(size for name, size in breakdown.items() if name != "mapped") + cache + conversations,
+        "accounted": accounted,
+    }
+
+def sample_memory() -> dict:
+    """Snapshot broadcast by the memory monitor: the process, the machine and each resident tenant."""
+    snapshot = process_snapshot(monitored_process)
+    folders = []
+    default_model = getattr(app.state, "model", None)
+    if default_model is not None:
+        # Held outside the registry, so not counted against its budget
+        folders.append(folder_memory(settings.default_folder, default_model))
+    registry = getattr(app.state, "models", None)
+    if registry is not None:
+        folders += [folder_memory(folder, model, size) for folder, model, size in registry.resident()]
+        stats = registry.stats()
+        snapshot["registry"] = {name: stats[name] for name in ("models", "bytes", "max_bytes", "evictions")}
+    snapshot["folders"] = folders
+    return snapshot
+
+monitored_process = psutil.Process()
+memory_sampler = MemorySampler(sample_memory)
+
 @app.websocket("/admin/ws/memory")
 async def memory_ws(websocket: WebSocket):
     await websocket.accept()
+    queue = memory_sampler.subscribe()
     try:
         while True:
-            process = psutil.Process()
-            mem_info = process.memory_info()
-            virtual_mem = psutil.virtual_memory()
-
-            data = {
-                "rss_GB": round(mem_info.rss / (1024 ** 3), 3),   # Physical memory of the process
-                "vms_GB": round(mem_info.vms / (1024 ** 3), 3),   # Virtual memory of the process
-                "cpu_percent": process.cpu_percent(interval=None), # CPU usage of the process (%)
-                "threads": process.num_threads(),                 # Number of threads
-                "total_RAM_GB": round(virtual_mem.total / (1024 ** 3), 2), # Total machine RAM
-                "used_RAM_GB": round(virtual_mem.used / (1024 ** 3), 2),   # Used machine RAM
-                "ram_percent": virtual_mem.percent                # Total RAM usage (%)
-            }
-
-            await websocket.send_json(data)
-            await asyncio.sleep(1)
+            await websocket.send_json(await queue.get())
     except WebSocketDisconnect:
         logger.info("Memory monitor WebSocket disconnected.")
     except Exception as e:
@@ -499,53 +843,88 @@ async def memory_ws(websocket: WebSocket):
             await websocket.close()
         except RuntimeError:
             pass
+    finally:
+        memory_sampler.unsubscribe(queue)
 
-@app.websocket("/api/pipeline")
-async def guest_websocket_pipeline(ws: WebSocket):
-    await ws.accept()
-    data = await ws.receive_json()
-    # Force guest mode: no explicit data_folder (use default/extracted)
-    data["data_folder"] = None
-    # connection management
-    client_id = data.get("client_id") or (data.get("url") or "guest")
-    await pipeline_manager.connect(ws, client_id)
+async def run_pipeline(sender, data: dict, folder: str = "") -> bool:
+    """Run the initializing, crawling, embedding and indexing steps in order, stopping at the first failure.
 
+    Each step's duration is recorded under `folder`.
+    """
+    for stage, step in (("initializing", websocket_initialization), ("crawling", websocket_crawling),
+                        ("embedding", websocket_embedding), ("indexing", websocket_indexing)):
+        start = time.perf_counter()
+        ok = await step(sender, data)
+        PIPELINE_STAGE_SECONDS.observe(time.perf_counter() - start, folder=folder, stage=stage,
+                                       status="done" if ok else "failed")
+        if not ok:
+            return False
+    return True
+
+async def run_pipeline_job(job: PipelineJob) -> bool:
+    """Run a queued pipeline job, streaming its progress to the job's client."""
     async def sender(msg: dict):
-        await pipeline_manager.send_update(client_id, msg)
-
-    # If a run is already in progress, just stream history/live updates
-    if not pipeline_manager.is_running(client_id):
-        pipeline_manager.start_run(client_id)
-
-        any_failed = False
-        ok_init = await websocket_initialization(sender, data)
-        if not ok_init:
-            any_failed = True
-        else:
-            ok_crawl = await websocket_crawling(sender, data)
-            if not ok_crawl:
-                any_failed = True
-            else:
-                ok_embed = await websocket_embedding(sender, data)
-                if not ok_embed:
-                    any_failed = True
-                else:
-                    ok_index = await websocket_indexing(sender, data)
-                    if not ok_index:
-                        any_failed = True
+        await pipeline_manager.send_update(job.client_id, msg)
 
-        if any_failed:
+    try:
+        ok = await run_pipeline(sender, job.data, job.folder)
+        if not ok:
             await sender({"step": "pipeline", "status": "failed", "error": "One or more steps failed"})
         else:
+            if job.admin and job.data.get("data_folder", None) == settings.default_folder:
+                app.state.model = await asyncio.to_thread(create_default_model, settings)
             await sender({"step": "pipeline", "status": "done"})
-        pipeline_manager.finish_run(client_id)
-    else:
-        # Wait until current run finishes to keep WS open for live updates
-        try:
-            while pipeline_manager.is_running(client_id):
-                await asyncio.sleep(0.5)
-        except WebSocketDisconnect:
-            pass
+        return ok
+    finally:
+        pipeline_manager.finish_run(job.client_id)
+
+async def notify_pipeline_job(job: PipelineJob, msg: dict):
+    await pipeline_manager.send_update(job.client_id, msg)
+
+pipeline_jobs = PipelineJobQueue(
+    runner=run_pipeline_job,
+    notify=notify_pipeline_job,
+    max_concurrent=settings.pipeline_max_concurrent,
+    max_per_folder=settings.pipeline_max_per_folder,
+    path=settings.pipeline_jobs_path,
+    # Runs of other workers on the same folder count against max_per_folder too
+    claim=lambda job: pipeline_manager.backend.claim_folder(job.folder, job.client_id, settings.pipeline_max_per_folder),
+    release=lambda job: pipeline_manager.backend.release_folder(job.folder, job.client_id),
+)
+
+async def heartbeat_pipeline_runs():
+    """Keep the runs queued or running on this worker from being seen as stale by the other workers."""
+    while True:
+        await asyncio.sleep(settings.pipeline_run_stale_s / 3)
+        for client_id in pipeline_jobs.client_ids():
+            pipeline_manager.touch(client_id)
+
+# Seconds between checks for folders released by the runs of other workers
+PIPELINE_QUEUE_POLL_S = 2
+
+async def poll_pipeline_queue():
+    """Start the queued jobs whose folder another worker's run held and has released."""
+    while True:
+        await asyncio.sleep(PIPELINE_QUEUE_POLL_S)
+        pipeline_jobs.poll()
+
+async def submit_and_follow_pipeline(ws: WebSocket, client_id: str, data: dict, admin: bool):
+    """Queue a pipeline run for the client, unless one is already queued or running, and keep the
+    WebSocket open until it ends so that it receives the queue position and progress updates."""
+    # start_run is atomic in the shared state, so only one worker queues the run
+    if pipeline_manager.start_run(client_id):
+        url = data.get("url", None)
+        folder = get_aws_folder_path(data, url, settings.default_folder) if url else client_id
+        pipeline_jobs.submit(client_id, folder, data, admin=admin)
+
+    try:
+        # Also relays the progress of a run executing on another worker
+        while pipeline_manager.is_running(client_id):
+            await asyncio.sleep(0.5)
+            await pipeline_manager.flush(client_id)
+        await pipeline_manager.flush(client_id)
+    except WebSocketDisconnect:
+        pass
 
     pipeline_manager.disconnect(client_id)
     try:
@@ -553,6 +932,17 @@ async def guest_websocket_pipeline(ws: WebSocket):
     except Exception:
         pass
 
+@app.websocket("/api/pipeline")
+async def guest_websocket_pipeline(ws: WebSocket):
+    await ws.accept()
+    data = await ws.receive_json()
+    # Force guest mode: no explicit data_folder (use default/extracted)
+    data["data_folder"] = None
+    # connection management
+    client_id = data.get("client_id") or (data.get("url") or "guest")
+    await pipeline_manager.connect(ws, client_id)
+    await submit_and_follow_pipeline(ws, client_id, data, admin=False)
+
 @app.websocket("/admin/api/pipeline")
 async def admin_websocket_pipeline(ws: WebSocket):
     await ws.accept()
@@ -561,49 +951,52 @@ async def admin_websocket_pipeline(ws: WebSocket):
     # Admin: respect provided data_folder, defaulting to settings.default_folder if missing
     client_id = data.get("client_id") or (data.get("url") or "admin")
     await pipeline_manager.connect(ws, client_id)
+    await submit_and_follow_pipeline(ws, client_id, data, admin=True)
 
-    async def sender(msg: dict):
-        await pipeline_manager.send_update(client_id, msg)
+def is_stale_mapping(model: Model, folder: str) -> bool:
+    """Whether `model` maps a tenant store version of `folder` that was replaced or invalidated since."""
+    if tenant_store is None or model is None or model.data is None or model.data.store_version is None:
+        return False
+    return tenant_store.version(folder) != model.data.store_version
 
-    if not pipeline_manager.is_running(client_id):
-        pipeline_manager.start_run(client_id)
+def resolve_chat_model(datarequest: DataRequest) -> tuple[Model, str]:
+    """Select the model serving a chat request and detect the query language.
 
-        any_failed = False
-        ok_init = await websocket_initialization(sender, data)
-        if not ok_init:
-            any_failed = True
-        else:
-            ok_crawl = await websocket_crawling(sender, data)
-            if not ok_crawl:
-                any_failed = True
-            else:
-                ok_embed = await websocket_embedding(sender, data)
-                if not ok_embed:
-                    any_failed = True
-                else:
-                    ok_index = await websocket_indexing(sender, data)
-                    if not ok_index:
-                        any_failed = True
+    Uses the global default model, or the domain-specific model extracted from `datarequest.url`,
+    reloaded from its stored artifacts when it is not resident. The language is returned rather than
+    stored on the model, which concurrent requests share.
 
-        if any_failed:
-            await sender({"step": "pipeline", "status": "failed", "error": "One or more steps failed"})
-        else:
-            if data.get("data_folder", None) == settings.default_folder:
-                app.state.model = create_default_model(settings)
-            await sender({"step": "pipeline", "status": "done"})
-        pipeline_manager.finish_run(client_id)
+    Returns:
+        tuple: (model, query_language), query_language being None for an empty query.
+    """
+
+    if not datarequest.url:
+        model = require_default_model()
     else:
+        datarequest.data_folder = None
+        aws_folder_path = get_aws_folder_path(datarequest, datarequest.url, settings.default_folder)
         try:
-            while pipeline_manager.is_running(client_id):
-                await asyncio.sleep(0.5)
-        except WebSocketDisconnect:
-            pass
-
-    pipeline_manager.disconnect(client_id)
-    try:
-        await ws.close()
-    except Exception:
-        pass
+            model = app.state.models.get_or_load(aws_folder_path)
+            if is_stale_mapping(model, aws_folder_path):
+                # Another worker published a newer build of the folder: map it instead
+                app.state.models.pop(aws_folder_path)
+                model = app.state.models.get_or_load(aws_folder_path)
+        except Exception as e:
+            raise ValueError(f"No model found for domain extracted from URL: {datarequest.url}") from e
+
+    if model is None or model.data is None:
+        raise ValueError("No default model found or initialized.")
+    query_language = None
+    if datarequest.query and datarequest.query.strip():
+        query_language = model.llm.detect_language(datarequest.query)
+    return model, query_language
+
+async def aresolve_chat_model(datarequest: DataRequest) -> tuple[Model, str]:
+    """`resolve_chat_model` off the event loop: on the model loading executor when the folder has
+    to be loaded, else with the other blocking work of the request (language ID)."""
+    if datarequest.url and extract_aws_folder_path(datarequest.url) not in app.state.models:
+        return await asyncio.get_running_loop().run_in_executor(model_load_executor, resolve_chat_model, datarequest)
+    return await run_blocking(resolve_chat_model, datarequest)
 
 @app.post("/api/chat/rag")
 async def chat_rag(datarequest: DataRequest):
@@ -621,29 +1014,44 @@ async def chat_rag(datarequest: DataRequest):
 
     try:
         k = datarequest.k or 5
-
-        if not datarequest.url:
-            model = app.state.model
-        else:
-            datarequest.data_folder = None
-            aws_folder_path = get_aws_folder_path(datarequest, datarequest.url)
-            model = app.state.models.get(aws_folder_path, None)
-            if model is None:
-                raise ValueError(f"No model found for domain extracted from URL: {datarequest.url}")
-
-        if model is None or model.data is None:
-            raise ValueError("No default model found or initialized.")
-        else:
-            model.data.documents_language = model.llm.detect_language_of_documents(model.data.documents)
-            if datarequest.query and datarequest.query.strip():
-                model.data.query_language = model.llm.detect_language(datarequest.query)
-
-        result = model.rag_langchain.answer(datarequest.query, k=k)
-        return {"query": datarequest.query, "response": result.get("response")}
+        model, query_language = await aresolve_chat_model(datarequest)
+        result = await model.rag_langchain.aanswer(datarequest.query, k=k, session_id=datarequest.session_id,
+                                                   query_language=query_language)
+        return {"query": datarequest.query, "response": result.get("response"), "metrics": result.get("metrics")}
     
     except Exception as e:
         raise e
 
+@app.post("/api/chat/rag/stream")
+def chat_rag_stream(datarequest: DataRequest):
+    """Answer a query with the RAG agent, streaming the answer as server-sent events.
+
+    Events are sent in order: one `sources` event, one `token` event per generated piece of
+    text, then a final `done` event with the full response and metrics (or an `error` event).
+    Each event's `data` field is a JSON object.
+
+    Args:
+        datarequest (DataRequest): The request payload containing the query, optional URL, mode and k.
+
+    Returns:
+        StreamingResponse: A `text/event-stream` response.
+    """
+
+    k = datarequest.k or 5
+    model, query_language = resolve_chat_model(datarequest)
+
+    def event_stream():
+        for event in model.rag_langchain.stream_answer(datarequest.query, k=k, session_id=datarequest.session_id,
+                                                       query_language=query_language):
+            name = event.pop("event")
+            yield f"event: {name}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @dataclass
 class DeleteModelRequest:
     """Request payload for deleting a domain-specific model.
@@ -658,10 +1066,17 @@ def delete_folders(folders: list[str]):
     """Delete specified folders from AWS S3 and unload related models from memory."""
     print("diallo", folders)
     try:
-        model = app.state.model
+        model = require_default_model()
         if not isinstance(folders, list) or len(folders) == 0:
             return "No folders specified for deletion."
         if model.aws_file.delete_folders_in_aws(settings.base_prefix, folders):
+            for folder in folders:
+                app.state.models.pop(folder, None)
+                if tenant_store is not None:
+                    # Other workers see the folder as gone instead of serving its mapped copy
+                    tenant_store.remove(folder)
+                if semantic_cache is not None:
+                    semantic_cache.invalidate(folder)
             return "Folders deleted successfully."
         else:
             return "Folder deletion failed."
@@ -671,7 +1086,7 @@ def delete_folders(folders: list[str]):
 @app.get("/admin/api/folders/list")
 def list_folders():
     """List all folders in the AWS S3 bucket used for storing domain data."""
-    model = app.state.model
+    model = require_default_model()
     folders = model.aws_file.list_folders_in_aws(settings.base_prefix)
     folders = [folder for folder in folders if folder != settings.default_folder]
     return folders
\ No newline at end of file
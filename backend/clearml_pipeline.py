@@ -4,7 +4,8 @@ import os
 import logging
 from clearml import Task
 from load_settings import settings
-from api import create_model, extract_aws_folder_path, extract_domain
+from model_factory import create_model, extract_domain
+from models.bm25 import BM25Index
 
 
 # Add the current directory to sys.path to allow imports
@@ -27,29 +28,54 @@ if settings.clearml_api_secret_key:
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# A pipeline worker process runs many steps: its model (S3, Fireworks and embedding clients) and its
+# ClearML task are created on the first step and reused by the next ones.
+_model = None
+_root_prefix = None
+_task = None
+
+
+def step_model():
+    """Model of this process, emptied of the previous step's folder and data."""
+    global _model, _root_prefix
+    if _model is None:
+        _model = create_model(settings)
+        _root_prefix = _model.aws_file.base_prefix
+    else:
+        _model.data.reset()
+        # `create_folder_in_aws` appends the folder to the prefix
+        _model.aws_file.base_prefix = _root_prefix
+    return _model
+
+def step_task(params: dict):
+    """ClearML task of this process, created on the first tracked step; ClearML closes it at exit."""
+    global _task
+    if _task is None:
+        _task = Task.init(project_name="RAG_Pipeline", task_name="crawling", reuse_last_task_id=False)
+    _task.connect(params)
+    return _task
+
 
 def run_initializing(url, folder):
     try:
         domain = extract_domain(url)
-        model = create_model(settings)
+        model = step_model()
         
         if model.aws_file.create_folder_in_aws(folder, False):
             meta_data = {"domain": domain, "url": url, "aws_folder_path": folder}
             model.aws_file.upload_file_in_aws("metadata", meta_data, type_file="json")
-            sys.exit(0)
-        else:
-            logger.error("Initializing failed")
-        sys.exit(1)
+            return 0
+        logger.error("Initializing failed")
+        return 1
     except Exception as e:
         logger.exception(f"Error in initializing: {e}")
-        sys.exit(1)
+        return 1
 
 def run_crawling(url, folder, max_depth):
-    task = Task.init(project_name="RAG_Pipeline", task_name="crawling", reuse_last_task_id=False)
-    task.connect({"url": url, "max_depth": max_depth})
+    step_task({"url": url, "max_depth": max_depth})
     
     try:
-        model = create_model(settings)
+        model = step_model()
         model.aws_file.create_folder_in_aws(folder, recreate=False)
         model.crawling.crawl(url, max_depth=max_depth)
         model.data.documents = model.crawling.texts
@@ -60,53 +86,76 @@ def run_crawling(url, folder, max_depth):
         
         if model.aws_file.upload_file_in_aws("crawled_data", model.data.documents, type_file="json"):
             logger.info("Crawling done")
-        else:
-            logger.error("Crawling failed")
-            sys.exit(1)
+            return 0
+        logger.error("Crawling failed")
+        return 1
     except Exception as e:
         logger.exception(f"Error in crawling: {e}")
-        sys.exit(1)
-    finally:
-        task.close()
+        return 1
 
 def run_embedding(url, folder):
     # task = Task.init(project_name="RAG_Pipeline", task_name="embedding", reuse_last_task_id=False)
     # task.connect({"url": url})
     
     try:
-        model = create_model(settings)
+        model = step_model()
         model.aws_file.create_folder_in_aws(folder, recreate=False)
         
         model.data.documents = model.aws_file.download_file_from_aws("crawled_data", type_file="json")
+
+        # Language profile is computed once here, not on every chat request. It is optional: without
+        # it `documents_language` stays None and is detected when the folder is loaded.
+        try:
+            metadata = model.aws_file.download_file_from_aws("metadata", type_file="json") or {}
+            metadata["language"] = model.llm.language_profile(model.data.documents)
+            model.aws_file.upload_file_in_aws("metadata", metadata, type_file="json")
+        except Exception as e:
+            logger.warning(f"Language profile not stored, continuing without it: {e}")
         
         model.embeddings.chunking()
         model.aws_file.upload_file_in_aws("crawled_chunks", model.data.chunks, type_file="json")
         
         model.embeddings.flat_chunks_and_sources()
         model.aws_file.upload_file_in_aws("crawled_sources", model.data.sources, type_file="json")
+
+        bm25 = BM25Index().build(model.data.chunks)
+        model.aws_file.upload_file_in_aws("bm25", bm25.to_bytes(), type_file="bin")
         
         model.embeddings.fireworks_embeddings()
         model.aws_file.upload_file_in_aws("embeddings", model.data.embeddings, type_file="npy")
-        sys.exit(0)
+        return 0
     except Exception as e:
         logger.exception(f"Error in embedding: {e}")
-        sys.exit(1)
+        return 1
     # finally:
     #     task.close()
 
 def run_indexing(url, folder):
     try:
-        model = create_model(settings)
+        model = step_model()
         model.aws_file.create_folder_in_aws(folder, recreate=False)
         
         model.data.embeddings = model.aws_file.download_file_from_aws("embeddings", type_file="npy")
         model.data.sources = model.aws_file.download_file_from_aws("crawled_sources", type_file="json")
         
         model.faiss.create_faiss_index()
-        sys.exit(0)
+        return 0
     except Exception as e:
         logger.exception(f"Error in indexing: {e}")
-        sys.exit(1)
+        return 1
+
+
+def run_step(step, url, folder, max_depth=250) -> int:
+    """Run a pipeline step and return its exit code (0 on success), as the CLI would exit with."""
+    if step == "initializing":
+        return run_initializing(url, folder)
+    if step == "crawling":
+        return run_crawling(url, folder, max_depth)
+    if step == "embedding":
+        return run_embedding(url, folder)
+    if step == "indexing":
+        return run_indexing(url, folder)
+    raise ValueError(f"Unknown pipeline step: {step}")
 
 
 if __name__ == "__main__":
@@ -118,11 +167,4 @@ if __name__ == "__main__":
     
     args = parser.parse_args()
     
-    if args.step == "initializing":
-        run_initializing(args.url, args.folder)
-    elif args.step == "crawling":
-        run_crawling(args.url, args.folder, args.max_depth)
-    elif args.step == "embedding":
-        run_embedding(args.url, args.folder)
-    elif args.step == "indexing":
-        run_indexing(args.url, args.folder)
\ No newline at end of file
+    sys.exit(run_step(args.step, args.url, args.folder, args.max_depth))
@@ -9,6 +9,7 @@ class Settings(BaseSettings):
     fireworks_api_key: str = Field(..., env="FIREWORKS_API_KEY")
     model_embeddings_name: str = Field(..., env="MODEL_EMBEDDINGS_NAME")
     model_llm_name: str = Field(..., env="MODEL_LLM_NAME")
+    model_llm_fallback_name: str | None = Field(None, env="MODEL_LLM_FALLBACK_NAME")
     deployment_type: str = Field(..., env="DEPLOYMENT_TYPE")
     aws_access_key_id: str = Field(..., env="AWS_ACCESS_KEY_ID")
     aws_secret_access_key: str = Field(..., env="AWS_SECRET_ACCESS_KEY")
@@ -21,6 +22,50 @@ class Settings(BaseSettings):
     clearml_api_access_key: str = Field(None, env="CLEARML_API_ACCESS_KEY")
     clearml_api_secret_key: str = Field(None, env="CLEARML_API_SECRET_KEY")
     default_folder: str = Field("default_dataset", env="DEFAULT_FOLDER")
+    faiss_metric: str = Field("ip", env="FAISS_METRIC")
+    score_threshold: float | None = Field(None, env="SCORE_THRESHOLD")
+    context_token_budget: int = Field(3000, env="CONTEXT_TOKEN_BUDGET")
+    context_neighbors: int = Field(1, env="CONTEXT_NEIGHBORS")
+    mmr_lambda: float | None = Field(0.5, env="MMR_LAMBDA")
+    mmr_fetch_k: int = Field(20, env="MMR_FETCH_K")
+    embedding_deadline_s: float | None = Field(1.5, env="EMBEDDING_DEADLINE_S")
+    hybrid_retrieval: bool = Field(False, env="HYBRID_RETRIEVAL")
+    semantic_cache_enabled: bool = Field(True, env="SEMANTIC_CACHE_ENABLED")
+    semantic_cache_threshold: float = Field(0.95, env="SEMANTIC_CACHE_THRESHOLD")
+    semantic_cache_ttl_s: float = Field(3600, env="SEMANTIC_CACHE_TTL_S")
+    semantic_cache_max_entries: int = Field(2000, env="SEMANTIC_CACHE_MAX_ENTRIES")
+    semantic_cache_max_mb: int = Field(64, env="SEMANTIC_CACHE_MAX_MB")
+    conversation_max_turns: int = Field(4, env="CONVERSATION_MAX_TURNS")
+    conversation_token_budget: int = Field(800, env="CONVERSATION_TOKEN_BUDGET")
+    conversation_max_sessions: int = Field(10000, env="CONVERSATION_MAX_SESSIONS")
+    conversation_idle_ttl_s: float = Field(3600, env="CONVERSATION_IDLE_TTL_S")
+    single_flight_enabled: bool = Field(True, env="SINGLE_FLIGHT_ENABLED")
+    llm_timeout_s: float | None = Field(30, env="LLM_TIMEOUT_S")
+    llm_hedge: bool = Field(True, env="LLM_HEDGE")
+    llm_hedge_min_delay_s: float = Field(2.0, env="LLM_HEDGE_MIN_DELAY_S")
+    llm_breaker_failures: int = Field(5, env="LLM_BREAKER_FAILURES")
+    llm_breaker_reset_s: float = Field(30, env="LLM_BREAKER_RESET_S")
+    translation_cache_enabled: bool = Field(True, env="TRANSLATION_CACHE_ENABLED")
+    translation_cache_max_entries: int = Field(5000, env="TRANSLATION_CACHE_MAX_ENTRIES")
+    translation_cache_ttl_s: float = Field(7 * 24 * 3600, env="TRANSLATION_CACHE_TTL_S")
+    translation_cache_path: str | None = Field("cache/translations.jsonl", env="TRANSLATION_CACHE_PATH")
+    translation_cache_warm_path: str | None = Field(None, env="TRANSLATION_CACHE_WARM_PATH")
+    model_registry_max_mb: int = Field(2048, env="MODEL_REGISTRY_MAX_MB")
+    model_prefetch_count: int = Field(3, env="MODEL_PREFETCH_COUNT")
+    recent_folders_path: str | None = Field("cache/recent_folders.json", env="RECENT_FOLDERS_PATH")
+    pipeline_workers: int = Field(2, env="PIPELINE_WORKERS")
+    pipeline_worker_max_steps: int = Field(50, env="PIPELINE_WORKER_MAX_STEPS")
+    # Per API worker: with N uvicorn workers, up to N * PIPELINE_MAX_CONCURRENT runs execute at once
+    pipeline_max_concurrent: int = Field(2, env="PIPELINE_MAX_CONCURRENT")
+    # Across workers: enforced through folder claims in the pipeline state backend (per worker with "memory")
+    pipeline_max_per_folder: int = Field(1, env="PIPELINE_MAX_PER_FOLDER")
+    pipeline_jobs_path: str | None = Field("cache/pipeline_jobs.json", env="PIPELINE_JOBS_PATH")
+    pipeline_state_backend: str = Field("memory", env="PIPELINE_STATE_BACKEND")
+    pipeline_state_path: str = Field("cache/pipeline_state.sqlite3", env="PIPELINE_STATE_PATH")
+    pipeline_state_url: str | None = Field(None, env="PIPELINE_STATE_URL")
+    pipeline_history_max: int = Field(500, env="PIPELINE_HISTORY_MAX")
+    pipeline_run_stale_s: int = Field(300, env="PIPELINE_RUN_STALE_S")
+    tenant_store_path: str | None = Field("cache/tenants", env="TENANT_STORE_PATH")
 
     model_config = {
         "protected_namespaces": ("settings_",)
@@ -37,6 +82,7 @@ class Settings(BaseSettings):
             fireworks_api_key={mask(self.fireworks_api_key)},
             model_embeddings_name={self.model_embeddings_name},
             model_llm_name={self.model_llm_name},
+            model_llm_fallback_name={self.model_llm_fallback_name},
             deployment_type={self.deployment_type},
             aws_access_key_id={mask(self.aws_access_key_id)},
             aws_secret_access_key={mask(self.aws_secret_access_key)},
@@ -47,7 +93,48 @@ class Settings(BaseSettings):
             clearml_api_host={self.clearml_api_host},
             clearml_files_host={self.clearml_files_host},
             clearml_api_access_key={mask(self.clearml_api_access_key)},
-            clearml_api_secret_key={mask(self.clearml_api_secret_key)}
+            clearml_api_secret_key={mask(self.clearml_api_secret_key)},
+            faiss_metric={self.faiss_metric},
+            score_threshold={self.score_threshold},
+            context_token_budget={self.context_token_budget},
+            context_neighbors={self.context_neighbors},
+            mmr_lambda={self.mmr_lambda},
+            mmr_fetch_k={self.mmr_fetch_k},
+            embedding_deadline_s={self.embedding_deadline_s},
+            hybrid_retrieval={self.hybrid_retrieval},
+            semantic_cache_enabled={self.semantic_cache_enabled},
+            semantic_cache_threshold={self.semantic_cache_threshold},
+            semantic_cache_ttl_s={self.semantic_cache_ttl_s},
+            semantic_cache_max_entries={self.semantic_cache_max_entries},
+            semantic_cache_max_mb={self.semantic_cache_max_mb},
+            conversation_max_turns={self.conversation_max_turns},
+            conversation_token_budget={self.conversation_token_budget},
+            conversation_max_sessions={self.conversation_max_sessions},
+            conversation_idle_ttl_s={self.conversation_idle_ttl_s},
+            single_flight_enabled={self.single_flight_enabled},
+            llm_timeout_s={self.llm_timeout_s},
+            llm_hedge={self.llm_hedge},
+            llm_hedge_min_delay_s={self.llm_hedge_min_delay_s},
+            llm_breaker_failures={self.llm_breaker_failures},
+            llm_breaker_reset_s={self.llm_breaker_reset_s},
+            translation_cache_enabled={self.translation_cache_enabled},
+            translation_cache_max_entries={self.translation_cache_max_entries},
+            translation_cache_ttl_s={self.translation_cache_ttl_s},
+            translation_cache_path={self.translation_cache_path},
+            translation_cache_warm_path={self.translation_cache_warm_path},
+            model_registry_max_mb={self.model_registry_max_mb},
+            model_prefetch_count={self.model_prefetch_count},
+            recent_folders_path={self.recent_folders_path},
+            pipeline_workers={self.pipeline_workers},
+            pipeline_worker_max_steps={self.pipeline_worker_max_steps},
+            pipeline_max_concurrent={self.pipeline_max_concurrent},
+            pipeline_max_per_folder={self.pipeline_max_per_folder},
+            pipeline_jobs_path={self.pipeline_jobs_path},
+            pipeline_state_backend={self.pipeline_state_backend},
+            pipeline_state_path={self.pipeline_state_path},
+            pipeline_history_max={self.pipeline_history_max},
+            pipeline_run_stale_s={self.pipeline_run_stale_s},
+            tenant_store_path={self.tenant_store_path}
         )
         """
 
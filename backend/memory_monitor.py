@@ -0,0 +1,95 @@
+import asyncio
+import logging
+import psutil
+
+
+# Prefer uvicorn's logger when running under uvicorn; fall back to module logger
+_uvicorn_logger = logging.getLogger("uvicorn.error")
+logger = _uvicorn_logger if _uvicorn_logger.handlers else logging.getLogger(__name__)
+
+
+def process_snapshot(process: psutil.Process) -> dict:
+    """Memory and CPU of `process` and RAM of the machine, as shown by the admin memory monitor.
+
+    `cpu_percent` is measured since the previous call on the same `process` object.
+    """
+
+    mem_info = process.memory_info()
+    virtual_mem = psutil.virtual_memory()
+    return {
+        "rss_GB": round(mem_info.rss / (1024 ** 3), 3),   # Physical memory of the process
+        "vms_GB": round(mem_info.vms / (1024 ** 3), 3),   # Virtual memory of the process
+        "cpu_percent": process.cpu_percent(interval=None), # CPU usage of the process (%)
+        "threads": process.num_threads(),                 # Number of threads
+        "total_RAM_GB": round(virtual_mem.total / (1024 ** 3), 2), # Total machine RAM
+        "used_RAM_GB": round(virtual_mem.used / (1024 ** 3), 2),   # Used machine RAM
+        "ram_percent": virtual_mem.percent                # Total RAM usage (%)
+    }
+
+
+class MemorySampler:
+    def __init__(self, sample, interval_s: float = 1.0):
+        """One sampling loop shared by every memory monitor subscriber.
+
+        While at least one subscriber is connected, `sample()` runs every `interval_s` seconds in a
+        thread and its result is handed to every subscriber's queue. A queue holds only the latest
+        snapshot, so a slow client skips snapshots instead of delaying the others. The loop stops
+        when the last subscriber leaves.
+
+        Args:
+            sample (callable): `sample()` returns the JSON-serializable snapshot to broadcast.
+            interval_s (float, optional): Seconds between snapshots. Defaults to 1.0.
+        """
+        self.sample = sample
+        self.interval_s = interval_s
+        self._subscribers: set[asyncio.Queue] = set()
+        self._task: asyncio.Task = None
+        self.samples = 0
+
+
+    def subscribe(self) -> asyncio.Queue:
+        """Register a subscriber and return the queue its snapshots are put in."""
+
+        queue = asyncio.Queue(maxsize=1)
+        self._subscribers.add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return queue
+
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+        if not self._subscribers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+
+    async def _run(self):
+        while self._subscribers:
+            try:
+                snapshot = await asyncio.to_thread(self.sample)
+            except Exception as e:
+                logger.error(f"Memory sampling failed: {e}")
+                snapshot = None
+            if snapshot is not None:
+                self.samples += 1
+                for queue in list(self._subscribers):
+                    if queue.full():
+                        queue.get_nowait()
+                    queue.put_nowait(snapshot)
+            await asyncio.sleep(self.interval_s)
+
+
+    async def stop(self):
+        """Stop sampling and drop the subscribers, e.g. on shutdown."""
+
+        self._subscribers.clear()
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
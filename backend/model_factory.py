@@ -0,0 +1,162 @@
+import re
+from dataclasses import dataclass
+import tldextract
+from config import Settings
+from outils.dataset import Data
+from outils.filesmanager import FileManager, AWSFileManager
+from outils.webcrawling import Crawling
+from models.embeddings import Embeddings
+from models.faissmanager import Faiss
+from models.LLM import Fireworks_LLM
+from models.RAG import LangChainRAGAgent
+from models.cache import SemanticCache, TranslationCache
+from models.conversation import ConversationStore
+from models.singleflight import SingleFlight
+
+
+# Building blocks shared by the API and the pipeline steps. Importing this module has no side
+# effects, so that pipeline worker processes do not set up the API (app, queues, caches, stores).
+
+@dataclass
+class Model:
+    """
+    Core application model that aggregates all major components.
+
+    Attributes:
+        data (Data): Central data container for documents, embeddings, and index structures.
+        crawling (Crawling): Module responsible for web scraping and content extraction.
+        embeddings (Embeddings): Handles embedding generation and related operations.
+        file (FileManager): Manages file storage, loading, and persistence.
+        faiss (Faiss): Handles FAISS index creation, querying, and updates.
+        llm (Fireworks_LLM): Interface to the Fireworks language model for text generation and QA tasks.
+    """
+
+    data: Data = None
+    crawling: Crawling = None
+    embeddings: Embeddings = None
+    file: FileManager = None
+    faiss: Faiss = None
+    llm: Fireworks_LLM = None
+    rag_langchain: LangChainRAGAgent = None
+    aws_file: AWSFileManager = None
+
+@dataclass
+class DataRequest:
+    """Request payload for RAG/chat endpoints.
+
+    Attributes:
+        query (str): The user question or query text.
+        url (str): Optional URL used to select a domain-specific model.
+        mode (str): Optional mode flag.
+        k (int): Number of retrieved documents to use (default: 5).
+        session_id (str): Optional client conversation identifier; turns of the same session are
+            given to the LLM as history.
+    """
+
+    query: str = None
+    url: str = None
+    mode: str = None
+    k: int = 5
+    max_depth: int = 200
+    data_folder: str = None
+    session_id: str = None
+
+def create_model(settings: Settings, folder: str = None, semantic_cache: SemanticCache = None,
+                 translation_cache: TranslationCache = None, conversations: ConversationStore = None,
+                 single_flight: SingleFlight = None) -> Model:
+    """Build the components of a model from the settings.
+
+    The caches, conversation store and single-flight group are shared by the models of an API worker,
+    so they are created by the caller and passed in; a pipeline step does without them.
+
+    Args:
+        settings (Settings): Application settings.
+        folder (str, optional): Tenant folder the model serves. Defaults to None.
+        semantic_cache (SemanticCache, optional): Answer cache, used for folder models. Defaults to None.
+        translation_cache (TranslationCache, optional): Translation cache of the LLM. Defaults to None.
+        conversations (ConversationStore, optional): Session histories. Defaults to None.
+        single_flight (SingleFlight, optional): Group deduplicating identical queries. Defaults to None.
+
+    Returns:
+        Model: The model, with no data loaded.
+    """
+    model = Model()
+
+    model.data = Data(fireworks_api_key=settings.fireworks_api_key)
+    model.crawling = Crawling()
+    model.embeddings = Embeddings(model.data, settings.model_embeddings_name)
+    model.file = FileManager(model.data)
+    model.faiss = Faiss(model.data, model.embeddings, metric=settings.faiss_metric)
+    model.llm = Fireworks_LLM(
+        model.data, settings.model_llm_name, settings.deployment_type,
+        fallback_model=settings.model_llm_fallback_name,
+        timeout_s=settings.llm_timeout_s,
+        hedge=settings.llm_hedge,
+        hedge_min_delay_s=settings.llm_hedge_min_delay_s,
+        breaker_failures=settings.llm_breaker_failures,
+        breaker_reset_s=settings.llm_breaker_reset_s,
+        translation_cache=translation_cache,
+    )
+    model.rag_langchain = LangChainRAGAgent(
+        model.data, model.faiss, model.llm,
+        score_threshold=settings.score_threshold,
+        token_budget=settings.context_token_budget,
+        neighbors=settings.context_neighbors,
+        mmr_lambda=settings.mmr_lambda,
+        fetch_k=settings.mmr_fetch_k,
+        embedding_deadline=settings.embedding_deadline_s,
+        hybrid=settings.hybrid_retrieval,
+        cache=semantic_cache if folder else None,
+        folder=folder,
+        conversations=conversations,
+        single_flight=single_flight,
+    )
+    model.aws_file = AWSFileManager(
+        data=model.data,
+        base_prefix=settings.base_prefix,
+        aws_access_key_id=settings.aws_access_key_id,
+        aws_secret_access_key=settings.aws_secret_access_key,
+        aws_region=settings.aws_region,
+        aws_s3_bucket_name=settings.aws_s3_bucket_name_backend
+    )
+
+    return model
+
+def extract_domain(url: str) -> str:
+    """Extract the domain from a given URL.
+
+    Args:
+        url (str): The input URL.
+
+    Returns:
+        str: The extracted domain.
+    """
+    ext = tldextract.extract(url)
+    return f"{ext.domain}_{ext.suffix}"
+
+def extract_aws_folder_path(url: str) -> str:
+    """Extract the AWS folder path from a given URL.
+
+    Args:
+        url (str): The input URL.
+
+    Returns:
+        str: The extracted AWS folder path.
+    """
+    
+    name = re.sub(r'[^A-Za-z0-9]+', '_', url)
+    name = name.replace("_", "")
+
+    if not name:
+        raise ValueError("Could not extract domain from URL.")
+    
+    return name.lower()
+
+def get_aws_folder_path(data: dict | DataRequest, url: str, default_folder: str) -> str:
+    """Return the folder a request works on: `default_folder` when it asks for it, else the one derived from `url`."""
+    if (isinstance(data, DataRequest) and (data.data_folder == default_folder)) or \
+       (isinstance(data, dict) and (data.get("data_folder", None) == default_folder)):
+        aws_folder_path = default_folder
+    else:
+        aws_folder_path = extract_aws_folder_path(url)
+    return aws_folder_path
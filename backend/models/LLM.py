@@ -1,20 +1,127 @@
+from typing import Iterator
+from collections import Counter
+import functools
+import math
+import time
+import logging
 from fireworks import LLM
 from outils.dataset import Data
+from .resilience import CircuitBreaker, CircuitOpenError, LatencyTracker, hedged_call
+from .cache import TranslationCache
 import langid
 import pycountry
 
 
+# Prefer uvicorn's logger when running under uvicorn; fall back to module logger
+_uvicorn_logger = logging.getLogger("uvicorn.error")
+logger = _uvicorn_logger if _uvicorn_logger.handlers else logging.getLogger(__name__)
+
+# langid is linear in the text length; a prefix is enough to identify the language
+LANGUAGE_PREFIX_CHARS = 1000
+
+
+@functools.lru_cache(maxsize=256)
+def language_name(code: str) -> str | None:
+    """Return the English name of an ISO 639-1 language code (e.g. "fr" -> "French")."""
+
+    lang = pycountry.languages.get(alpha_2=code)
+    return lang.name if lang else None
+
+
 class Fireworks_LLM:
-    def __init__(self, data:Data, model="llama4-maverick-instruct-basic", deployment_type="serverless"):
+    def __init__(self, data:Data, model="llama4-maverick-instruct-basic", deployment_type="serverless",
+                 fallback_model=None, timeout_s=None, hedge=False, hedge_min_delay_s=1.0,
+                 breaker_failures=5, breaker_reset_s=30, translation_cache: TranslationCache = None):
         """Connect to an LLM model via the Fireworks API.
 
+        Completions go to `model`, or to `fallback_model` when the primary model fails, times out or
+        has its circuit breaker open. With `hedge`, an async completion still running after the p95
+        latency of its model (at least `hedge_min_delay_s`) is raced against a second identical request.
+
         Args:
             data (Data): Data container providing API keys and other context.
             model (str, optional): Name of the LLM model. Defaults to "llama4-maverick-instruct-basic".
             deployment_type (str, optional): Deployment type. Defaults to "serverless".
+            fallback_model (str, optional): Faster model used when the primary one is unavailable. Defaults to None.
+            timeout_s (float, optional): Deadline of a completion per model. Defaults to None (SDK default).
+            hedge (bool, optional): Send hedged requests on async completions. Defaults to False.
+            hedge_min_delay_s (float, optional): Lower bound of the hedging delay. Defaults to 1.0.
+            breaker_failures (int, optional): Consecutive failures opening a model's circuit. Defaults to 5.
+            breaker_reset_s (float, optional): Time before an open circuit lets a trial call through. Defaults to 30.
+            translation_cache (TranslationCache, optional): Cache of `translate` results. Defaults to None.
         """
         self.data = data
-        self.llm = LLM(model=model, deployment_type=deployment_type, api_key=self.data.fireworks_api_key)
+        self.model = model
+        self.fallback_model = fallback_model
+        self.timeout_s = timeout_s
+        self.hedge = hedge
+        self.hedge_min_delay_s = hedge_min_delay_s
+        self.translation_cache = translation_cache
+
+        # With a deadline, a failed call goes to the fallback model instead of the SDK's retries
+        options = {} if timeout_s is None else {"request_timeout": max(1, math.ceil(timeout_s)), "max_retries": 0}
+        self.llm = LLM(model=model, deployment_type=deployment_type, api_key=self.data.fireworks_api_key, **options)
+        self.fallback_llm = None
+        if fallback_model and fallback_model != model:
+            self.fallback_llm = LLM(model=fallback_model, deployment_type=deployment_type,
+                                    api_key=self.data.fireworks_api_key, **options)
+
+        names = [model] + ([fallback_model] if self.fallback_llm is not None else [])
+        self.breakers = {name: CircuitBreaker(breaker_failures, breaker_reset_s) for name in names}
+        self.latencies = {name: LatencyTracker() for name in names}
+
+
+    def _clients(self):
+        """Yield (name, client) of the models whose circuit lets a call through, primary first."""
+
+        clients = [(self.model, self.llm)]
+        if self.fallback_llm is not None:
+            clients.append((self.fallback_model, self.fallback_llm))
+        for name, client in clients:
+            if self.breakers[name].allow():
+                yield name, client
+
+
+    def _hedge_delay(self, name: str) -> float | None:
+        if not self.hedge:
+            return None
+        p95 = self.latencies[name].percentile(95)
+        return None if p95 is None else max(p95, self.hedge_min_delay_s)
+
+
+    def _complete(self, messages):
+        error = None
+        for name, client in self._clients():
+            start = time.perf_counter()
+            try:
+                response = client.chat.completions.create(messages=messages)
+            except Exception as e:
+                self.breakers[name].record_failure()
+                logger.warning(f"Completion with {name} failed: {e!r}")
+                error = e
+                continue
+            self.breakers[name].record_success()
+            self.latencies[name].record(time.perf_counter() - start)
+            return response
+        raise error or CircuitOpenError("No LLM model available: every circuit is open.")
+
+
+    async def _acomplete(self, messages):
+        error = None
+        for name, client in self._clients():
+            start = time.perf_counter()
+            try:
+                response = await hedged_call(lambda: client.chat.completions.acreate(messages=messages),
+                                             timeout=self.timeout_s, hedge_delay=self._hedge_delay(name))
+            except Exception as e:
+                self.breakers[name].record_failure()
+                logger.warning(f"Completion with {name} failed: {e!r}")
+                error = e
+                continue
+            self.breakers[name].record_success()
+            self.latencies[name].record(time.perf_counter() - start)
+            return response
+        raise error or CircuitOpenError("No LLM model available: every circuit is open.")
 
 
     def generate_QA(self, prompt: str) -> str:
@@ -28,13 +135,59 @@ class Fireworks_LLM:
         """
         
         messages = [{"role": "user", "content": prompt}]
-        response = self.llm.chat.completions.create(messages=messages)
+        response = self._complete(messages)
+        return response.choices[0].message.content
+
+
+    async def agenerate_QA(self, prompt: str) -> str:
+        """Async counterpart of `generate_QA`; awaits the completion without blocking the event loop."""
+
+        messages = [{"role": "user", "content": prompt}]
+        response = await self._acomplete(messages)
         return response.choices[0].message.content
 
+
+    def stream_QA(self, prompt: str) -> Iterator[str]:
+        """Generate an answer using the LLM model, yielding text deltas as they arrive.
+
+        A stream failing before its first token is retried on the fallback model.
+
+        Args:
+            prompt (str): The input prompt for the LLM.
+
+        Yields:
+            str: Non-empty pieces of the generated response, in order.
+        """
+
+        messages = [{"role": "user", "content": prompt}]
+        error = None
+        for name, client in self._clients():
+            started = False
+            try:
+                for chunk in client.chat.completions.create(messages=messages, stream=True):
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        started = True
+                        yield delta
+            except Exception as e:
+                self.breakers[name].record_failure()
+                if started:
+                    raise
+                logger.warning(f"Streaming with {name} failed: {e!r}")
+                error = e
+                continue
+            self.breakers[name].record_success()
+            return
+        raise error or CircuitOpenError("No LLM model available: every circuit is open.")
+
     
     def translate(self, prompt, target_language) -> str:
         """Translate text to a target language using the LLM model.
 
+        Translations are served from the translation cache when possible.
+
         Args:
             prompt (str): The input text to be translated.
             target_language (str): The target language for translation.
@@ -43,22 +196,54 @@ class Fireworks_LLM:
             str: Translated text from the LLM.
         """
 
-        translation_prompt = f"Translate the following text to {target_language}:\n\n{prompt} respond only with the translated text."
-        messages = [{"role": "user", "content": translation_prompt}]
-        response = self.llm.chat.completions.create(messages=messages)
-        return response.choices[0].message.content
+        cached = self._cached_translation(prompt, target_language)
+        if cached is not None:
+            return cached
+        messages = [{"role": "user", "content": self._translation_prompt(prompt, target_language)}]
+        response = self._complete(messages)
+        return self._store_translation(prompt, target_language, response.choices[0].message.content)
+
+
+    async def atranslate(self, prompt, target_language) -> str:
+        """Async counterpart of `translate`."""
+
+        cached = self._cached_translation(prompt, target_language)
+        if cached is not None:
+            return cached
+        messages = [{"role": "user", "content": self._translation_prompt(prompt, target_language)}]
+        response = await self._acomplete(messages)
+        return self._store_translation(prompt, target_language, response.choices[0].message.content)
+
+
+    def _cached_translation(self, prompt, target_language) -> str | None:
+        if self.translation_cache is None:
+            return None
+        return self.translation_cache.get(prompt, target_language, self.model)
+
+
+    def _store_translation(self, prompt, target_language, translation) -> str:
+        if self.translation_cache is not None and translation and translation.strip():
+            self.translation_cache.put(prompt, target_language, self.model, translation)
+        return translation
+
 
+    @staticmethod
+    def _translation_prompt(prompt, target_language) -> str:
+        return f"Translate the following text to {target_language}:\n\n{prompt} respond only with the translated text."
 
-    def detect_language(self, text: str) -> str:
+
+    def detect_language(self, text: str, max_chars: int = LANGUAGE_PREFIX_CHARS) -> str:
         """ Detect language of a text using langid.
         
         Args:
             text (str): The input text whose language is to be detected.
+            max_chars (int, optional): Only this many leading characters are classified. Defaults to 1000.
         
         Returns:
             str: Detected language name (e.g., 'English', 'French').
         """
 
+        code = None
         try:
             # Try to get the language name from the 2-letter code
             if not text or not text.strip():
@@ -70,32 +255,43 @@ class Fireworks_LLM:
                 )
 
             # langid.classify returns (iso_code, score). score is unbounded; convert to [0,1]
-            code, _ = langid.classify(text)
-            lang = pycountry.languages.get(alpha_2=code)
-            if lang:
-                return lang.name
+            code, _ = langid.classify(text[:max_chars])
+            return language_name(code)
             
         except Exception as e:
             raise RuntimeError(f"Unable to find language name for code: {code}") from e
 
 
-    def detect_language_of_documents(self, documents: list[str]) -> str:
-        """ Detect languages of a list of documents using langid.
+    def language_profile(self, documents: dict | list) -> dict:
+        """ Compute the language profile of a corpus, once at ingest time.
 
         Args:
-            documents (list of str): The input texts whose languages are to be detected.
+            documents (dict or list of str): Page texts, or a mapping of URL to page text.
 
         Returns:
-            str: Detected dominant language name (e.g., 'English', 'French').
+            dict: {"dominant": language name or None, "histogram": {language name: number of documents},
+                "documents": number of documents with a detected language}.
         """
 
-        results = {}
-        
-        for text in documents:        
+        texts = documents.values() if isinstance(documents, dict) else documents
+        histogram = Counter()
+        for text in texts:
             lang = self.detect_language(text)
-            if results.get(lang, False):
-                results[lang] += 1
-            else:
-                results[lang] = 1
+            if lang:
+                histogram[lang] += 1
+
+        dominant = histogram.most_common(1)[0][0] if histogram else None
+        return {"dominant": dominant, "histogram": dict(histogram.most_common()), "documents": sum(histogram.values())}
+
+
+    def detect_language_of_documents(self, documents: dict | list) -> str:
+        """ Detect the dominant language of a list of documents using langid.
+
+        Args:
+            documents (dict or list of str): Page texts, or a mapping of URL to page text.
+
+        Returns:
+            str: Detected dominant language name (e.g., 'English', 'French').
+        """
 
-        return max(results.items(), key=lambda x: x[1])[0]
+        return self.language_profile(documents)["dominant"]
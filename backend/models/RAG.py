@@ -1,5 +1,10 @@
-from typing import List
+from typing import Iterator, List, Optional
+import time
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
 import logging
+import numpy as np
 
 
 # Prefer uvicorn's logger when running under uvicorn; fall back to module logger
@@ -13,15 +18,54 @@ from langchain.prompts import PromptTemplate
 
 from .LLM import Fireworks_LLM
 from .faissmanager import Faiss
+from .context import ContextAssembler, estimate_tokens
+from .bm25 import reciprocal_rank_fusion
+from .cache import SemanticCache
+from .conversation import ConversationStore
+from .metrics import REGISTRY
+from .singleflight import SingleFlight
 from outils.dataset import Data
 
 
+# Query embeddings run here so that retrieval can stop waiting for them at a deadline
+_embedding_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="query-embedding")
+# Query translations run here, concurrently with the search in the query's own language
+_translation_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="query-translation")
+# Blocking work of async requests (FAISS and BM25 search, context assembly, language ID) runs here
+_retrieval_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="retrieval")
+
+QUERY_EMBEDDING_SECONDS = REGISTRY.histogram(
+    "rag_query_embedding_seconds", "Time spent embedding a chat query, deadline included.", ("folder",))
+VECTOR_SEARCH_SECONDS = REGISTRY.histogram(
+    "rag_vector_search_seconds", "Time spent in the FAISS search of a chat query.", ("folder",))
+TRANSLATION_SECONDS = REGISTRY.histogram(
+    "rag_translation_seconds", "Time spent translating a chat query to the documents language.", ("folder",))
+LLM_SECONDS = REGISTRY.histogram(
+    "rag_llm_seconds", "Time spent generating a chat answer with the LLM.", ("folder",))
+ANSWER_SECONDS = REGISTRY.histogram(
+    "rag_answer_seconds", "Total time to answer a chat query.", ("folder", "cache"))
+LLM_TOKENS = REGISTRY.counter(
+    "rag_llm_tokens_total", "Estimated LLM tokens of chat prompts (in) and answers (out).", ("folder", "direction"))
+SEMANTIC_CACHE_LOOKUPS = REGISTRY.counter(
+    "rag_semantic_cache_lookups_total", "Semantic cache lookups of chat queries by result.", ("folder", "result"))
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking call on the bounded retrieval pool, without blocking the event loop."""
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_retrieval_executor, functools.partial(func, *args, **kwargs))
+
+
 class FireworksLangChain(LLM):
     """Adapter to use Fireworks_LLM with LangChain's LLM interface."""
 
     fw_llm: Fireworks_LLM = None
+    # Per-call sink for the generation time ("llm_ms"); left None on shared instances
+    timings: Optional[dict] = None
 
     def _call(self, prompt: str, stop=None) -> str:
+        start = time.perf_counter()
         try:
             result = self.fw_llm.generate_QA(prompt=prompt)
             if result is None:
@@ -30,6 +74,9 @@ class FireworksLangChain(LLM):
         except Exception as e:
             # re-raise to let upstream handle logging
             raise
+        finally:
+            if self.timings is not None:
+                self.timings["llm_ms"] = round((time.perf_counter() - start) * 1000, 2)
 
     @property
     def _identifying_params(self):
@@ -41,104 +88,608 @@ class FireworksLangChain(LLM):
 
 
 class FaissRetriever(BaseRetriever):
-    """Simple LangChain-style retriever backed by the project's Faiss implementation."""
+    """Simple LangChain-style retriever backed by the project's Faiss implementation.
+
+    Returns the matched chunks (merged with their neighbors) packed under a token budget,
+    instead of whole pages.
+    """
 
     faiss: Faiss = None
     data: Data = None
     fw_llm: Fireworks_LLM = None
     k: int = 5
+    score_threshold: Optional[float] = None
+    token_budget: int = 3000
+    neighbors: int = 1
+    mmr_lambda: Optional[float] = None
+    fetch_k: int = 20
+    embedding_deadline: Optional[float] = None
+    hybrid: bool = False
+    folder: Optional[str] = None
+    # Per-call sink for the metrics of `get_relevant_documents`; left None on shared instances
+    metrics: Optional[dict] = None
+
+    def _vector_search(self, query_embedding, k: int):
+        """Plain top-k search, or MMR over `fetch_k` candidates when `mmr_lambda` is set."""
+
+        with VECTOR_SEARCH_SECONDS.time(folder=self.folder or ""):
+            if self.mmr_lambda is None:
+                return self.faiss.search_by_vector(query_embedding, k=k, score_threshold=self.score_threshold)
+            return self.faiss.search_mmr_by_vector(query_embedding, k=k, fetch_k=self.fetch_k,
+                                                   lambda_mult=self.mmr_lambda, score_threshold=self.score_threshold)
+
+    def embed(self, query: str):
+        """Embed the query, hedged against the BM25 index.
+
+        Without a BM25 index or an `embedding_deadline` this is a plain `encode_query` call. Otherwise
+        the embedding is awaited at most `embedding_deadline` seconds.
+
+        Returns:
+            numpy.ndarray | None: The query embedding, or None when the deadline passed or the embedding
+                call failed and the BM25 results should be served instead.
+        """
+
+        with QUERY_EMBEDDING_SECONDS.time(folder=self.folder or ""):
+            return self._embed(query)
+
+    def _embed(self, query: str):
+        bm25 = self.data.bm25 if self.data else None
+        if bm25 is None or self.embedding_deadline is None:
+            return self.faiss.encode_query(query)
+
+        future = _embedding_executor.submit(self.faiss.encode_query, query)
+        try:
+            return future.result(timeout=self.embedding_deadline)
+        except FuturesTimeout:
+            logger.warning(f"Query embedding exceeded {self.embedding_deadline}s; serving BM25 results.")
+        except Exception as e:
+            logger.warning(f"Query embedding failed ({e}); serving BM25 results.")
+        return None
+
+    async def aembed(self, query: str):
+        """Async counterpart of `embed`, awaiting the async embedding client under the same deadline."""
+
+        with QUERY_EMBEDDING_SECONDS.time(folder=self.folder or ""):
+            return await self._aembed(query)
+
+    async def _aembed(self, query: str):
+        bm25 = self.data.bm25 if self.data else None
+        if bm25 is None or self.embedding_deadline is None:
+            return await self.faiss.aencode_query(query)
+
+        try:
+            return await asyncio.wait_for(self.faiss.aencode_query(query), timeout=self.embedding_deadline)
+        except asyncio.TimeoutError:
+            logger.warning(f"Query embedding exceeded {self.embedding_deadline}s; serving BM25 results.")
+        except Exception as e:
+            logger.warning(f"Query embedding failed ({e}); serving BM25 results.")
+        return None
+
+    def _search(self, query: str, k: int, query_embedding=None, embed_query: bool = True):
+        """Search chunks for the query.
+
+        Falls back to the BM25 results when no embedding is available (see `embed`). When `hybrid` is
+        set, vector and BM25 rankings are fused with Reciprocal Rank Fusion.
+        """
+
+        if query_embedding is None and embed_query:
+            query_embedding = self.embed(query)
+        bm25 = self.data.bm25 if self.data else None
+        if query_embedding is None:
+            return bm25.search(query, k=k)
+
+        indices, scores = self._vector_search(query_embedding, k)
+        if self.hybrid and bm25 is not None:
+            lexical_indices, _ = bm25.search(query, k=max(self.fetch_k, k))
+            return reciprocal_rank_fusion([indices, lexical_indices], k=k)
+        return indices, scores
+
+    def _needs_translation(self, query: str, query_language: str = None) -> bool:
+        data = self.data
+        if not query.strip() or not data or not query_language or not data.documents_language:
+            return False
+        return query_language.lower() != data.documents_language.lower()
+
+    @staticmethod
+    def _clean_translation(translated: str, query: str) -> str | None:
+        """Return the translated query, or None when it is empty or identical to the query."""
+
+        translated = (translated or "").strip()
+        if not translated or translated.lower() == query.strip().lower():
+            return None
+        return translated
+
+    def _timed_translation(self, query: str) -> str:
+        with TRANSLATION_SECONDS.time(folder=self.folder or ""):
+            return self.fw_llm.translate(query, target_language=self.data.documents_language)
+
+    async def _atimed_translation(self, query: str) -> str:
+        with TRANSLATION_SECONDS.time(folder=self.folder or ""):
+            return await self.fw_llm.atranslate(query, target_language=self.data.documents_language)
+
+    def _translate(self, future, query: str) -> str | None:
+        """Wait for the translation of `query`; None when it failed or changed nothing."""
+
+        try:
+            translated = future.result()
+        except Exception as e:
+            logger.warning(f"Query translation failed ({e}); searching the original query only.")
+            return None
+        return self._clean_translation(translated, query)
+
+    async def _atranslate(self, task, query: str) -> str | None:
+        """Async counterpart of `_translate`."""
+
+        try:
+            translated = await task
+        except Exception as e:
+            logger.warning(f"Query translation failed ({e}); searching the original query only.")
+            return None
+        return self._clean_translation(translated, query)
+
+    def _assemble(self, indices, scores) -> tuple[list[dict], dict]:
+        self.faiss.chunk_metadata()
+        assembler = ContextAssembler(self.data, token_budget=self.token_budget, neighbors=self.neighbors)
+        return assembler.assemble(indices, scores)
+
+    def retrieve(self, query: str, k: int = None, query_embedding=None, embed_query: bool = True,
+                 query_language: str = None) -> tuple[list[dict], dict]:
+        """Retrieve relevant passages for the given query. With translation if needed.
+
+        When the query and documents languages differ, the query is translated while the original
+        query is searched. The translated query is then embedded and searched too, and both rankings
+        are fused with Reciprocal Rank Fusion.
+
+        Args:
+            query (str): The input query string.
+            k (int, optional): Number of chunks to retrieve. Defaults to `self.k`.
+            query_embedding (numpy.ndarray, optional): Embedding of `query` from `embed`, to avoid
+                embedding it again. Defaults to None.
+            embed_query (bool, optional): Whether to embed the query when `query_embedding` is None.
+                Pass False after `embed` returned None to go straight to the BM25 results. Defaults to True.
+            query_language (str, optional): Language detected for this query; translation only happens
+                when it differs from the documents language. Defaults to None (no translation).
+
+        Returns:
+            tuple: (passages, metrics) as returned by `ContextAssembler.assemble`.
+        """
+
+        k = k or self.k
+        translation = None
+        if self.fw_llm is not None and self._needs_translation(query, query_language):
+            translation = _translation_executor.submit(self._timed_translation, query)
+
+        indices, scores = self._search(query, k, query_embedding, embed_query)
+
+        translated = self._translate(translation, query) if translation is not None else None
+        if translated is not None:
+            translated_indices, _ = self._search(translated, k)
+            indices, scores = reciprocal_rank_fusion([indices, translated_indices], k=k)
+
+        return self._assemble(indices, scores)
+
+    async def aretrieve(self, query: str, k: int = None, query_embedding=None,
+                        embed_query: bool = True, query_language: str = None) -> tuple[list[dict], dict]:
+        """Async counterpart of `retrieve`.
+
+        Embeddings and translation are awaited on the async clients; searches and context assembly
+        run on the bounded retrieval pool.
+        """
+
+        k = k or self.k
+        translation = None
+        if self.fw_llm is not None and self._needs_translation(query, query_language):
+            translation = asyncio.ensure_future(self._atimed_translation(query))
+
+        try:
+            if query_embedding is None and embed_query:
+                query_embedding = await self.aembed(query)
+            indices, scores = await run_blocking(self._search, query, k, query_embedding, False)
+        except BaseException:
+            if translation is not None:
+                translation.cancel()
+            raise
+
+        translated = await self._atranslate(translation, query) if translation is not None else None
+        if translated is not None:
+            translated_embedding = await self.aembed(translated)
+            translated_indices, _ = await run_blocking(self._search, translated, k, translated_embedding, False)
+            indices, scores = reciprocal_rank_fusion([indices, translated_indices], k=k)
+
+        return await run_blocking(self._assemble, indices, scores)
 
     def get_relevant_documents(self, query: str) -> List[Document]:
-        """Retrieve relevant documents for the given query. With translation if needed.
+        """LangChain entry point: `retrieve` wrapped into Documents.
+
+        The retrieval metrics and time go to `self.metrics` when it is set, which callers do on a
+        per-call copy of the retriever so that concurrent requests do not see each other's.
         
         Args:
             query (str): The input query string.
         
         Returns:
-            List[Document]: A list of relevant Document objects.
+            List[Document]: A list of relevant Document objects, one per assembled passage.
         """
-            
-        urls = self.faiss.search_similar_documents(query, k=self.k)
-        docs: List[Document] = []
 
-        if query.strip() and self.data and self.data.query_language and self.data.documents_language \
-            and self.data.query_language is not self.data.documents_language:
-            self.fw_llm.translate(query, target_language=self.data.documents_language)
-            urls.update(self.faiss.search_similar_documents(query, k=self.k))
-        for url in urls:
-            content = self.data.documents.get(url, "")
-            docs.append(Document(page_content=content, metadata={"source": url}))
-
-        return docs
+        # LangChain passes only the query: detect its language here rather than sharing it on `data`
+        start = time.perf_counter()
+        query_language = self.fw_llm.detect_language(query) if self.fw_llm is not None and query.strip() else None
+        passages, metrics = self.retrieve(query, query_language=query_language)
+        if self.metrics is not None:
+            self.metrics.update(metrics, retrieval_ms=round((time.perf_counter() - start) * 1000, 2))
+        return [
+            Document(page_content=p["text"], metadata={"source": p["source"], "score": p["score"], "chunks": p["chunks"]})
+            for p in passages
+        ]
 
 
 class LangChainRAGAgent:
-    """High-level RAG agent using LangChain's RetrievalQA chain."""
+    """High-level RAG agent.
+
+    `answer` runs retrieve -> prompt -> LLM directly, with a retriever and a prompt template built
+    once per agent. The LangChain RetrievalQA chain is kept as `answer_with_chain` for comparison.
+    With a `cache`, answers are shared between similar queries on the same `folder`. With a
+    `conversations` store, each `session_id` gets its own bounded history in the prompt. With
+    `single_flight`, identical queries arriving while one is being answered wait for that answer.
+    """
 
-    def __init__(self, data: Data, faiss: Faiss, fw_llm: Fireworks_LLM):
+    def __init__(self, data: Data, faiss: Faiss, fw_llm: Fireworks_LLM, score_threshold: float = None,
+                 token_budget: int = 3000, neighbors: int = 1, mmr_lambda: float = None, fetch_k: int = 20,
+                 embedding_deadline: float = None, hybrid: bool = False, cache: SemanticCache = None,
+                 folder: str = None, conversations: ConversationStore = None, single_flight: SingleFlight = None):
         self.data = data
         self.faiss = faiss
         self.fw_llm = fw_llm
-        self.last_answer = ""
+        self.cache = cache
+        self.folder = folder
+        self.conversations = conversations
+        self.single_flight = single_flight
+        self.retriever = FaissRetriever(faiss=faiss, data=data, fw_llm=fw_llm,
+                                        score_threshold=score_threshold, token_budget=token_budget,
+                                        neighbors=neighbors, mmr_lambda=mmr_lambda, fetch_k=fetch_k,
+                                        embedding_deadline=embedding_deadline, hybrid=hybrid, folder=folder)
         self.prompt_template = PromptTemplate(
             input_variables=["context", "question"],
             template=(
                 "You are a helpful assistant. Use only the information below to answer the user’s question.\n\n"
                 "You must answer in the same language as the question. Except in cases the user explicitly asks for a different language for the answer.\n\n"
-                "Before using using the previous answer, check if it is relevant to the current question. If it is not relevant, ignore it.\n\n"
-                "Query (with possible previous answer): {question}\n\n"
+                "Before using the previous conversation, check if it is relevant to the current question. If it is not relevant, ignore it.\n\n"
+                "Query (with possible previous conversation): {question}\n\n"
                 "Context:\n{context}\n\n"
             )
         )
+        # Formatting the raw template skips PromptTemplate's per-call validation
+        self._prompt = self.prompt_template.template
 
 
-    def answer(self, query: str, k: int = 5) -> dict:
-        """ Generate an answer to the query using LangChain's RetrievalQA.
+    def build_prompt(self, question: str, passages: list[dict]) -> str:
+        """Fill the prompt template the same way the "stuff" chain does.
+
+        Args:
+            question (str): The query, possibly merged with the previous conversation.
+            passages (list[dict]): Retrieved passages with a "text" key.
+
+        Returns:
+            str: The prompt sent to the LLM.
+        """
+
+        context = "\n\n".join(p["text"] for p in passages)
+        return self._prompt.format(context=context, question=question)
+
+
+    def _result(self, query: str, response: str, passages: list[dict], metrics: dict) -> dict:
+        sources = [p["source"] for p in passages if p.get("source")]
+        return {
+            "query": query,
+            "response": response,
+            "sources": list(dict.fromkeys(sources)),
+            "context": " \n\n ".join([p["text"] for p in passages]) if passages else "",
+            "passages": passages,
+            "metrics": metrics,
+        }
+
+
+    def _question(self, query: str, session_id: str = None) -> tuple[str, bool]:
+        """Merge the session's previous turns into the question.
+
+        Returns:
+            tuple: (question, has_history)
+        """
+
+        history = self.conversations.format_history(self.folder, session_id) if self.conversations else ""
+        if not history:
+            return query, False
+        return f"{query}\n\nPrevious conversation:\n{history}", True
+
+
+    def _remember(self, session_id: str, query: str, response: str):
+        if self.conversations is not None:
+            self.conversations.append(self.folder, session_id, query, response)
+
+
+    def _cached(self, query: str, k: int, query_embedding, start: float) -> dict | None:
+        """Look the query up in the semantic cache; returns a copy of the cached answer on a hit."""
+
+        if self.cache is None or query_embedding is None:
+            return None
+        cached = self.cache.get(self.folder, query_embedding, k, version=self.data.index_version)
+        SEMANTIC_CACHE_LOOKUPS.inc(folder=self.folder or "", result="miss" if cached is None else "hit")
+        if cached is None:
+            return None
+        metrics = dict(cached["metrics"], cache="hit")
+        elapsed = time.perf_counter() - start
+        metrics["timings"] = {"total_ms": round(elapsed * 1000, 2)}
+        ANSWER_SECONDS.observe(elapsed, folder=self.folder or "", cache="hit")
+        return dict(cached, query=query, metrics=metrics)
+
+
+    def _store(self, k: int, query_embedding, result: dict):
+        if self.cache is not None and query_embedding is not None:
+            self.cache.put(self.folder, query_embedding, k, result, version=self.data.index_version)
+
+
+    def answer(self, query: str, k: int = 5, session_id: str = None, query_language: str = None) -> dict:
+        """ Generate an answer to the query: retrieve, assemble the prompt, call the LLM.
         
         Args:
             query (str): The input query string.
-            k (int, optional): Number of relevant documents to retrieve. Defaults to 5.
+            k (int, optional): Number of relevant chunks to retrieve. Defaults to 5.
+            session_id (str, optional): Conversation the query belongs to. Defaults to None (no history).
+            query_language (str, optional): Language of the query, used to decide whether it is
+                translated to the documents language. Defaults to None (no translation).
         
         Returns:
-            dict: A dictionary containing the answer, sources, and context.
+            dict: A dictionary containing the answer, sources, context and metrics: context tokens
+                (used and saved compared to sending the full pages) and per-phase "timings" in ms.
+                `timings["prompt_ms"]` is the orchestration overhead left between retrieval and generation,
+                also reported as `timings["overhead_ms"]` to compare with `answer_with_chain`.
+                With a semantic cache, `metrics["cache"]` is "hit" or "miss"; hits skip retrieval and generation.
+                Queries with conversation history bypass the cache. Concurrent identical queries share
+                one computation, marked with `metrics["coalesced"]`.
         """
 
-        llm = FireworksLangChain(fw_llm=self.fw_llm)
-        retriever = FaissRetriever(faiss=self.faiss, data=self.data, k=k, fw_llm=self.fw_llm)
+        merged_query, has_history = self._question(query, session_id)
+        if has_history or self.single_flight is None:
+            result = self._answer(query, merged_query, k, has_history, query_language)
+        else:
+            result, shared = self.single_flight.do(self._flight_key(query, k),
+                                                   lambda: self._answer(query, query, k, False, query_language))
+            result = self._shared(result, query) if shared else result
+        self._remember(session_id, query, result["response"])
+        return result
+
+
+    def _flight_key(self, query: str, k: int) -> tuple:
+        return (self.folder, " ".join(query.lower().split()), k)
+
+
+    @staticmethod
+    def _shared(result: dict, query: str) -> dict:
+        return dict(result, query=query, metrics=dict(result["metrics"], coalesced=True))
+
+
+    def _answer(self, query: str, merged_query: str, k: int, has_history: bool, query_language: str = None) -> dict:
+        """Compute the answer of `answer`, without recording the conversation turn."""
 
         try:
-            merged_query = f"{query}\n\nPrevious Answer: {self.last_answer}"
+            start = time.perf_counter()
+
+            # The query is embedded once, for both the cache lookup and the vector search
+            query_embedding = self.retriever.embed(query)
+            cached = None if has_history else self._cached(query, k, query_embedding, start)
+            if cached is not None:
+                return cached
+
+            passages, metrics = self.retriever.retrieve(query, k=k, query_embedding=query_embedding, embed_query=False,
+                                                        query_language=query_language)
+            retrieved = time.perf_counter()
+
+            prompt = self.build_prompt(merged_query, passages)
+            prompt_built = time.perf_counter()
+
+            response = self.fw_llm.generate_QA(prompt=prompt)
+            response = "" if response is None else str(response)
+            generated = time.perf_counter()
+
+            return self._finish(query, response, passages, metrics, k, query_embedding, has_history,
+                                start, retrieved, prompt_built, generated, prompt)
+
+        except Exception as e:
+            logger.exception(f"RAG failed: {e}")
+            raise e
+
+
+    def _observe(self, prompt: str, response: str, start: float, prompt_built: float, generated: float, cache: str):
+        folder = self.folder or ""
+        LLM_SECONDS.observe(generated - prompt_built, folder=folder)
+        ANSWER_SECONDS.observe(generated - start, folder=folder, cache=cache)
+        LLM_TOKENS.inc(estimate_tokens(prompt), folder=folder, direction="in")
+        LLM_TOKENS.inc(estimate_tokens(response), folder=folder, direction="out")
+
+
+    def _finish(self, query, response, passages, metrics, k, query_embedding, has_history,
+                start, retrieved, prompt_built, generated, prompt) -> dict:
+        self._observe(prompt, response, start, prompt_built, generated,
+                      "miss" if self.cache is not None and not has_history else "none")
+        metrics["timings"] = {
+            "retrieval_ms": round((retrieved - start) * 1000, 2),
+            "prompt_ms": round((prompt_built - retrieved) * 1000, 2),
+            "llm_ms": round((generated - prompt_built) * 1000, 2),
+            "total_ms": round((generated - start) * 1000, 2),
+            "overhead_ms": round((prompt_built - retrieved) * 1000, 2),
+        }
+        if self.cache is not None and not has_history:
+            metrics["cache"] = "miss"
+        result = self._result(query, response, passages, metrics)
+        if not has_history:
+            self._store(k, query_embedding, result)
+        return result
+
+
+    async def aanswer(self, query: str, k: int = 5, session_id: str = None, query_language: str = None) -> dict:
+        """Async counterpart of `answer`, for the event loop of the API.
+
+        The embedding and LLM calls are awaited on the async Fireworks clients and the searches run
+        on a bounded thread pool, so a slow request does not hold up the others. Returns the same
+        result as `answer`.
+        """
 
+        merged_query, has_history = self._question(query, session_id)
+        if has_history or self.single_flight is None:
+            result = await self._aanswer(query, merged_query, k, has_history, query_language)
+        else:
+            result, shared = await self.single_flight.ado(self._flight_key(query, k),
+                                                          lambda: self._aanswer(query, query, k, False, query_language))
+            result = self._shared(result, query) if shared else result
+        self._remember(session_id, query, result["response"])
+        return result
+
+
+    async def _aanswer(self, query: str, merged_query: str, k: int, has_history: bool,
+                       query_language: str = None) -> dict:
+        try:
+            start = time.perf_counter()
+
+            query_embedding = await self.retriever.aembed(query)
+            cached = None if has_history else self._cached(query, k, query_embedding, start)
+            if cached is not None:
+                return cached
+
+            passages, metrics = await self.retriever.aretrieve(query, k=k, query_embedding=query_embedding,
+                                                               embed_query=False, query_language=query_language)
+            retrieved = time.perf_counter()
+
+            prompt = self.build_prompt(merged_query, passages)
+            prompt_built = time.perf_counter()
+
+            response = await self.fw_llm.agenerate_QA(prompt=prompt)
+            response = "" if response is None else str(response)
+            generated = time.perf_counter()
+
+            return self._finish(query, response, passages, metrics, k, query_embedding, has_history,
+                                start, retrieved, prompt_built, generated, prompt)
+
+        except Exception as e:
+            logger.exception(f"RAG failed: {e}")
+            raise e
+
+
+    def stream_answer(self, query: str, k: int = 5, session_id: str = None, query_language: str = None) -> Iterator[dict]:
+        """ Generate an answer to the query, streaming LLM tokens as they are produced.
+
+        Args:
+            query (str): The input query string.
+            k (int, optional): Number of relevant chunks to retrieve. Defaults to 5.
+            session_id (str, optional): Conversation the query belongs to. Defaults to None (no history).
+            query_language (str, optional): Language of the query, used to decide whether it is
+                translated to the documents language. Defaults to None (no translation).
+
+        Yields:
+            dict: Events, in order:
+                - {"event": "sources", "sources": [...], "passages": [...]} once retrieval is done;
+                - {"event": "token", "text": str} for each generated piece of text;
+                - {"event": "done", "query": str, "response": str, "metrics": dict} at the end, where
+                  `metrics["timings"]` also reports "ttft_ms" (time to first token since the request).
+                On failure an {"event": "error", "error": str} event is yielded instead of "done".
+        """
+
+        start = time.perf_counter()
+        try:
+            merged_query, has_history = self._question(query, session_id)
+            query_embedding = self.retriever.embed(query)
+            cached = None if has_history else self._cached(query, k, query_embedding, start)
+            if cached is not None:
+                self._remember(session_id, query, cached["response"])
+                yield {"event": "sources", "sources": cached["sources"], "passages": cached["passages"]}
+                yield {"event": "token", "text": cached["response"]}
+                yield {"event": "done", "query": query, "response": cached["response"], "metrics": cached["metrics"]}
+                return
+
+            passages, metrics = self.retriever.retrieve(query, k=k, query_embedding=query_embedding, embed_query=False,
+                                                        query_language=query_language)
+            retrieved = time.perf_counter()
+            result = self._result(query, "", passages, metrics)
+            yield {"event": "sources", "sources": result["sources"], "passages": passages}
+
+            prompt = self.build_prompt(merged_query, passages)
+            prompt_built = time.perf_counter()
+            first_token = None
+            pieces = []
+            for piece in self.fw_llm.stream_QA(prompt=prompt):
+                if first_token is None:
+                    first_token = time.perf_counter()
+                pieces.append(piece)
+                yield {"event": "token", "text": piece}
+            generated = time.perf_counter()
+
+            response = "".join(pieces)
+            self._observe(prompt, response, start, prompt_built, generated,
+                          "miss" if self.cache is not None and not has_history else "none")
+            metrics["timings"] = {
+                "retrieval_ms": round((retrieved - start) * 1000, 2),
+                "prompt_ms": round((prompt_built - retrieved) * 1000, 2),
+                "ttft_ms": round(((first_token or generated) - start) * 1000, 2),
+                "llm_ms": round((generated - prompt_built) * 1000, 2),
+                "total_ms": round((generated - start) * 1000, 2),
+            }
+            if self.cache is not None and not has_history:
+                metrics["cache"] = "miss"
+                self._store(k, query_embedding, self._result(query, response, passages, metrics))
+            self._remember(session_id, query, response)
+            yield {"event": "done", "query": query, "response": response, "metrics": metrics}
+
+        except Exception as e:
+            logger.exception(f"RAG streaming failed: {e}")
+            yield {"event": "error", "error": str(e)}
+
+
+    def answer_with_chain(self, query: str, k: int = 5, session_id: str = None) -> dict:
+        """ Generate an answer to the query using LangChain's RetrievalQA.
+
+        Same inputs and response dict as `answer`. The chain is built for each call over copies of
+        the retriever and LLM adapter holding this call's `k`, metrics and timings, so the shared
+        retriever is never modified. `timings["overhead_ms"]` is the time the chain spends outside
+        retrieval and generation, to compare with the same entry of `answer`.
+        
+        Args:
+            query (str): The input query string.
+            k (int, optional): Number of relevant chunks to retrieve. Defaults to 5.
+            session_id (str, optional): Conversation the query belongs to. Defaults to None (no history).
+        
+        Returns:
+            dict: A dictionary containing the answer, sources, context, context metrics and timings.
+        """
+
+        try:
+            start = time.perf_counter()
+            metrics, timings = {}, {}
             chain = RetrievalQA.from_chain_type(
-                llm=llm,
+                llm=FireworksLangChain(fw_llm=self.fw_llm, timings=timings),
                 chain_type="stuff",
-                retriever=retriever,
+                retriever=self.retriever.model_copy(update={"k": k, "metrics": metrics}),
                 return_source_documents=True,
                 chain_type_kwargs={"prompt": self.prompt_template}
             )
+            merged_query, _ = self._question(query, session_id)
             result = chain.invoke({"query": merged_query})
+            total_ms = round((time.perf_counter() - start) * 1000, 2)
 
-            self.last_answer = result.get("result") or result.get("output_text", "")
-            source_docs = result.get("source_documents", [])
+            response = result.get("result") or result.get("output_text", "")
+            self._remember(session_id, query, response)
             passages = []
-            sources = []
-            for doc in source_docs:
-                if isinstance(doc.metadata, dict):
-                    src = doc.metadata.get("source")
-                else:
-                    src = getattr(doc.metadata, "source", None)
-                passages.append({"source": src, "text": doc.page_content})
-                if src:
-                    sources.append(src)
-            return {
-                "query": query,
-                "response": self.last_answer,
-                "sources": list(dict.fromkeys(sources)),
-                "context": " \n\n ".join([p["text"] for p in passages]) if passages else "",
-                "passages": passages,
+            for doc in result.get("source_documents", []):
+                metadata = doc.metadata if isinstance(doc.metadata, dict) else {}
+                passages.append({"source": metadata.get("source"), "text": doc.page_content, "score": metadata.get("score")})
+            retrieval_ms = metrics.pop("retrieval_ms", 0.0)
+            llm_ms = timings.get("llm_ms", 0.0)
+            metrics["timings"] = {
+                "retrieval_ms": retrieval_ms,
+                "llm_ms": llm_ms,
+                "total_ms": total_ms,
+                "overhead_ms": round(total_ms - retrieval_ms - llm_ms, 2),
             }
+            return self._result(query, response, passages, metrics)
 
         except Exception as e:
-            # Fallback simple behaviour: use earlier simple RAG flow
             logger.exception(f"LangChain RAG failed: {e}")
-            raise e
\ No newline at end of file
+            raise e
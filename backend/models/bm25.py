@@ -0,0 +1,227 @@
+import io
+import os
+import re
+import unicodedata
+from array import array
+import numpy as np
+
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> list[str]:
+    """Split text into lowercase, accent-folded word tokens.
+
+    Accents are removed so that "equipe" matches "équipe", which is common in typed queries.
+
+    Args:
+        text (str): Input text.
+
+    Returns:
+        list[str]: Tokens in order of appearance.
+    """
+
+    if not text:
+        return []
+    folded = unicodedata.normalize("NFKD", text.lower())
+    folded = "".join(c for c in folded if not unicodedata.combining(c))
+    return TOKEN_PATTERN.findall(folded)
+
+
+def reciprocal_rank_fusion(rankings: list, k: int = 5, c: int = 60) -> tuple[np.ndarray, np.ndarray]:
+    """Fuse several rankings of chunk indices with Reciprocal Rank Fusion.
+
+    Args:
+        rankings (list): Arrays of chunk indices, each ordered best first.
+        k (int, optional): Number of fused results to return. Defaults to 5.
+        c (int, optional): RRF damping constant. Defaults to 60.
+
+    Returns:
+        tuple: (indices, scores) ordered by fused score, best first.
+    """
+
+    fused = {}
+    for ranking in rankings:
+        for rank, i in enumerate(ranking):
+            fused[int(i)] = fused.get(int(i), 0.0) + 1.0 / (c + rank + 1)
+    ordered = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:k]
+    indices = np.array([i for i, _ in ordered], dtype=np.int64)
+    scores = np.array([s for _, s in ordered], dtype=np.float32)
+    return indices, scores
+
+
+class BM25Index:
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        """Okapi BM25 inverted index over the chunks, stored as CSR arrays.
+
+        Postings of term `t` are `postings[indptr[t]:indptr[t + 1]]` (chunk ids, int32) with their
+        term frequencies in the same slice of `frequencies` (uint16). Only the vocabulary is a
+        Python dict; everything else is a flat numpy array.
+
+        Args:
+            k1 (float, optional): Term frequency saturation. Defaults to 1.5.
+            b (float, optional): Length normalization strength. Defaults to 0.75.
+        """
+        self.k1 = k1
+        self.b = b
+        self.vocabulary: dict[str, int] = {}
+        self.indptr: np.ndarray = np.zeros(1, dtype=np.int64)
+        self.postings: np.ndarray = np.zeros(0, dtype=np.int32)
+        self.frequencies: np.ndarray = np.zeros(0, dtype=np.uint16)
+        self.doc_lengths: np.ndarray = np.zeros(0, dtype=np.float32)
+        self.idf: np.ndarray = np.zeros(0, dtype=np.float32)
+
+
+    @property
+    def n_docs(self) -> int:
+        return int(self.doc_lengths.shape[0])
+
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory used by the index arrays and vocabulary; memory-mapped arrays are not counted."""
+        arrays = (self.indptr, self.postings, self.frequencies, self.doc_lengths, self.idf)
+        return sum(a.nbytes for a in arrays if not isinstance(a, np.memmap)) + sum(len(t) + 80 for t in self.vocabulary)
+
+
+    def build(self, chunks: list[str]) -> "BM25Index":
+        """Index a flat list of chunks; chunk `i` gets document id `i`.
+
+        Args:
+            chunks (list[str]): Flat chunk texts, aligned with the embeddings.
+
+        Returns:
+            BM25Index: self, for chaining.
+        """
+
+        n = len(chunks)
+        vocabulary = {}
+        term_ids = array("q")
+        doc_ids = array("q")
+        doc_lengths = np.zeros(n, dtype=np.float32)
+
+        for d, text in enumerate(chunks):
+            tokens = tokenize(text)
+            doc_lengths[d] = len(tokens)
+            term_ids.extend(vocabulary.setdefault(t, len(vocabulary)) for t in tokens)
+            doc_ids.extend([d] * len(tokens))
+
+        # One posting per distinct (term, doc) pair, sorted by term then doc
+        keys = np.frombuffer(term_ids, dtype=np.int64) * max(n, 1) + np.frombuffer(doc_ids, dtype=np.int64)
+        keys, counts = np.unique(keys, return_counts=True)
+        terms = keys // max(n, 1)
+
+        self.vocabulary = vocabulary
+        self.indptr = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=len(vocabulary)), out=self.indptr[1:])
+        self.postings = (keys % max(n, 1)).astype(np.int32)
+        self.frequencies = np.minimum(counts, np.iinfo(np.uint16).max).astype(np.uint16)
+        self.doc_lengths = doc_lengths
+        self._compute_idf()
+        return self
+
+
+    def _compute_idf(self):
+        df = np.diff(self.indptr).astype(np.float32)
+        self.idf = np.log1p((self.n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+
+    def search(self, query: str, k: int = 5) -> tuple[np.ndarray, np.ndarray]:
+        """Score chunks against the query and return the best k.
+
+        Args:
+            query (str): User query text.
+            k (int, optional): Number of chunks to return. Defaults to 5.
+
+        Returns:
+            tuple: (indices, scores) of matching chunks, best first. Chunks sharing no term with
+                the query are never returned.
+        """
+
+        term_ids = {self.vocabulary[t] for t in tokenize(query) if t in self.vocabulary}
+        if not term_ids or self.n_docs == 0:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+
+        avg_length = max(float(self.doc_lengths.mean()), 1.0)
+        length_norm = self.k1 * (1 - self.b + self.b * self.doc_lengths / avg_length)
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        for t in term_ids:
+            start, end = self.indptr[t], self.indptr[t + 1]
+            docs = self.postings[start:end]
+            tf = self.frequencies[start:end].astype(np.float32)
+            scores[docs] += self.idf[t] * tf * (self.k1 + 1) / (tf + length_norm[docs])
+
+        matched = np.flatnonzero(scores > 0)
+        if matched.size > k:
+            matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        order = matched[np.argsort(-scores[matched], kind="stable")]
+        return order.astype(np.int64), scores[order]
+
+
+    def to_bytes(self) -> bytes:
+        """Serialize the index into a compressed `.npz` payload (no pickle)."""
+
+        terms = np.frombuffer("\n".join(self.vocabulary).encode("utf-8"), dtype=np.uint8)
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer,
+            params=np.array([self.k1, self.b], dtype=np.float64),
+            terms=terms,
+            indptr=self.indptr,
+            postings=self.postings,
+            frequencies=self.frequencies,
+            doc_lengths=self.doc_lengths,
+        )
+        return buffer.getvalue()
+
+
+    def save(self, directory: str):
+        """Write the index as uncompressed `.npy` arrays, which `load` can memory-map."""
+
+        os.makedirs(directory, exist_ok=True)
+        arrays = {
+            "params": np.array([self.k1, self.b], dtype=np.float64),
+            "terms": np.frombuffer("\n".join(self.vocabulary).encode("utf-8"), dtype=np.uint8),
+            "indptr": self.indptr,
+            "postings": self.postings,
+            "frequencies": self.frequencies,
+            "doc_lengths": self.doc_lengths,
+        }
+        for name, values in arrays.items():
+            np.save(os.path.join(directory, f"{name}.npy"), values)
+
+
+    @classmethod
+    def load(cls, directory: str, mmap_mode: str = "r") -> "BM25Index":
+        """Load an index written by `save`, mapping its postings read-only by default."""
+
+        def array(name):
+            return np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode, allow_pickle=False)
+
+        k1, b = np.load(os.path.join(directory, "params.npy"))
+        index = cls(k1=float(k1), b=float(b))
+        terms = np.load(os.path.join(directory, "terms.npy")).tobytes().decode("utf-8")
+        index.vocabulary = {t: i for i, t in enumerate(terms.split("\n"))} if terms else {}
+        index.indptr = array("indptr")
+        index.postings = array("postings")
+        index.frequencies = array("frequencies")
+        index.doc_lengths = array("doc_lengths")
+        index._compute_idf()
+        return index
+
+
+    @classmethod
+    def from_bytes(cls, raw: bytes) -> "BM25Index":
+        """Load an index serialized with `to_bytes`."""
+
+        with np.load(io.BytesIO(raw), allow_pickle=False) as payload:
+            k1, b = payload["params"]
+            index = cls(k1=float(k1), b=float(b))
+            terms = payload["terms"].tobytes().decode("utf-8")
+            index.vocabulary = {t: i for i, t in enumerate(terms.split("\n"))} if terms else {}
+            index.indptr = payload["indptr"]
+            index.postings = payload["postings"]
+            index.frequencies = payload["frequencies"]
+            index.doc_lengths = payload["doc_lengths"]
+        index._compute_idf()
+        return index
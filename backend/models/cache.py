@@ -0,0 +1,313 @@
+import os
+import sys
+import json
+import time
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+import numpy as np
+
+
+def _approx_nbytes(value) -> int:
+    """Rough deep size of a cached answer (strings, numbers, lists and dicts)."""
+
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_approx_nbytes(k) + _approx_nbytes(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_approx_nbytes(v) for v in value)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    return sys.getsizeof(value)
+
+
+@dataclass
+class CacheEntry:
+    folder: str
+    k: int
+    embedding: np.ndarray
+    value: dict
+    version: int
+    created: float
+    nbytes: int
+
+
+class SemanticCache:
+    def __init__(self, threshold: float = 0.95, ttl_seconds: float = 3600, max_entries: int = 2000,
+                 max_bytes: int = 64 * 1024 ** 2):
+        """Answer cache keyed by folder and query-embedding similarity.
+
+        A lookup hits when a cached query of the same folder and `k` has a cosine similarity of at
+        least `threshold` with the new query. Entries expire after `ttl_seconds`; beyond `max_entries`
+        or `max_bytes` the least recently used entries, across all folders, are evicted. Entries
+        recorded against an older index version of a folder are dropped on the next access.
+
+        Args:
+            threshold (float, optional): Minimum cosine similarity for a hit. Defaults to 0.95.
+            ttl_seconds (float, optional): Entry lifetime. Defaults to 3600.
+            max_entries (int, optional): Maximum number of entries. Defaults to 2000.
+            max_bytes (int, optional): Approximate memory cap. Defaults to 64 MiB.
+        """
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[int, CacheEntry] = OrderedDict()
+        self._by_folder: dict[str, list[int]] = {}
+        self._matrices: dict[str, np.ndarray] = {}
+        self._next_id = 0
+        self._nbytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._folder_lookups: dict[str, dict[str, int]] = {}
+
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        self._by_folder[entry.folder].remove(entry_id)
+        if not self._by_folder[entry.folder]:
+            del self._by_folder[entry.folder]
+        self._matrices.pop(entry.folder, None)
+        self._nbytes -= entry.nbytes
+
+
+    def _count(self, folder: str, hit: bool):
+        lookups = self._folder_lookups.setdefault(folder, {"hits": 0, "misses": 0})
+        if hit:
+            self.hits += 1
+            lookups["hits"] += 1
+        else:
+            self.misses += 1
+            lookups["misses"] += 1
+
+
+    def _drop_stale(self, folder: str, version: int):
+        now = time.monotonic()
+        for entry_id in list(self._by_folder.get(folder, [])):
+            entry = self._entries[entry_id]
+            if entry.version != version or now - entry.created > self.ttl_seconds:
+                self._remove(entry_id)
+
+
+    def get(self, folder: str, embedding, k: int, version: int = 0) -> dict | None:
+        """Return the cached answer of the most similar past query, if similar enough.
+
+        Args:
+            folder (str): Tenant folder the query was asked against.
+            embedding (array-like): Query embedding.
+            k (int): Number of retrieved chunks the answer was produced with.
+            version (int, optional): Current index version of the folder. Defaults to 0.
+
+        Returns:
+            dict | None: The cached answer, or None on a miss.
+        """
+
+        query = self._normalize(embedding)
+        with self._lock:
+            self._drop_stale(folder, version)
+            ids = self._by_folder.get(folder)
+            if not ids:
+                self._count(folder, hit=False)
+                return None
+
+            matrix = self._matrices.get(folder)
+            if matrix is None:
+                matrix = np.stack([self._entries[i].embedding for i in ids])
+                self._matrices[folder] = matrix
+            similarities = matrix @ query
+            for position in np.argsort(-similarities):
+                if similarities[position] < self.threshold:
+                    break
+                entry_id = ids[position]
+                if self._entries[entry_id].k == k:
+                    self._entries.move_to_end(entry_id)
+                    self._count(folder, hit=True)
+                    return self._entries[entry_id].value
+
+            self._count(folder, hit=False)
+            return None
+
+
+    def put(self, folder: str, embedding, k: int, value: dict, version: int = 0):
+        """Store an answer for a query embedding, evicting LRU entries beyond the caps.
+
+        Args:
+            folder (str): Tenant folder the query was asked against.
+            embedding (array-like): Query embedding.
+            k (int): Number of retrieved chunks the answer was produced with.
+            value (dict): The answer to cache.
+            version (int, optional): Index version of the folder the answer was produced with. Defaults to 0.
+        """
+
+        vector = self._normalize(embedding)
+        nbytes = vector.nbytes + _approx_nbytes(value)
+        if nbytes > self.max_bytes:
+            return
+
+        with self._lock:
+            self._drop_stale(folder, version)
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = CacheEntry(folder, k, vector, value, version, time.monotonic(), nbytes)
+            self._by_folder.setdefault(folder, []).append(entry_id)
+            self._matrices.pop(folder, None)
+            self._nbytes += nbytes
+
+            while len(self._entries) > self.max_entries or self._nbytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+
+    def invalidate(self, folder: str):
+        """Drop every cached answer of a folder, e.g. after it has been re-indexed."""
+
+        with self._lock:
+            for entry_id in list(self._by_folder.get(folder, [])):
+                self._remove(entry_id)
+
+
+    def folder_nbytes(self, folder: str) -> int:
+        """Approximate memory held by a folder's cached answers."""
+
+        with self._lock:
+            return sum(self._entries[i].nbytes for i in self._by_folder.get(folder, []))
+
+
+    def stats(self) -> dict:
+        """Return hit/miss/eviction counters and current size, with the hits and misses of each folder
+        under "folders"."""
+
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._nbytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "folders": {folder: dict(lookups) for folder, lookups in self._folder_lookups.items()},
+            }
+
+
+class TranslationCache:
+    def __init__(self, max_entries: int = 5000, ttl_seconds: float = 7 * 24 * 3600, path: str = None):
+        """Bounded cache of query translations keyed by (normalized text, target language, model).
+
+        Entries expire after `ttl_seconds` and beyond `max_entries` the least recently used ones are
+        evicted. With a `path`, every new translation is appended to a JSONL file that `load` reads back
+        on the next start, so the cache survives restarts.
+
+        Args:
+            max_entries (int, optional): Maximum number of translations kept. Defaults to 5000.
+            ttl_seconds (float, optional): Translation lifetime, in wall-clock seconds. Defaults to 7 days.
+            path (str, optional): JSONL file persisting the cache. Defaults to None (memory only).
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.path = path
+        self._entries: OrderedDict[tuple, tuple[str, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+
+    @staticmethod
+    def _key(text: str, target_language: str, model: str) -> tuple:
+        return (" ".join(text.lower().split()), (target_language or "").lower(), model or "")
+
+
+    def _insert(self, key: tuple, translation: str, created: float):
+        self._entries[key] = (translation, created)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+    def get(self, text: str, target_language: str, model: str) -> str | None:
+        """Return the cached translation of `text`, or None on a miss."""
+
+        key = self._key(text, target_language, model)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[1] > self.ttl_seconds:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+
+    def put(self, text: str, target_language: str, model: str, translation: str):
+        """Store a translation, appending it to the persistence file when there is one."""
+
+        key = self._key(text, target_language, model)
+        created = time.time()
+        with self._lock:
+            self._insert(key, translation, created)
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"text": key[0], "target": key[1], "model": key[2],
+                                        "translation": translation, "created": created}, ensure_ascii=False) + "\n")
+
+
+    def load(self, path: str = None) -> int:
+        """Warm the cache from a JSONL file, by default the persistence file.
+
+        Each line holds "text", "target", "model" and "translation", and optionally "created" (epoch
+        seconds; lines without it count as fresh). Query logs in that format can be loaded the same
+        way. Expired and malformed lines are skipped. Loading the persistence file also compacts it to
+        the entries kept.
+
+        Args:
+            path (str, optional): File to read. Defaults to `self.path`.
+
+        Returns:
+            int: Number of translations loaded.
+        """
+
+        path = path or self.path
+        if not path or not os.path.exists(path):
+            return 0
+
+        now = time.time()
+        loaded = 0
+        with self._lock:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        created = float(record.get("created", now))
+                        key = self._key(record["text"], record["target"], record.get("model"))
+                        translation = record["translation"]
+                    except (ValueError, KeyError, TypeError, AttributeError):
+                        continue
+                    if now - created > self.ttl_seconds or not translation:
+                        continue
+                    self._insert(key, translation, created)
+                    loaded += 1
+
+            if path == self.path:
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    for (text, target, model), (translation, created) in self._entries.items():
+                        f.write(json.dumps({"text": text, "target": target, "model": model,
+                                            "translation": translation, "created": created}, ensure_ascii=False) + "\n")
+                os.replace(tmp_path, path)
+        return loaded
+
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and current size."""
+
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,122 @@
+import numpy as np
+from outils.dataset import Data
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token count estimate used for prompt budgeting.
+
+    Uses the common ~4 characters per token ratio of BPE tokenizers on Latin scripts,
+    which is accurate enough to size a prompt without loading a tokenizer.
+
+    Args:
+        text (str): Input text.
+
+    Returns:
+        int: Estimated number of tokens.
+    """
+
+    if not text:
+        return 0
+    return (len(text) + 3) // 4
+
+
+class ContextAssembler:
+    def __init__(self, data: Data, token_budget: int = 3000, neighbors: int = 1):
+        """Pack retrieved chunks, optionally widened with their neighbors, under a token budget.
+
+        Args:
+            data (Data): Data container with flat `chunks`, `metadata` and `documents`.
+            token_budget (int, optional): Maximum estimated tokens of context. Defaults to 3000.
+            neighbors (int, optional): Number of adjacent chunks, on each side of a hit and within
+                the same document, to merge into its passage. Defaults to 1.
+        """
+        self.data = data
+        self.token_budget = token_budget
+        self.neighbors = neighbors
+
+
+    def _window(self, chunk_index: int) -> list[int]:
+        """Return the hit followed by its neighbors (closest first), restricted to its own document."""
+
+        metadata = self.data.metadata
+        doc_id = metadata.doc_ids[chunk_index]
+        n_chunks = len(metadata)
+        window = [chunk_index]
+        for distance in range(1, self.neighbors + 1):
+            for j in (chunk_index - distance, chunk_index + distance):
+                if 0 <= j < n_chunks and metadata.doc_ids[j] == doc_id:
+                    window.append(j)
+        return window
+
+
+    def assemble(self, indices: np.ndarray, scores: np.ndarray) -> tuple[list[dict], dict]:
+        """Select chunks for the prompt and merge adjacent ones into passages.
+
+        Hits are kept in rank order as long as the token budget allows it. The remaining budget then
+        goes to the neighbors of the kept hits, closest first and in rank order; hits the budget
+        dropped are not expanded. Selected chunks that are contiguous within a document are merged
+        into a single passage.
+
+        Args:
+            indices (numpy.ndarray): Chunk indices, best match first.
+            scores (numpy.ndarray): Score of each hit, aligned with `indices`.
+
+        Returns:
+            tuple: (passages, metrics)
+                - passages (list[dict]): Items with "source", "text", "score" and "chunks", best first.
+                - metrics (dict): "context_tokens", "full_page_tokens", "tokens_saved",
+                  "chunks_used" and "token_budget".
+        """
+
+        metadata = self.data.metadata
+        chunk_tokens = {}
+        rank_of = {}
+        used = 0
+
+        def add(j, rank, score) -> bool:
+            nonlocal used
+            if j in chunk_tokens:
+                return False
+            tokens = estimate_tokens(self.data.chunks[j])
+            if used + tokens > self.token_budget:
+                return False
+            chunk_tokens[j] = tokens
+            rank_of[j] = (rank, score)
+            used += tokens
+            return True
+
+        kept = [(rank, int(i), float(score)) for rank, (i, score) in enumerate(zip(indices, scores))
+                if add(int(i), rank, float(score))]
+        for rank, i, score in kept:
+            for j in self._window(i)[1:]:
+                add(j, rank, score)
+
+        # Merge contiguous chunks of the same document
+        runs = []
+        for j in sorted(chunk_tokens):
+            if runs and runs[-1][-1] == j - 1 and metadata.doc_ids[j] == metadata.doc_ids[j - 1]:
+                runs[-1].append(j)
+            else:
+                runs.append([j])
+
+        ranked = []
+        for run in runs:
+            rank, score = min(rank_of[j] for j in run)
+            ranked.append((rank, {
+                "source": metadata.url(run[0]),
+                "text": " ".join(self.data.chunks[j] for j in run),
+                "score": score,
+                "chunks": run,
+            }))
+        passages = [passage for _, passage in sorted(ranked, key=lambda item: item[0])]
+
+        documents = self.data.documents or {}
+        full_page_tokens = sum(estimate_tokens(documents.get(url, "")) for url in {p["source"] for p in passages})
+        metrics = {
+            "context_tokens": used,
+            "full_page_tokens": full_page_tokens,
+            "tokens_saved": max(full_page_tokens - used, 0),
+            "chunks_used": len(chunk_tokens),
+            "token_budget": self.token_budget,
+        }
+        return passages, metrics
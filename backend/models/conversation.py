@@ -0,0 +1,133 @@
+import sys
+import time
+import threading
+from collections import OrderedDict, deque
+from .context import estimate_tokens
+
+
+class ConversationStore:
+    def __init__(self, max_turns: int = 4, token_budget: int = 800, max_sessions: int = 10000,
+                 idle_ttl_seconds: float = 3600):
+        """Bounded per-session conversation history.
+
+        Each session keeps at most `max_turns` (question, answer) pairs. When the history is rendered
+        for a prompt, only the most recent turns fitting in `token_budget` estimated tokens are kept.
+        Sessions idle for more than `idle_ttl_seconds` are dropped, and beyond `max_sessions` the least
+        recently used session is evicted.
+
+        Args:
+            max_turns (int, optional): Turns kept per session. Defaults to 4.
+            token_budget (int, optional): Maximum estimated tokens of rendered history. Defaults to 800.
+            max_sessions (int, optional): Maximum number of live sessions. Defaults to 10000.
+            idle_ttl_seconds (float, optional): Idle time after which a session expires. Defaults to 3600.
+        """
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.max_sessions = max_sessions
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self._sessions: OrderedDict[tuple, deque] = OrderedDict()
+        self._last_seen: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+
+    def _expire(self, now: float):
+        # Sessions are kept in LRU order, so expired ones are at the front
+        while self._sessions:
+            key = next(iter(self._sessions))
+            if now - self._last_seen[key] <= self.idle_ttl_seconds:
+                break
+            del self._sessions[key]
+            del self._last_seen[key]
+            self.evictions += 1
+
+
+    def history(self, folder: str, session_id: str) -> list[tuple[str, str]]:
+        """Return the most recent turns of a session that fit in the token budget, oldest first.
+
+        Args:
+            folder (str): Tenant folder the session talks to.
+            session_id (str): Client session identifier. None means no history.
+
+        Returns:
+            list[tuple[str, str]]: (question, answer) pairs.
+        """
+
+        if not session_id:
+            return []
+        key = (folder, session_id)
+        with self._lock:
+            self._expire(time.monotonic())
+            turns = list(self._sessions.get(key, ()))
+
+        kept = []
+        used = 0
+        for question, answer in reversed(turns):
+            tokens = estimate_tokens(question) + estimate_tokens(answer)
+            if used + tokens > self.token_budget:
+                break
+            kept.append((question, answer))
+            used += tokens
+        kept.reverse()
+        return kept
+
+
+    def format_history(self, folder: str, session_id: str) -> str:
+        """Render the session history for the prompt; empty string when there is none."""
+
+        return "\n".join(f"Q: {q}\nA: {a}" for q, a in self.history(folder, session_id))
+
+
+    def append(self, folder: str, session_id: str, question: str, answer: str):
+        """Record a turn for a session, evicting idle or least recently used sessions.
+
+        Args:
+            folder (str): Tenant folder the session talks to.
+            session_id (str): Client session identifier. Nothing is recorded when None.
+            question (str): The user question.
+            answer (str): The generated answer.
+        """
+
+        if not session_id:
+            return
+        key = (folder, session_id)
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            turns = self._sessions.get(key)
+            if turns is None:
+                turns = self._sessions[key] = deque(maxlen=self.max_turns)
+            self._sessions.move_to_end(key)
+            self._last_seen[key] = now
+            turns.append((question, answer))
+
+            while len(self._sessions) > self.max_sessions:
+                oldest, _ = self._sessions.popitem(last=False)
+                del self._last_seen[oldest]
+                self.evictions += 1
+
+
+    def clear(self, folder: str, session_id: str):
+        """Forget a session."""
+
+        with self._lock:
+            self._sessions.pop((folder, session_id), None)
+            self._last_seen.pop((folder, session_id), None)
+
+
+    def folder_nbytes(self, folder: str) -> int:
+        """Approximate memory held by the sessions of a folder."""
+
+        with self._lock:
+            return sum(
+                sys.getsizeof(q) + sys.getsizeof(a)
+                for (f, _), turns in self._sessions.items() if f == folder
+                for q, a in turns
+            )
+
+
+    def stats(self) -> dict:
+        """Return the number of live sessions and evictions."""
+
+        with self._lock:
+            return {"sessions": len(self._sessions), "evictions": self.evictions}
@@ -1,5 +1,5 @@
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from fireworks.client import Fireworks
+from fireworks.client import Fireworks, AsyncFireworks
 from outils.dataset import Data
 import numpy as np
 from tqdm import tqdm
@@ -15,6 +15,7 @@ class Embeddings:
     def __init__(self, data:Data, model_embedding_name="nomic-ai/nomic-embed-text-v1.5"):
         self.data = data
         self.model_embedding_name=model_embedding_name
+        self._async_client = None
 
 
     def flat_chunks_and_sources(self):
@@ -145,4 +146,32 @@ class Embeddings:
                 return response.data[0].embedding
             except Exception as e:
                 logger.error(f"Error embedding query '{query}': {e}")
-                raise e
\ No newline at end of file
+                raise e
+
+
+    async def afireworks_encoding_query(self, query):
+        """Async counterpart of `fireworks_encoding_query`.
+
+        One async client is kept per instance so that concurrent queries share its connection pool.
+
+        Args:
+            query (str): The input text to be embedded.
+
+        Returns:
+            (list[float]): result of embeddings.
+        """
+        if not query or not query.strip():
+            logger.warning("Empty query provided for embedding.")
+            return np.zeros(768)
+
+        if self._async_client is None:
+            self._async_client = AsyncFireworks(api_key=self.data.fireworks_api_key)
+        try:
+            response = await self._async_client.embeddings.acreate(
+                model=self.model_embedding_name,
+                input=query
+            )
+            return response.data[0].embedding
+        except Exception as e:
+            logger.error(f"Error embedding query '{query}': {e}")
+            raise e
@@ -1,24 +1,211 @@
+import itertools
 import faiss
 import numpy as np
-from outils.dataset import Data
+from outils.dataset import Data, ChunkMetadata, flatten_chunks
 from .embeddings import Embeddings
 
+
+# Process-wide counter so that a rebuilt index never reuses the version of a previous one
+_index_versions = itertools.count(1)
+
+
+def maximal_marginal_relevance(query_embedding, candidate_embeddings, k=3, lambda_mult=0.5):
+    """Select a relevant but diverse subset of candidates with Maximal Marginal Relevance.
+
+    At each step the candidate maximizing
+    `lambda_mult * sim(query, c) - (1 - lambda_mult) * max(sim(c, selected))` is picked.
+    Similarities are cosine similarities. The running max-similarity vector is updated with one
+    matrix-vector product per step, so the cost is O(k * n * dim) for n candidates.
+
+    Args:
+        query_embedding (numpy.ndarray): Query vector of shape (dim,) or (1, dim).
+        candidate_embeddings (numpy.ndarray): Candidate vectors of shape (n, dim).
+        k (int, optional): Number of candidates to select. Defaults to 3.
+        lambda_mult (float, optional): 1 favors relevance only, 0 favors diversity only. Defaults to 0.5.
+
+    Returns:
+        numpy.ndarray: Positions of the selected candidates in `candidate_embeddings`, in selection order.
+    """
+
+    candidates = np.asarray(candidate_embeddings, dtype=np.float32)
+    n = candidates.shape[0]
+    k = min(k, n)
+    if k <= 0:
+        return np.array([], dtype=np.int64)
+
+    query = np.asarray(query_embedding, dtype=np.float32).reshape(-1)
+    norms = np.linalg.norm(candidates, axis=1)
+    norms[norms == 0] = 1.0
+    candidates = candidates / norms[:, None]
+    query_norm = np.linalg.norm(query)
+    relevance = candidates @ (query / query_norm if query_norm else query)
+
+    selected = np.empty(k, dtype=np.int64)
+    selected[0] = int(np.argmax(relevance))
+    max_similarity = candidates @ candidates[selected[0]]
+    available = np.ones(n, dtype=bool)
+    available[selected[0]] = False
+
+    for step in range(1, k):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * max_similarity
+        scores[~available] = -np.inf
+        j = int(np.argmax(scores))
+        selected[step] = j
+        available[j] = False
+        np.maximum(max_similarity, candidates @ candidates[j], out=max_similarity)
+
+    return selected
+
+
 class Faiss:
-    def __init__(self, data:Data, embeddings:Embeddings):
+    def __init__(self, data:Data, embeddings:Embeddings, metric="l2"):
+        """Manage the FAISS index built over `data.embeddings`.
+
+        Args:
+            data (Data): Shared data container holding embeddings, sources and the index.
+            embeddings (Embeddings): Embedding client used to encode queries.
+            metric (str, optional): "l2" for Euclidean distance or "ip" for inner product on
+                L2-normalized vectors (cosine similarity). Defaults to "l2".
+        """
+        if metric not in ("l2", "ip"):
+            raise ValueError(f"metric '{metric}' not supported. Supported: ['ip', 'l2']")
         self.data = data
         self.embeddings = embeddings
+        self.metric = metric
 
 
     def create_faiss_index(self):
         """Create a FAISS index for embeddings and add vectors to it.
 
         The method expects `self.data.embeddings` to be a 2D numpy array of shape (n_vectors, dim).
-        After creation, the index is stored in `self.data.index`.
+        With the "ip" metric the embeddings are converted to float32 and L2-normalized once, in place,
+        so that inner products are cosine similarities. After creation, the index is stored in `self.data.index`
+        with a new `self.data.index_version`, and `self.data.sources` has been converted into the compact
+        `self.data.metadata` table. Nested per-document chunk lists are flattened so that
+        `self.data.chunks[i]` is the text of vector `i`. `self.data.store_version` is cleared, since the
+        index is no longer the one mapped from the tenant store.
+        """
+
+        self.chunk_metadata()
+        self.data.chunks = flatten_chunks(self.data.chunks)
+        embeddings = np.ascontiguousarray(self.data.embeddings, dtype=np.float32)
+        dimension = embeddings.shape[1]
+        if self.metric == "ip":
+            faiss.normalize_L2(embeddings)
+            self.data.embeddings = embeddings
+            self.data.index = faiss.IndexFlatIP(dimension)
+        else:
+            self.data.index = faiss.IndexFlatL2(dimension)
+        self.data.index.add(embeddings)
+        self.data.index_version = next(_index_versions)
+        self.data.store_version = None
+        self.data.index_mapped = False
+
+
+    def chunk_metadata(self) -> ChunkMetadata:
+        """Return the integer-coded chunk table, building it from `self.data.sources` when needed.
+
+        A freshly loaded `sources` list takes precedence over an existing table. Once converted, the
+        list is released so that only the compact arrays stay resident.
+
+        Returns:
+            ChunkMetadata: Chunk to document mapping aligned with the index.
+        """
+
+        if self.data.sources is not None:
+            self.data.metadata = ChunkMetadata.from_sources(self.data.sources)
+            self.data.sources = None
+        return self.data.metadata
+
+
+    def encode_query(self, query) -> np.ndarray:
+        """Embed a query into a (1, dim) float32 array ready for `index.search`.
+
+        Args:
+            query (str): User query text.
+
+        Returns:
+            numpy.ndarray: Query embedding, L2-normalized when the metric is "ip".
+        """
+
+        return self._query_vector(self.embeddings.fireworks_encoding_query(query))
+
+
+    async def aencode_query(self, query) -> np.ndarray:
+        """Async counterpart of `encode_query`, using the async embedding client."""
+
+        return self._query_vector(await self.embeddings.afireworks_encoding_query(query))
+
+
+    def _query_vector(self, embedding) -> np.ndarray:
+        query_embedding = np.array(embedding, dtype=np.float32)
+        query_embedding = query_embedding.reshape((1, query_embedding.shape[0]))
+        if self.metric == "ip":
+            faiss.normalize_L2(query_embedding)
+        return query_embedding
+
+
+    def search_with_scores(self, query, k=3, score_threshold=None):
+        """Search the index and return the matching chunk indices with their scores.
+
+        Args:
+            query (str): User query text.
+            k (int, optional): Number of nearest chunks to retrieve. Defaults to 3.
+            score_threshold (float, optional): With "ip", drop hits whose cosine similarity is below
+                the threshold. With "l2", drop hits whose distance is above it. Defaults to None.
+
+        Returns:
+            tuple: (indices, scores)
+                - indices (numpy.ndarray): Chunk indices, best match first.
+                - scores (numpy.ndarray): Cosine similarity ("ip") or squared L2 distance ("l2") of each hit.
+        """
+
+        return self.search_by_vector(self.encode_query(query), k=k, score_threshold=score_threshold)
+
+
+    def search_by_vector(self, query_embedding, k=3, score_threshold=None):
+        """Same as `search_with_scores` for an already encoded query (see `encode_query`)."""
+
+        scores, indices = self.data.index.search(query_embedding, k=k)
+        scores, indices = np.asarray(scores[0]), np.asarray(indices[0])
+
+        keep = indices >= 0
+        if score_threshold is not None:
+            if self.metric == "ip":
+                keep &= scores >= score_threshold
+            else:
+                keep &= scores <= score_threshold
+        return indices[keep], scores[keep]
+
+
+    def search_mmr(self, query, k=3, fetch_k=20, lambda_mult=0.5, score_threshold=None):
+        """Over-fetch candidates from the index, then keep a diverse top-k with MMR.
+
+        Candidate vectors are read from `self.data.embeddings`, so no extra embedding call is made.
+
+        Args:
+            query (str): User query text.
+            k (int, optional): Number of chunks to return. Defaults to 3.
+            fetch_k (int, optional): Number of candidates fetched from the index. Defaults to 20.
+            lambda_mult (float, optional): Relevance/diversity trade-off, see `maximal_marginal_relevance`.
+                Defaults to 0.5.
+            score_threshold (float, optional): Similarity cutoff applied to candidates, see
+                `search_with_scores`. Defaults to None.
+
+        Returns:
+            tuple: (indices, scores) of the selected chunks, in selection order.
         """
 
-        dimension = self.data.embeddings.shape[1]
-        self.data.index = faiss.IndexFlatL2(dimension)
-        self.data.index.add(np.array(self.data.embeddings))
+        return self.search_mmr_by_vector(self.encode_query(query), k=k, fetch_k=fetch_k, lambda_mult=lambda_mult,
+                                         score_threshold=score_threshold)
+
+
+    def search_mmr_by_vector(self, query_embedding, k=3, fetch_k=20, lambda_mult=0.5, score_threshold=None):
+        """Same as `search_mmr` for an already encoded query (see `encode_query`)."""
+
+        indices, scores = self.search_by_vector(query_embedding, k=max(fetch_k, k), score_threshold=score_threshold)
+        selected = maximal_marginal_relevance(query_embedding, self.data.embeddings[indices], k=k, lambda_mult=lambda_mult)
+        return indices[selected], scores[selected]
 
 
     def search_similar_context(self, query, k=3):
@@ -34,28 +221,47 @@ class Faiss:
                 - indices_set (set): Set of source URLs corresponding to the retrieved contexts.
         """
 
-        query_embedding = np.array(self.embeddings.fireworks_encoding_query(query))
-        query_embedding = query_embedding.reshape((1, query_embedding.shape[0]))
-        _, indices = self.data.index.search(query_embedding, k=k)
-        indices_documents = set([self.data.sources[i] for i in indices[0]])
+        indices, _ = self.search_with_scores(query, k=k)
+        metadata = self.chunk_metadata()
+        doc_ids, _ = metadata.unique_doc_ids(indices)
+        indices_documents = set([metadata.urls[d] for d in doc_ids])
         context_selected = " ".join([" ".join(self.data.documents[index]) for index in indices_documents])
 
         return context_selected, indices_documents
-    
-    def search_similar_documents(self, query, k=3):
+
+    def search_similar_documents(self, query, k=3, score_threshold=None):
         """Retrieve the most relevant context for a given query.
 
         Args:
             query (str): User query text.
             k (int, optional): Number of most similar documents to retrieve. Defaults to 3.
+            score_threshold (float, optional): Similarity cutoff, see `search_with_scores`. Defaults to None.
 
         Returns:
             set: Set of source URLs corresponding to the retrieved contexts.
         """
 
-        query_embedding = np.array(self.embeddings.fireworks_encoding_query(query))
-        query_embedding = query_embedding.reshape((1, query_embedding.shape[0]))
-        _, indices = self.data.index.search(query_embedding, k=k)
-        indices_documents = set([self.data.sources[i] for i in indices[0]])
+        indices, _ = self.search_with_scores(query, k=k, score_threshold=score_threshold)
+        metadata = self.chunk_metadata()
+        doc_ids, _ = metadata.unique_doc_ids(indices)
+        indices_documents = set([metadata.urls[d] for d in doc_ids])
+
+        return indices_documents
+
+    def search_documents_with_scores(self, query, k=3, score_threshold=None):
+        """Retrieve the most relevant source URLs together with their best chunk score.
+
+        Args:
+            query (str): User query text.
+            k (int, optional): Number of nearest chunks to retrieve. Defaults to 3.
+            score_threshold (float, optional): Similarity cutoff, see `search_with_scores`. Defaults to None.
+
+        Returns:
+            dict: Mapping of source URL to the score of its best matching chunk, best first.
+        """
+
+        indices, scores = self.search_with_scores(query, k=k, score_threshold=score_threshold)
+        metadata = self.chunk_metadata()
+        doc_ids, positions = metadata.unique_doc_ids(indices)
 
-        return indices_documents
\ No newline at end of file
+        return {metadata.urls[d]: float(s) for d, s in zip(doc_ids, scores[positions])}
@@ -0,0 +1,197 @@
+import math
+import time
+import threading
+from contextlib import contextmanager
+
+
+# Latency buckets in seconds, from a cached lookup to a slow LLM call
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _escape(value) -> str:
+    return _escape_help(str(value)).replace('"', '\\"')
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: tuple) -> dict:
+        return dict(zip(self.labelnames, key))
+
+    def samples(self) -> list[tuple[str, dict, float]]:
+        """Return the (name, labels, value) samples of the metric, ordered by labels."""
+
+        with self._lock:
+            return [(self.name, self._labels(key), value) for key, value in sorted(self._values.items())]
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels) -> float | None:
+        with self._lock:
+            return self._values.get(self._key(labels))
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the `with` block, in seconds, whether it raises or not."""
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            counts, _ = self._values.get(self._key(labels), ([0] * len(self.buckets), 0.0))
+            return counts[-1]
+
+    def samples(self) -> list[tuple[str, dict, float]]:
+        with self._lock:
+            samples = []
+            for key, (counts, total) in sorted(self._values.items()):
+                labels = self._labels(key)
+                for bound, count in zip(self.buckets, counts):
+                    samples.append((f"{self.name}_bucket", {**labels, "le": _format_value(float(bound))}, count))
+                samples.append((f"{self.name}_sum", labels, total))
+                samples.append((f"{self.name}_count", labels, counts[-1]))
+            return samples
+
+
+class MetricsRegistry:
+    def __init__(self):
+        """Counters, gauges and histograms of this process, rendered in the Prometheus text format.
+
+        Metrics are declared once, usually at import, with `counter`, `gauge` or `histogram`; declaring
+        an existing name again returns the existing metric. Values owned by other components (cache
+        and registry statistics) are read at scrape time by the callbacks added with `collector`.
+        """
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+
+    def _register(self, cls, name: str, documentation: str, labelnames: tuple, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} is already declared as a {metric.type} with labels {metric.labelnames}")
+            return metric
+
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+
+    def collector(self, callback):
+        """Add a scrape-time source of metrics.
+
+        Args:
+            callback (callable): `callback()` returns a list of (name, type, documentation, samples)
+                tuples, where samples is a list of (labels dict, value).
+        """
+        with self._lock:
+            self._collectors.append(callback)
+
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text exposition format (version 0.0.4)."""
+
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+
+        families = [(m.name, m.type, m.documentation, m.samples()) for m in metrics]
+        for callback in collectors:
+            for name, type_, documentation, samples in callback():
+                families.append((name, type_, documentation, [(name, labels, value) for labels, value in samples]))
+
+        lines = []
+        for name, type_, documentation, samples in families:
+            lines.append(f"# HELP {name} {_escape_help(documentation)}")
+            lines.append(f"# TYPE {name} {type_}")
+            for sample_name, labels, value in samples:
+                lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry served by the /metrics endpoint
+REGISTRY = MetricsRegistry()
@@ -0,0 +1,181 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable
+from .singleflight import SingleFlight
+
+
+class ModelRegistry:
+    def __init__(self, loader: Callable[[str], Any], sizer: Callable[[Any], int], max_bytes: int):
+        """Per-folder models kept in memory under a RAM budget, evicted least recently used first.
+
+        Models are registered by the pipeline with `put`, or loaded from their stored artifacts by
+        `loader` the first time `get_or_load` asks for a folder that is not resident; concurrent first
+        requests for the same folder share a single load. Each model's size is measured with `sizer`
+        when it is added, and again on `resize` after it has been modified.
+        Once the total exceeds `max_bytes`, the least recently used models are dropped; the most recent
+        one is always kept, even when it alone is over budget.
+
+        Args:
+            loader (callable): `loader(folder)` builds the model of a folder, raising when it cannot.
+            sizer (callable): `sizer(model)` returns the memory held by a model, in bytes.
+            max_bytes (int): Memory budget for all registered models.
+        """
+        self.loader = loader
+        self.sizer = sizer
+        self.max_bytes = max_bytes
+        self._models: OrderedDict[str, Any] = OrderedDict()
+        self._sizes: dict[str, int] = {}
+        self._lock = threading.RLock()
+        self._loads = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.evictions = 0
+
+
+    def __contains__(self, folder: str) -> bool:
+        with self._lock:
+            return folder in self._models
+
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._models)
+
+
+    def __setitem__(self, folder: str, model):
+        self.put(folder, model)
+
+
+    def keys(self) -> list[str]:
+        with self._lock:
+            return list(self._models)
+
+
+    def get(self, folder: str, default=None):
+        """Return a resident model without loading it (dict-like), marking it recently used."""
+
+        with self._lock:
+            model = self._models.get(folder)
+            if model is None:
+                return default
+            self._models.move_to_end(folder)
+            return model
+
+
+    def get_or_load(self, folder: str):
+        """Return the model of a folder, loading it from its stored artifacts if it is not resident.
+
+        Args:
+            folder (str): Folder of the tenant.
+
+        Returns:
+            The model.
+
+        Raises:
+            Exception: Whatever `loader` raises when the folder cannot be loaded.
+        """
+
+        with self._lock:
+            model = self._models.get(folder)
+            if model is not None:
+                self._models.move_to_end(folder)
+                self.hits += 1
+                return model
+            self.misses += 1
+
+        model, _ = self._loads.do(folder, lambda: self._load(folder))
+        return model
+
+
+    def _load(self, folder: str):
+        model = self.loader(folder)
+        with self._lock:
+            self.loads += 1
+            # The pipeline may have registered the folder meanwhile: keep the resident one
+            resident = self._models.get(folder)
+            if resident is not None:
+                self._models.move_to_end(folder)
+                return resident
+        self.put(folder, model)
+        return model
+
+
+    def recent(self) -> list[str]:
+        """Return the resident folders, most recently used first."""
+
+        with self._lock:
+            return list(reversed(self._models))
+
+
+    def resident(self) -> list[tuple[str, Any, int]]:
+        """Return (folder, model, accounted bytes) of the resident models, most recently used first.
+
+        Unlike `get`, this does not mark the models as used, so monitoring does not alter evictions.
+        """
+
+        with self._lock:
+            return [(folder, self._models[folder], self._sizes.get(folder, 0)) for folder in reversed(self._models)]
+
+
+    def put(self, folder: str, model):
+        """Register (or replace) the model of a folder, then evict beyond the budget."""
+
+        size = self.sizer(model)
+        with self._lock:
+            self._models[folder] = model
+            self._models.move_to_end(folder)
+            self._sizes[folder] = size
+            self._evict()
+
+
+    def resize(self, folder: str):
+        """Measure a resident model again after it has been modified, then evict beyond the budget."""
+
+        with self._lock:
+            model = self._models.get(folder)
+        if model is None:
+            return
+        size = self.sizer(model)
+        with self._lock:
+            if self._models.get(folder) is model:
+                self._sizes[folder] = size
+                self._evict()
+
+
+    def pop(self, folder: str, default=None):
+        """Unregister a folder's model."""
+
+        with self._lock:
+            self._sizes.pop(folder, None)
+            return self._models.pop(folder, default)
+
+
+    @property
+    def nbytes(self) -> int:
+        with self._lock:
+            return sum(self._sizes.values())
+
+
+    def _evict(self):
+        total = sum(self._sizes.values())
+        while total > self.max_bytes and len(self._models) > 1:
+            folder, _ = self._models.popitem(last=False)
+            total -= self._sizes.pop(folder)
+            self.evictions += 1
+
+
+    def stats(self) -> dict:
+        """Return hit/miss/load/eviction counters, memory use and the size of each resident model."""
+
+        with self._lock:
+            return {
+                "models": len(self._models),
+                "bytes": sum(self._sizes.values()),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "sizes": dict(self._sizes),
+            }
@@ -0,0 +1,145 @@
+import time
+import asyncio
+import threading
+from collections import deque
+import numpy as np
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when every model able to serve a call has its circuit open."""
+
+
+class LatencyTracker:
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        """Rolling window of call latencies, used to derive the hedging delay.
+
+        Args:
+            window (int, optional): Number of recent latencies kept. Defaults to 200.
+            min_samples (int, optional): Samples needed before `percentile` returns a value. Defaults to 20.
+        """
+        self.min_samples = min_samples
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._latencies.append(seconds)
+
+
+    def percentile(self, q: float) -> float | None:
+        """Return the q-th percentile of recent latencies in seconds, or None with too few samples."""
+
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            return float(np.percentile(np.fromiter(self._latencies, dtype=np.float64), q))
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, reset_timeout_s: float = 30):
+        """Stop calling a failing model for a while.
+
+        After `failure_threshold` consecutive failures the circuit opens and calls are refused. Once
+        `reset_timeout_s` has elapsed a single trial call is let through (half-open): its success
+        closes the circuit, its failure opens it again.
+
+        Args:
+            failure_threshold (int, optional): Consecutive failures opening the circuit. Defaults to 5.
+            reset_timeout_s (float, optional): Time before a trial call is allowed. Defaults to 30.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_s = reset_timeout_s
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            if time.monotonic() - self.opened_at >= self.reset_timeout_s:
+                return "half_open"
+            return "open"
+
+
+    def allow(self) -> bool:
+        """Return whether a call may be made now."""
+
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_timeout_s or self._trial:
+                return False
+            self._trial = True
+            return True
+
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial = False
+
+
+async def hedged_call(factory, timeout: float = None, hedge_delay: float = None):
+    """Await `factory()` under a deadline, sending a second identical request if the first is slow.
+
+    When `hedge_delay` elapses without an answer, a second request is started and the first one to
+    succeed wins; the other is cancelled. A request failing leaves the other one running.
+
+    Args:
+        factory (callable): Returns a new awaitable for the request each time it is called.
+        timeout (float, optional): Deadline in seconds for the whole call. Defaults to None (no deadline).
+        hedge_delay (float, optional): Delay before the hedged request. Defaults to None (no hedging).
+
+    Returns:
+        The result of the first successful request.
+
+    Raises:
+        asyncio.TimeoutError: When no request succeeded before the deadline.
+    """
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    deadline = None if timeout is None else start + timeout
+    hedge_at = None if hedge_delay is None else start + hedge_delay
+    if hedge_at is not None and deadline is not None and hedge_at >= deadline:
+        hedge_at = None
+
+    tasks = {asyncio.ensure_future(factory())}
+    error = None
+    try:
+        while tasks:
+            wake = min((t for t in (hedge_at, deadline) if t is not None), default=None)
+            done, tasks = await asyncio.wait(
+                tasks,
+                timeout=None if wake is None else max(wake - loop.time(), 0),
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+
+            now = loop.time()
+            if deadline is not None and now >= deadline:
+                raise asyncio.TimeoutError(f"No answer within {timeout}s")
+            if hedge_at is not None and now >= hedge_at:
+                tasks.add(asyncio.ensure_future(factory()))
+                hedge_at = None
+        raise error
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,98 @@
+import asyncio
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        """Coalesce concurrent calls sharing a key into a single execution.
+
+        While a call for a key is in flight, later callers with the same key wait for it and share its
+        result (or its exception) instead of running their own. Nothing is kept once the call
+        completes, so this is not a cache. `do` serves threads, `ado` serves coroutines on one event loop.
+        """
+        self._calls: dict = {}
+        self._tasks: dict = {}
+        self._lock = threading.Lock()
+        self.executions = 0
+        self.coalesced = 0
+
+
+    def do(self, key, fn):
+        """Run `fn()` once for all concurrent callers of `key`.
+
+        Args:
+            key (hashable): Identity of the call.
+            fn (callable): Function computing the result.
+
+        Returns:
+            tuple: (value, shared) where `shared` is True for callers that waited on another's call.
+        """
+
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value, True
+
+        try:
+            call.value = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.value, False
+
+
+    async def ado(self, key, factory):
+        """Async counterpart of `do`: await `factory()` once for all concurrent callers of `key`.
+
+        The shared computation runs as its own task, so a caller being cancelled (e.g. a client
+        disconnecting) does not cancel it for the others.
+
+        Args:
+            key (hashable): Identity of the call.
+            factory (callable): Returns the coroutine computing the result.
+
+        Returns:
+            tuple: (value, shared) as for `do`.
+        """
+
+        task = self._tasks.get(key)
+        shared = task is not None
+        if shared:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(factory())
+            self._tasks[key] = task
+            self.executions += 1
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        return await asyncio.shield(task), shared
+
+
+    def stats(self) -> dict:
+        """Return the number of executed and coalesced calls, and the calls in flight."""
+
+        return {
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._calls) + len(self._tasks),
+        }
@@ -1,9 +1,112 @@
-from dataclasses import dataclass
+import sys
+from dataclasses import dataclass, field, fields
 from typing import Any
 import numpy as np
 import faiss
 
 
+def flatten_chunks(chunks: list) -> list:
+    """Flatten per-document chunk lists into the flat, embedding-aligned chunk list.
+
+    `crawled_chunks.json` is stored as one list of chunks per document, before empty chunks are
+    filtered out. Applying the same filter as `Embeddings.flat_chunks_and_sources` keeps chunk `i`
+    aligned with embedding `i`. Already flat lists are returned unchanged.
+
+    Args:
+        chunks (list): Nested (one list per document) or flat list of chunk texts.
+
+    Returns:
+        list: Flat list of non-empty chunk texts.
+    """
+
+    if not chunks or not isinstance(chunks[0], list):
+        return chunks
+    return [txt for chunk_list in chunks for txt in chunk_list if txt and txt.strip()]
+
+
+@dataclass
+class ChunkMetadata:
+    """Compact, array-backed mapping between chunks and the documents they come from.
+
+    Replaces the per-chunk list of URL strings: each URL is stored once in `urls`
+    and every chunk only carries a 32-bit index into that table.
+
+    Attributes:
+        doc_ids (numpy.ndarray):
+            int32 array of shape (n_chunks,). `doc_ids[i]` is the position in `urls`
+            of the document chunk `i` was extracted from.
+
+        urls (list):
+            Interned URL table, in order of first appearance.
+
+        offsets (numpy.ndarray):
+            int64 array of shape (n_documents + 1,). The chunks of document `d` are
+            `offsets[d]:offsets[d + 1]`. None when chunks are not grouped by document.
+    """
+
+    doc_ids: np.ndarray = None
+    urls: list = None
+    offsets: np.ndarray = None
+
+    @classmethod
+    def from_sources(cls, sources: list) -> "ChunkMetadata":
+        """Build the metadata table from a flat list with one source URL per chunk.
+
+        Args:
+            sources (list): Source URL of each chunk, in chunk (embedding) order.
+
+        Returns:
+            ChunkMetadata: The interned table.
+        """
+
+        table = {}
+        doc_ids = np.fromiter(
+            (table.setdefault(url, len(table)) for url in sources),
+            dtype=np.int32,
+            count=len(sources),
+        )
+        urls = list(table)
+
+        offsets = None
+        # Ids are assigned in order of first appearance, so grouped chunks give a non-decreasing array
+        if doc_ids.size == 0 or np.all(np.diff(doc_ids) >= 0):
+            counts = np.bincount(doc_ids, minlength=len(urls))
+            offsets = np.zeros(len(urls) + 1, dtype=np.int64)
+            np.cumsum(counts, out=offsets[1:])
+
+        return cls(doc_ids=doc_ids, urls=urls, offsets=offsets)
+
+    def __len__(self) -> int:
+        return 0 if self.doc_ids is None else int(self.doc_ids.shape[0])
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the table; memory-mapped arrays are not counted."""
+        arrays = sum(a.nbytes for a in (self.doc_ids, self.offsets) if a is not None and not isinstance(a, np.memmap))
+        return arrays + sum(sys.getsizeof(u) for u in self.urls or ())
+
+    def url(self, chunk_index: int) -> str:
+        """Return the source URL of a chunk."""
+        return self.urls[self.doc_ids[chunk_index]]
+
+    def unique_doc_ids(self, chunk_indices: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Deduplicate chunk hits by document, keeping the first (best ranked) hit of each.
+
+        Args:
+            chunk_indices (numpy.ndarray): Chunk indices ordered best match first.
+
+        Returns:
+            tuple: (doc_ids, positions)
+                - doc_ids (numpy.ndarray): Distinct document ids in rank order.
+                - positions (numpy.ndarray): Position in `chunk_indices` of each document's first hit.
+        """
+
+        ids = self.doc_ids[np.asarray(chunk_indices, dtype=np.int64)]
+        _, first = np.unique(ids, return_index=True)
+        first.sort()
+        return ids[first], first
+
+
 @dataclass
 class Data:
     """Container class to store data used throughout the application.
@@ -20,28 +123,130 @@ class Data:
         
         chunks (list): 
             A flattened list of all text segments extracted from `documents`,
-            prepared for vectorization.
+            prepared for vectorization. Chunk `i` is the text of embedding `i`.
         
         sources (list): 
-            A flattened list of URLs corresponding to each text segment in `chunks`.
-            Ensures traceability between chunks and their original source.
+            A flattened list of URLs corresponding to each text segment in `chunks`, as produced
+            by the embedding stage and stored in `crawled_sources.json`. Converted into `metadata`
+            (and released) when the index is built.
+
+        metadata (ChunkMetadata):
+            Integer-coded chunk to document table used at query time.
         
         embeddings (numpy.ndarray): 
             A matrix of embeddings generated from `chunks`, used for similarity search
             and vector database queries.
         
-        index (faiss.swigfaiss_avx2.IndexFlatL2): 
+        index (faiss.IndexFlatL2 | faiss.IndexFlatIP): 
             The FAISS index structure used to store and query embeddings efficiently.
+            The inner-product variant is built over L2-normalized embeddings (cosine similarity).
         
+        index_version (int):
+            Identifier of the current index build; changes every time the index is (re)built so that
+            caches holding answers computed on an older index can detect it.
+
+        bm25 (models.bm25.BM25Index):
+            Lexical (BM25) index over `chunks`, used when the embedding call is slow or fails.
+
         fireworks_api_key (str): 
             API key for Fireworks model access.
+
+        store_version (str):
+            Version of the shared on-disk tenant store the artifacts are memory-mapped from, if any
+            (see `outils.mmapstore.TenantStore`).
+
+        index_mapped (bool):
+            Whether `index` reads its vectors from the tenant store's file pages rather than from
+            private memory. Depends on the FAISS build (see `TenantStore.load`).
     """
 
     documents: dict = None
     chunks: list = None
     sources: list = None
+    metadata: ChunkMetadata = None
     embeddings: np.ndarray = None
     index: Any = None
+    index_version: int = 0
+    bm25: Any = None
     fireworks_api_key: str = None
     documents_language: str = None
-    query_language: str = None
\ No newline at end of file
+    store_version: str = None
+    index_mapped: bool = False
+    # (key, breakdown) cached by `memory_breakdown`
+    _memory: tuple = field(default=None, repr=False, compare=False)
+
+    def reset(self) -> None:
+        """Drop every artifact, keeping the API key.
+
+        The components of a model all hold this container, so emptying it in place lets them be
+        reused for another folder.
+        """
+
+        empty = Data(fireworks_api_key=self.fireworks_api_key)
+        for f in fields(self):
+            setattr(self, f.name, getattr(empty, f.name))
+
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the container, for memory budgeting.
+
+        Sum of the private components of `memory_breakdown`.
+
+        Returns:
+            int: Estimated size in bytes.
+        """
+
+        breakdown = self.memory_breakdown()
+        return sum(size for name, size in breakdown.items() if name != "mapped")
+
+
+    def memory_breakdown(self) -> dict[str, int]:
+        """Approximate memory held by each artifact, in bytes.
+
+        Counts the texts, the embeddings, the FAISS index vectors and the BM25 arrays. Python object
+        overhead beyond `sys.getsizeof` of each string is ignored. Artifacts memory-mapped from the
+        tenant store live in shared, file-backed pages: they count as zero in their component and
+        their size is reported under "mapped" instead.
+
+        Sizing walks the corpus, so the result is cached on the container and recomputed only once
+        the index or store version changes or an artifact is replaced, i.e. after a load or a rebuild.
+
+        Returns:
+            dict: Bytes of "documents", "chunks" (chunk texts and sources), "metadata", "embeddings",
+                "faiss_index", "bm25" and "mapped".
+        """
+
+        artifacts = (self.documents, self.chunks, self.sources, self.metadata, self.embeddings, self.index, self.bm25)
+        cache_key = (self.index_version, self.store_version, self.index_mapped, *map(id, artifacts))
+        if self._memory is not None and self._memory[0] == cache_key:
+            return dict(self._memory[1])
+
+        def texts(values) -> int:
+            if hasattr(values, "nbytes"):
+                # Memory-mapped text stores report their own private memory
+                return values.nbytes
+            total = 0
+            for value in values or ():
+                if isinstance(value, str):
+                    total += sys.getsizeof(value)
+                elif isinstance(value, (list, tuple)):
+                    total += texts(value)
+            return total
+
+        breakdown = {
+            "documents": texts(self.documents.values() if isinstance(self.documents, dict) else self.documents),
+            "chunks": texts(self.chunks) + texts(self.sources),
+            "metadata": self.metadata.nbytes if self.metadata is not None else 0,
+            "embeddings": 0,
+            "faiss_index": 0,
+            "bm25": self.bm25.nbytes if self.bm25 is not None else 0,
+            "mapped": 0,
+        }
+        if isinstance(self.embeddings, np.ndarray):
+            key = "mapped" if isinstance(self.embeddings, np.memmap) else "embeddings"
+            breakdown[key] += self.embeddings.nbytes
+        if self.index is not None:
+            key = "mapped" if self.index_mapped else "faiss_index"
+            breakdown[key] += int(getattr(self.index, "ntotal", 0)) * int(getattr(self.index, "d", 0)) * 4
+        self._memory = (cache_key, breakdown)
+        return dict(breakdown)
@@ -1,8 +1,14 @@
+import io
 import os
 import json
+import time
+import hashlib
+import functools
 import boto3
 import numpy as np
+from botocore.config import Config
 from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
 from .dataset import Data
 import json
 from langchain_core.documents import Document
@@ -70,6 +76,41 @@ class FileManager:
 
 
 ######################### AWS Files Operations ###########################
+# Artifacts of a folder model: Data attribute -> (key, type_file)
+FOLDER_ARTIFACTS = {
+    "documents": ("crawled_data", "json"),
+    "embeddings": ("embeddings", "npy"),
+    "chunks": ("crawled_chunks", "json"),
+    "sources": ("crawled_sources", "json"),
+}
+
+# Concurrent connections of the shared S3 client (bulk downloads, concurrent tenant loads)
+S3_MAX_POOL_CONNECTIONS = 32
+
+
+@functools.lru_cache(maxsize=8)
+def _s3_client(aws_access_key_id, aws_secret_access_key, aws_region):
+    """One pooled S3 client per credentials, shared by every manager (boto3 clients are thread-safe)."""
+    return boto3.client(
+        "s3",
+        aws_access_key_id=aws_access_key_id,
+        aws_secret_access_key=aws_secret_access_key,
+        region_name=aws_region,
+        config=Config(max_pool_connections=S3_MAX_POOL_CONNECTIONS),
+    )
+
+
+def _decode(raw: bytes, type_file: str):
+    """Decode downloaded bytes the same way `download_file_from_aws` loads files."""
+    if type_file == "json":
+        return json.loads(raw)
+    if type_file in {"txt", "csv"}:
+        return raw.decode("utf-8")
+    if type_file == "npy":
+        return np.load(io.BytesIO(raw))
+    return raw
+
+
 class AWSFileManager(FileManager):
     def __init__(self, data:Data, 
             aws_s3_bucket_name, aws_access_key_id, 
@@ -77,12 +118,7 @@ class AWSFileManager(FileManager):
             base_prefix, 
             aws_region="ca-central-1"):
         super().__init__(data)
-        self.s3 = boto3.client(
-            "s3",
-            aws_access_key_id=aws_access_key_id,
-            aws_secret_access_key=aws_secret_access_key,
-            region_name=aws_region,
-        )
+        self.s3 = _s3_client(aws_access_key_id, aws_secret_access_key, aws_region)
         self.bucket_name = aws_s3_bucket_name
         self.base_prefix = base_prefix.rstrip("/") + "/" if base_prefix else ""
 
@@ -136,6 +172,30 @@ class AWSFileManager(FileManager):
             logger.exception(f"Unexpected error creating folder '{path}': {e}")
             raise
 
+    def use_folder_in_aws(self, folder) -> bool:
+        """
+        Point the manager at an existing "folder" (prefix) in S3, without creating it.
+
+        Args:
+            folder (str): folder name (e.g. 'documents' or 'documents/').
+
+        Returns:
+            bool: True if the folder exists and is now used for downloads and uploads, False otherwise.
+        """
+        path = self.base_prefix + folder.rstrip('/') + '/'
+
+        try:
+            resp = self.s3.list_objects_v2(Bucket=self.bucket_name, Prefix=path, MaxKeys=1)
+            if not resp.get('Contents'):
+                return False
+            if folder not in self.base_prefix:
+                self.base_prefix = self.base_prefix + folder.rstrip('/') + '/'
+            return True
+
+        except ClientError as e:
+            logger.error(f"AWS error opening folder '{path}': {e.response.get('Error', {}).get('Message', str(e))}")
+            raise
+
     def upload_file_in_aws(self, key: str, 
             content: list | str | bytes | dict | np.ndarray, 
             type_file: "Literal['json','txt','csv','npy','pdf','png','jpg','jpeg','bin']") -> bool | str:
@@ -277,7 +337,7 @@ class AWSFileManager(FileManager):
             detected_type = ext
 
         # Build full_key
-        full_key = ((self.base_prefix.rstrip("/") + "/" if key else "") or "") + key + f".{detected_type}"
+        full_key = self._full_key(key, detected_type)
 
         try:
             # Download the file to a temporary location
@@ -309,6 +369,91 @@ class AWSFileManager(FileManager):
             logger.exception(f"Unexpected error downloading file: {e}")
             raise
 
+    def _full_key(self, key: str, type_file: str) -> str:
+        return ((self.base_prefix.rstrip("/") + "/" if key else "") or "") + key + f".{type_file}"
+
+    def download_files_from_aws(self, files: dict, optional: tuple = (), timings: dict = None,
+            max_workers: int = 8) -> dict:
+        """
+        Download several files concurrently over the shared client and decode them in parallel.
+
+        Each file is fetched into memory with `get_object` and decoded in the worker thread that
+        downloaded it, so the total time is close to the slowest file rather than the sum.
+
+        Args:
+        - files: mapping of name -> (key, type_file), with key and type_file as in `download_file_from_aws`.
+        - optional: names whose absence (or failure) yields None instead of raising.
+        - timings: if given, filled with the download + decode time of each file, in ms.
+        - max_workers: maximum number of concurrent downloads.
+
+        Returns:
+        - dict mapping each name to its decoded content.
+        """
+
+        def fetch(name, key, type_file):
+            start = time.perf_counter()
+            try:
+                response = self.s3.get_object(Bucket=self.bucket_name, Key=self._full_key(key, type_file))
+                return _decode(response["Body"].read(), type_file)
+            except Exception as e:
+                if name in optional:
+                    logger.info(f"Optional file '{key}.{type_file}' not loaded: {e}")
+                    return None
+                logger.error(f"Error downloading '{key}.{type_file}': {e}")
+                raise
+            finally:
+                if timings is not None:
+                    timings[name] = round((time.perf_counter() - start) * 1000, 2)
+
+        if not files:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(files)), thread_name_prefix="s3-download") as pool:
+            futures = {name: pool.submit(fetch, name, key, type_file) for name, (key, type_file) in files.items()}
+            return {name: future.result() for name, future in futures.items()}
+
+    def load_folder_data(self, names: tuple = tuple(FOLDER_ARTIFACTS), data: Data = None, timings: dict = None) -> Data:
+        """
+        Load a folder's artifacts concurrently into a `Data` container.
+
+        Args:
+        - names: `Data` attributes to load, among the keys of `FOLDER_ARTIFACTS`. Defaults to all of them.
+        - data: container to populate. Defaults to `self.data`.
+        - timings: if given, filled with the time of each download, in ms.
+
+        Returns:
+        - the populated `Data`.
+        """
+
+        data = data if data is not None else self.data
+        contents = self.download_files_from_aws({name: FOLDER_ARTIFACTS[name] for name in names}, timings=timings)
+        for name, content in contents.items():
+            setattr(data, name, content)
+        return data
+
+    def artifacts_build_id(self, names: tuple = tuple(FOLDER_ARTIFACTS)) -> str | None:
+        """
+        Identify the current build of a folder's artifacts from their S3 ETags, without downloading them.
+
+        The id changes whenever one of the artifacts is uploaded again, e.g. by a new pipeline run.
+
+        Args:
+        - names: `Data` attributes taken into account, among the keys of `FOLDER_ARTIFACTS`. Defaults to all of them.
+
+        Returns:
+        - the build id, or None when an artifact is missing or S3 cannot be reached.
+        """
+
+        def etag(name):
+            return self.s3.head_object(Bucket=self.bucket_name, Key=self._full_key(*FOLDER_ARTIFACTS[name]))["ETag"]
+
+        try:
+            with ThreadPoolExecutor(max_workers=len(names) or 1, thread_name_prefix="s3-head") as pool:
+                etags = list(pool.map(etag, names))
+        except Exception as e:
+            logger.info(f"Could not read the build id of '{self.base_prefix}': {e}")
+            return None
+        return hashlib.sha1("\n".join(etags).encode("utf-8")).hexdigest()
+
     def list_folders_in_aws(self, path: str) -> list[str]:
         """
         List "folders" (common prefixes) in S3 under the given prefix.
@@ -0,0 +1,272 @@
+import os
+import re
+import json
+import time
+import shutil
+import operator
+import logging
+from collections.abc import Mapping, Sequence
+import faiss
+import numpy as np
+from models.bm25 import BM25Index
+from .dataset import Data, ChunkMetadata
+
+
+# Prefer uvicorn's logger when running under uvicorn; fall back to module logger
+_uvicorn_logger = logging.getLogger("uvicorn.error")
+logger = _uvicorn_logger if _uvicorn_logger.handlers else logging.getLogger(__name__)
+
+
+class TextStore(Sequence):
+    def __init__(self, prefix: str):
+        """Read-only list of strings decoded on access from a memory-mapped blob written by `write`.
+
+        Args:
+            prefix (str): Path of the files without their suffix.
+        """
+        self._offsets = np.load(f"{prefix}_offsets.npy", mmap_mode="r")
+        if os.path.getsize(f"{prefix}.bin"):
+            self._blob = np.memmap(f"{prefix}.bin", dtype=np.uint8, mode="r")
+        else:
+            self._blob = np.zeros(0, dtype=np.uint8)
+
+    @staticmethod
+    def write(prefix: str, texts):
+        """Write strings as one UTF-8 blob (`<prefix>.bin`) plus their int64 boundaries (`<prefix>_offsets.npy`)."""
+
+        offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+        with open(f"{prefix}.bin", "wb") as f:
+            for i, text in enumerate(texts):
+                encoded = (text or "").encode("utf-8")
+                f.write(encoded)
+                offsets[i + 1] = offsets[i] + len(encoded)
+        np.save(f"{prefix}_offsets.npy", offsets)
+
+    def __len__(self) -> int:
+        return int(self._offsets.shape[0]) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        i = operator.index(i)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("TextStore index out of range")
+        return self._blob[self._offsets[i]:self._offsets[i + 1]].tobytes().decode("utf-8")
+
+    @property
+    def nbytes(self) -> int:
+        """Private memory held: none, the texts live in shared, file-backed pages."""
+        return 0
+
+
+class DocumentStore(Mapping):
+    def __init__(self, prefix: str):
+        """Read-only {url: text} mapping over memory-mapped page texts. Only the URLs are kept in memory.
+
+        Args:
+            prefix (str): Path of the files without their suffix.
+        """
+        with open(f"{prefix}_urls.json", encoding="utf-8") as f:
+            self._urls = json.load(f)
+        self._positions = {url: i for i, url in enumerate(self._urls)}
+        self._texts = TextStore(f"{prefix}_texts")
+
+    @staticmethod
+    def write(prefix: str, documents: dict):
+        """Write the URLs as JSON (`<prefix>_urls.json`) and the texts as a `TextStore` (`<prefix>_texts`)."""
+
+        with open(f"{prefix}_urls.json", "w", encoding="utf-8") as f:
+            json.dump(list(documents), f, ensure_ascii=False)
+        TextStore.write(f"{prefix}_texts", list(documents.values()))
+
+    def __getitem__(self, url: str) -> str:
+        return self._texts[self._positions[url]]
+
+    def __iter__(self):
+        return iter(self._urls)
+
+    def __len__(self) -> int:
+        return len(self._urls)
+
+    @property
+    def nbytes(self) -> int:
+        """Private memory held: the URL table only."""
+        return sum(len(url) + 80 for url in self._urls)
+
+
+class TenantStore:
+    def __init__(self, root: str, keep_versions: int = 2):
+        """On-disk copy of each folder's built artifacts, memory-mapped read-only by every API worker.
+
+        A folder is published with `save` once its index is built, as a new version directory holding
+        the FAISS index, the float32 embeddings, the chunk and page texts (UTF-8 blobs with
+        offsets), the chunk metadata arrays and the BM25 arrays. `load` then maps them into a `Data`,
+        so that N workers share one copy of each tenant in the page cache instead of holding N private
+        copies. The `CURRENT` file of a folder names its latest version and is replaced atomically;
+        older versions beyond `keep_versions` are deleted, which does not affect workers still mapping
+        them.
+
+        Args:
+            root (str): Directory holding one subdirectory per folder.
+            keep_versions (int, optional): Versions kept per folder. Defaults to 2.
+        """
+        self.root = root
+        self.keep_versions = keep_versions
+
+
+    def _folder_dir(self, folder: str) -> str:
+        return os.path.join(self.root, re.sub(r"[^A-Za-z0-9._-]+", "_", folder.strip("/")) or "_")
+
+
+    def version(self, folder: str) -> str | None:
+        """Return the latest published version of a folder, or None when it was never published."""
+
+        try:
+            with open(os.path.join(self._folder_dir(folder), "CURRENT"), encoding="utf-8") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+
+    def save(self, folder: str, data: Data, language_profile: dict = None, build_id: str = None) -> str:
+        """Publish the built artifacts of a folder as a new version.
+
+        Expects `data` as left by `Faiss.create_faiss_index`: flat chunks, the chunk metadata table and
+        the index. The language profile and the id of the S3 build the artifacts come from, if given,
+        are stored in the manifest.
+
+        Returns:
+            str: The new version.
+        """
+
+        folder_dir = self._folder_dir(folder)
+        version = str(time.time_ns())
+        tmp_dir = os.path.join(folder_dir, f".{version}.tmp")
+        os.makedirs(tmp_dir)
+        try:
+            faiss.write_index(data.index, os.path.join(tmp_dir, "index.faiss"))
+            np.save(os.path.join(tmp_dir, "embeddings.npy"), np.ascontiguousarray(data.embeddings, dtype=np.float32))
+            TextStore.write(os.path.join(tmp_dir, "chunks"), data.chunks or [])
+            DocumentStore.write(os.path.join(tmp_dir, "documents"), data.documents or {})
+            metadata = data.metadata
+            np.save(os.path.join(tmp_dir, "doc_ids.npy"), metadata.doc_ids)
+            if metadata.offsets is not None:
+                np.save(os.path.join(tmp_dir, "doc_offsets.npy"), metadata.offsets)
+            with open(os.path.join(tmp_dir, "urls.json"), "w", encoding="utf-8") as f:
+                json.dump(metadata.urls, f, ensure_ascii=False)
+            if data.bm25 is not None:
+                data.bm25.save(os.path.join(tmp_dir, "bm25"))
+            with open(os.path.join(tmp_dir, "manifest.json"), "w", encoding="utf-8") as f:
+                json.dump({"version": version, "folder": folder, "build_id": build_id, "language": language_profile,
+                           "documents_language": data.documents_language,
+                           "metric": int(data.index.metric_type)}, f, ensure_ascii=False)
+            os.rename(tmp_dir, os.path.join(folder_dir, version))
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        current_tmp = os.path.join(folder_dir, f"CURRENT.{version}.tmp")
+        with open(current_tmp, "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(current_tmp, os.path.join(folder_dir, "CURRENT"))
+        self._prune(folder_dir)
+        return version
+
+
+    def invalidate(self, folder: str):
+        """Forget the published version of a folder, e.g. once its artifacts were rebuilt elsewhere.
+
+        The next `load` finds nothing and the folder is built again from its stored artifacts. Version
+        directories are left to `_prune`, since other workers may still map them.
+        """
+
+        try:
+            os.remove(os.path.join(self._folder_dir(folder), "CURRENT"))
+        except FileNotFoundError:
+            pass
+
+
+    def remove(self, folder: str):
+        """Delete every version of a folder, e.g. once the tenant itself is deleted.
+
+        Other workers still mapping a version keep reading its unlinked files until they see
+        through `version` that the folder is gone.
+        """
+
+        self.invalidate(folder)
+        shutil.rmtree(self._folder_dir(folder), ignore_errors=True)
+
+
+    def _prune(self, folder_dir: str):
+        versions = sorted((name for name in os.listdir(folder_dir) if name.isdigit()), key=int)
+        for name in versions[:-self.keep_versions]:
+            shutil.rmtree(os.path.join(folder_dir, name), ignore_errors=True)
+
+
+    @staticmethod
+    def _load_index(path: str, embeddings: np.ndarray, metric: int = None) -> tuple:
+        """Open a version's FAISS index, memory-mapped when this FAISS build supports it.
+
+        `IO_FLAG_MMAP_IFC` (in-place mapping of flat indexes) is missing from older FAISS releases.
+        There the flat index is rebuilt from the mapped embeddings, which were saved already
+        normalized, so searches are identical but the vectors are held in private memory.
+
+        Returns:
+            tuple: (index, whether its vectors are memory-mapped).
+        """
+
+        mmap_flag = getattr(faiss, "IO_FLAG_MMAP_IFC", None)
+        if mmap_flag is not None:
+            return faiss.read_index(os.path.join(path, "index.faiss"), mmap_flag | faiss.IO_FLAG_READ_ONLY), True
+        if metric is None or embeddings.ndim != 2:
+            return faiss.read_index(os.path.join(path, "index.faiss")), False
+        index = faiss.IndexFlat(embeddings.shape[1], metric)
+        index.add(np.ascontiguousarray(embeddings, dtype=np.float32))
+        return index, False
+
+
+    def load(self, folder: str, data: Data, build_id: str = None) -> dict | None:
+        """Map the latest published version of a folder into `data`, replacing its in-memory artifacts.
+
+        Args:
+            folder (str): Folder to map.
+            data (Data): Container receiving the mapped artifacts.
+            build_id (str, optional): Id of the folder's current S3 build. A version published from
+                another build is stale and is not mapped. Defaults to None (any version is mapped).
+
+        Returns:
+            dict | None: The version's manifest, or None when the folder was never published or its
+                latest version is stale.
+        """
+
+        version = self.version(folder)
+        if version is None:
+            return None
+        path = os.path.join(self._folder_dir(folder), version)
+        with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+        if build_id is not None and manifest.get("build_id") != build_id:
+            logger.info(f"Tenant store version {version} of {folder} was built from older artifacts.")
+            return None
+        with open(os.path.join(path, "urls.json"), encoding="utf-8") as f:
+            urls = json.load(f)
+        offsets_path = os.path.join(path, "doc_offsets.npy")
+
+        data.embeddings = np.load(os.path.join(path, "embeddings.npy"), mmap_mode="r")
+        data.index, data.index_mapped = self._load_index(path, data.embeddings, manifest.get("metric"))
+        data.chunks = TextStore(os.path.join(path, "chunks"))
+        data.documents = DocumentStore(os.path.join(path, "documents"))
+        data.sources = None
+        data.metadata = ChunkMetadata(
+            doc_ids=np.load(os.path.join(path, "doc_ids.npy"), mmap_mode="r"),
+            urls=urls,
+            offsets=np.load(offsets_path, mmap_mode="r") if os.path.exists(offsets_path) else None,
+        )
+        bm25_path = os.path.join(path, "bm25")
+        data.bm25 = BM25Index.load(bm25_path) if os.path.isdir(bm25_path) else None
+        data.documents_language = manifest.get("documents_language")
+        data.index_version = int(version)
+        data.store_version = version
+        return manifest
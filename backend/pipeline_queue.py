@@ -0,0 +1,330 @@
+import os
+import glob
+import json
+import time
+import uuid
+import asyncio
+import logging
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, saved files are assumed orphaned
+    fcntl = None
+from dataclasses import dataclass, field, asdict
+
+
+# Prefer uvicorn's logger when running under uvicorn; fall back to module logger
+_uvicorn_logger = logging.getLogger("uvicorn.error")
+logger = _uvicorn_logger if _uvicorn_logger.handlers else logging.getLogger(__name__)
+
+
+@dataclass
+class PipelineJob:
+    client_id: str
+    folder: str
+    data: dict
+    admin: bool = False
+    status: str = "queued"
+    job_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    created: float = field(default_factory=time.time)
+    started: float | None = None
+
+
+class PipelineJobQueue:
+    def __init__(self, runner, notify=None, max_concurrent: int = 2, max_per_folder: int = 1, path: str = None,
+                 claim=None, release=None):
+        """Queue of pipeline runs with global and per-folder concurrency caps.
+
+        A queued job starts once fewer than `max_concurrent` jobs run overall and fewer than
+        `max_per_folder` run on its folder. Admin jobs go first; among the others, the folder with the
+        fewest running jobs, then the one served least recently, goes first, so one tenant submitting
+        many runs cannot starve the others. Waiting jobs are told their position through `notify`
+        whenever it changes. With a `path`, queued and running jobs are saved to a JSON file per
+        queue instance (`<path>.<instance id>`), and `restore` requeues them after a restart
+        (interrupted runs start over). Each instance holds an exclusive lock on `<file>.lock` until
+        it stops or its process exits; `restore` only claims files whose lock it can take, so the
+        jobs of a live sibling worker are left alone and each orphaned file is restored once.
+
+        The caps are checked against this queue's jobs only: each API worker has its own queue, so
+        with N workers up to N * `max_concurrent` jobs run at once. With `claim`, a job also has to
+        claim its folder, e.g. in state shared by the workers, before it starts, which makes the
+        per-folder cap hold across workers; `release` is called once it ends, and a job whose claim
+        fails stays queued until `poll` finds the folder free.
+
+        Args:
+            runner (callable): `await runner(job)` runs a job and returns whether it succeeded.
+            notify (callable, optional): `await notify(job, message)` sends a queue message to the
+                job's client. Defaults to None.
+            max_concurrent (int, optional): Jobs of this queue running at once. Defaults to 2.
+            max_per_folder (int, optional): Jobs running at once on the same folder. Defaults to 1.
+            path (str, optional): Base name of the JSON files persisting unfinished jobs. Defaults to None (memory only).
+            claim (callable, optional): `claim(job)` returns whether the job may start on its folder.
+                Defaults to None (no claim).
+            release (callable, optional): `release(job)` gives the claim back. Defaults to None.
+        """
+        self.runner = runner
+        self.notify = notify
+        self.max_concurrent = max_concurrent
+        self.max_per_folder = max_per_folder
+        self.path = path
+        self.claim = claim
+        self.release = release
+        self._queued: list[PipelineJob] = []
+        self._running: dict[str, PipelineJob] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._positions: dict[str, int] = {}
+        self._last_started: dict[str, float] = {}
+        self._stopping = False
+        self._instance = uuid.uuid4().hex
+        self._lock_file = None
+        self.completed = 0
+        self.failed = 0
+
+
+    @property
+    def _file(self) -> str:
+        return f"{self.path}.{self._instance}"
+
+
+    @staticmethod
+    def _try_lock(path: str):
+        """Open `path` and lock it exclusively; None when another process (or queue) holds it."""
+
+        f = open(path, "a+")
+        if fcntl is None:
+            return f
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return None
+        return f
+
+
+    @staticmethod
+    def _remove_lock(lock_file, path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        lock_file.close()
+
+
+    def _hold_lock(self):
+        if self._lock_file is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._lock_file = self._try_lock(f"{self._file}.lock")
+
+
+    def _release_lock(self):
+        if self._lock_file is not None:
+            if not os.path.exists(self._file):
+                os.remove(f"{self._file}.lock")
+            self._lock_file.close()
+            self._lock_file = None
+
+
+    def restore(self) -> list[PipelineJob]:
+        """Requeue the jobs saved by previous processes, in their original order, and return them."""
+
+        if not self.path:
+            return []
+        self._hold_lock()
+        jobs = []
+        for saved in glob.glob(f"{glob.escape(self.path)}.*"):
+            if saved.endswith((".tmp", ".lock", ".claimed")) or saved == self._file:
+                continue
+            # The owner holds this lock while it runs: a file we can lock was left by a dead process
+            owner_lock = self._try_lock(f"{saved}.lock")
+            if owner_lock is None:
+                continue
+            claimed = f"{saved}.{self._instance}.claimed"
+            try:
+                os.replace(saved, claimed)
+            except OSError:
+                # Claimed by another worker restoring at the same time
+                self._remove_lock(owner_lock, f"{saved}.lock")
+                continue
+            try:
+                with open(claimed, encoding="utf-8") as f:
+                    jobs.extend(PipelineJob(**record) for record in json.load(f))
+            except (OSError, ValueError, TypeError) as e:
+                logger.warning(f"Could not restore pipeline jobs from {saved}: {e}")
+            finally:
+                os.remove(claimed)
+                self._remove_lock(owner_lock, f"{saved}.lock")
+        # Locks left by processes that died with nothing saved
+        for lock in glob.glob(f"{glob.escape(self.path)}.*.lock"):
+            if lock != f"{self._file}.lock" and not os.path.exists(lock[:-len(".lock")]):
+                owner_lock = self._try_lock(lock)
+                if owner_lock is not None:
+                    self._remove_lock(owner_lock, lock)
+        if not jobs:
+            return []
+        for job in jobs:
+            job.status, job.started = "queued", None
+        self._queued.extend(sorted(jobs, key=lambda job: job.created))
+        self._save()
+        logger.info(f"Restored {len(jobs)} pipeline jobs.")
+        return jobs
+
+
+    def _save(self):
+        if not self.path:
+            return
+        jobs = [asdict(job) for job in [*self._running.values(), *self._queued]]
+        if not jobs:
+            if os.path.exists(self._file):
+                os.remove(self._file)
+            return
+        self._hold_lock()
+        tmp_path = f"{self._file}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(jobs, f, ensure_ascii=False)
+        os.replace(tmp_path, self._file)
+
+
+    def active(self, client_id: str) -> PipelineJob | None:
+        """Return the queued or running job of a client, if any."""
+
+        for job in [*self._running.values(), *self._queued]:
+            if job.client_id == client_id:
+                return job
+        return None
+
+
+    def client_ids(self) -> list[str]:
+        """Return the clients with a queued or running job."""
+
+        return [job.client_id for job in [*self._running.values(), *self._queued]]
+
+
+    def submit(self, client_id: str, folder: str, data: dict, admin: bool = False) -> PipelineJob:
+        """Queue a pipeline run, or return the client's job when one is already queued or running.
+
+        Args:
+            client_id (str): Client the progress messages are sent to.
+            folder (str): Tenant folder the run writes to, used for the per-folder cap.
+            data (dict): Pipeline request (url, max_depth, data_folder...), passed to the runner.
+            admin (bool, optional): Whether the run is scheduled ahead of guest runs. Defaults to False.
+
+        Returns:
+            PipelineJob: The job.
+        """
+
+        job = self.active(client_id)
+        if job is not None:
+            return job
+        job = PipelineJob(client_id=client_id, folder=folder, data=data, admin=admin)
+        self._queued.append(job)
+        self._save()
+        self._schedule()
+        return job
+
+
+    def _running_on(self, folder: str) -> int:
+        return sum(1 for job in self._running.values() if job.folder == folder)
+
+
+    def _next_job(self) -> PipelineJob | None:
+        runnable = [job for job in self._queued if self._running_on(job.folder) < self.max_per_folder]
+        runnable.sort(key=lambda job: (
+            not job.admin,
+            self._running_on(job.folder),
+            self._last_started.get(job.folder, 0),
+            job.created,
+        ))
+        for job in runnable:
+            if self.claim is None or self.claim(job):
+                return job
+        return None
+
+
+    def _schedule(self):
+        """Start every job the caps allow, then tell the waiting ones their new position."""
+
+        if self._stopping:
+            return
+        while len(self._running) < self.max_concurrent:
+            job = self._next_job()
+            if job is None:
+                break
+            self._queued.remove(job)
+            job.status, job.started = "running", time.time()
+            self._running[job.job_id] = job
+            self._last_started[job.folder] = job.started
+            self._positions.pop(job.job_id, None)
+            task = asyncio.create_task(self._run(job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        self._save()
+
+        for position, job in enumerate(self._queued, start=1):
+            if self._positions.get(job.job_id) != position:
+                self._positions[job.job_id] = position
+                self._send(job, {"step": "queue", "status": "queued", "position": position, "size": len(self._queued)})
+
+
+    def _send(self, job: PipelineJob, message: dict):
+        if self.notify is None:
+            return
+        task = asyncio.create_task(self.notify(job, message))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+
+    async def _run(self, job: PipelineJob):
+        # Cancellation (shutdown) propagates and leaves the job saved, to be requeued on restart
+        try:
+            ok = await self.runner(job)
+        except Exception as e:
+            logger.exception(f"Pipeline job {job.job_id} for {job.folder} failed: {e}")
+            ok = False
+        finally:
+            if self.release is not None:
+                self.release(job)
+        self._running.pop(job.job_id, None)
+        if ok:
+            self.completed += 1
+        else:
+            self.failed += 1
+        self._schedule()
+
+
+    def start(self):
+        """Start the jobs restored or submitted before the event loop was running."""
+
+        self._schedule()
+
+
+    def poll(self):
+        """Start the queued jobs whose folder was claimed elsewhere and has been released since."""
+
+        if self._queued:
+            self._schedule()
+
+
+    async def stop(self):
+        """Cancel the running jobs; they stay saved and are requeued on the next `restore`.
+
+        The lock on the saved file is released, so another worker may restore its jobs right away.
+        """
+
+        self._stopping = True
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._release_lock()
+
+
+    def stats(self) -> dict:
+        """Return the queued and running jobs and the completed/failed counters."""
+
+        return {
+            "queued": [{"job_id": job.job_id, "folder": job.folder, "admin": job.admin} for job in self._queued],
+            "running": [{"job_id": job.job_id, "folder": job.folder, "admin": job.admin} for job in self._running.values()],
+            "max_concurrent": self.max_concurrent,
+            "max_per_folder": self.max_per_folder,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
@@ -0,0 +1,419 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+
+
+class PipelineStateBackend(ABC):
+    """Storage of pipeline runs shared by the API workers: the running flag and progress history of each client.
+
+    Messages get a per-client sequence number that keeps increasing across runs, so a worker can
+    replay or tail the history of a run started by another worker from the last number it delivered.
+    A run whose client got no update nor heartbeat (`touch`) for `stale_after_s` is no longer
+    considered running, so a run owned by a crashed worker does not block its client forever.
+    When a queued run actually starts, it claims the folder it writes to (`claim_folder`), so that
+    the per-folder cap holds across workers; the claim lasts until it is released, the run finishes
+    or the run goes stale.
+    """
+
+    def __init__(self, max_history: int = 500, stale_after_s: float = 300):
+        self.max_history = max_history
+        self.stale_after_s = stale_after_s
+
+    @abstractmethod
+    def try_start(self, client_id: str, force: bool = False) -> bool:
+        """Atomically mark a run as started unless one is running, clearing the previous history.
+
+        With `force`, take the run over even if another one is recorded as running.
+        """
+
+    @abstractmethod
+    def finish(self, client_id: str):
+        """Mark the client's run as finished and release its folder claims; its history is kept until the next run or cleanup."""
+
+    @abstractmethod
+    def claim_folder(self, folder: str, client_id: str, limit: int = 1) -> bool:
+        """Atomically claim `folder` for the client's run unless `limit` live runs of other clients hold it.
+
+        Claiming a folder the client already holds succeeds.
+        """
+
+    @abstractmethod
+    def release_folder(self, folder: str, client_id: str):
+        """Release the client's claim on `folder`, if any."""
+
+    @abstractmethod
+    def is_running(self, client_id: str) -> bool:
+        """Whether the client has a run that is not finished nor stale."""
+
+    @abstractmethod
+    def touch(self, client_id: str):
+        """Heartbeat of the worker owning a run, keeping it from going stale."""
+
+    @abstractmethod
+    def append(self, client_id: str, message: dict) -> int:
+        """Record a progress message, trimming the history to `max_history`, and return its sequence number."""
+
+    @abstractmethod
+    def history(self, client_id: str, after: int = 0) -> list[tuple[int, dict]]:
+        """Return the (sequence number, message) pairs recorded after `after`, oldest first."""
+
+    @abstractmethod
+    def last_seq(self, client_id: str) -> int:
+        """Return the sequence number of the client's last message, 0 when it has none."""
+
+    @abstractmethod
+    def cleanup(self, max_age_s: float) -> list[str]:
+        """Forget the clients idle for more than `max_age_s` and return them."""
+
+
+class MemoryPipelineState(PipelineStateBackend):
+    """Per-process state: runs are only visible to the worker that holds them."""
+
+    def __init__(self, max_history: int = 500, stale_after_s: float = 300):
+        super().__init__(max_history, stale_after_s)
+        self._running: dict[str, bool] = {}
+        self._activity: dict[str, float] = {}
+        self._seq: dict[str, int] = {}
+        self._history: dict[str, deque] = {}
+        self._claims: dict[str, set[str]] = {}
+        self._lock = threading.Lock()
+
+    def _is_running(self, client_id: str, now: float) -> bool:
+        return self._running.get(client_id, False) and now - self._activity.get(client_id, 0) <= self.stale_after_s
+
+    def _release_folders(self, client_id: str):
+        for folder in list(self._claims):
+            self._claims[folder].discard(client_id)
+            if not self._claims[folder]:
+                del self._claims[folder]
+
+    def try_start(self, client_id: str, force: bool = False) -> bool:
+        now = time.time()
+        with self._lock:
+            if not force and self._is_running(client_id, now):
+                return False
+            self._release_folders(client_id)
+            self._running[client_id] = True
+            self._activity[client_id] = now
+            self._history[client_id] = deque(maxlen=self.max_history)
+            return True
+
+    def finish(self, client_id: str):
+        with self._lock:
+            self._running[client_id] = False
+            self._activity[client_id] = time.time()
+            self._release_folders(client_id)
+
+    def is_running(self, client_id: str) -> bool:
+        with self._lock:
+            return self._is_running(client_id, time.time())
+
+    def claim_folder(self, folder: str, client_id: str, limit: int = 1) -> bool:
+        now = time.time()
+        with self._lock:
+            holders = self._claims.setdefault(folder, set())
+            if client_id not in holders:
+                if sum(1 for holder in holders if self._is_running(holder, now)) >= limit:
+                    return False
+                holders.add(client_id)
+            return True
+
+    def release_folder(self, folder: str, client_id: str):
+        with self._lock:
+            holders = self._claims.get(folder, set())
+            holders.discard(client_id)
+            if not holders:
+                self._claims.pop(folder, None)
+
+    def touch(self, client_id: str):
+        with self._lock:
+            if client_id in self._activity:
+                self._activity[client_id] = time.time()
+
+    def append(self, client_id: str, message: dict) -> int:
+        with self._lock:
+            seq = self._seq.get(client_id, 0) + 1
+            self._seq[client_id] = seq
+            self._history.setdefault(client_id, deque(maxlen=self.max_history)).append((seq, message))
+            self._activity[client_id] = time.time()
+            return seq
+
+    def history(self, client_id: str, after: int = 0) -> list[tuple[int, dict]]:
+        with self._lock:
+            return [(seq, message) for seq, message in self._history.get(client_id, ()) if seq > after]
+
+    def last_seq(self, client_id: str) -> int:
+        with self._lock:
+            return self._seq.get(client_id, 0)
+
+    def cleanup(self, max_age_s: float) -> list[str]:
+        now = time.time()
+        with self._lock:
+            expired = [cid for cid, last in self._activity.items() if now - last > max_age_s]
+            for cid in expired:
+                for store in (self._running, self._activity, self._seq, self._history):
+                    store.pop(cid, None)
+                self._release_folders(cid)
+            return expired
+
+
+class SQLitePipelineState(PipelineStateBackend):
+    def __init__(self, path: str, max_history: int = 500, stale_after_s: float = 300):
+        """State in a SQLite database shared by the workers of a host (put it on tmpfs, e.g. /dev/shm, to keep it in memory).
+
+        Args:
+            path (str): Database file.
+            max_history (int, optional): Messages kept per client. Defaults to 500.
+            stale_after_s (float, optional): Silence after which a run is no longer running. Defaults to 300.
+        """
+        super().__init__(max_history, stale_after_s)
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS pipeline_runs ("
+                "client_id TEXT PRIMARY KEY, running INTEGER NOT NULL, activity REAL NOT NULL, seq INTEGER NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS pipeline_messages ("
+                "client_id TEXT NOT NULL, seq INTEGER NOT NULL, body TEXT NOT NULL, PRIMARY KEY (client_id, seq))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS pipeline_claims ("
+                "folder TEXT NOT NULL, client_id TEXT NOT NULL, PRIMARY KEY (folder, client_id))"
+            )
+
+    def _transaction(self, statements):
+        # BEGIN IMMEDIATE takes the write lock up front, making read-then-write sequences atomic across processes
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = statements(self._conn)
+                self._conn.execute("COMMIT")
+                return result
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _row(self, conn, client_id: str):
+        return conn.execute(
+            "SELECT running, activity, seq FROM pipeline_runs WHERE client_id = ?", (client_id,)
+        ).fetchone()
+
+    def _running_row(self, row, now: float) -> bool:
+        return bool(row and row[0] and now - row[1] <= self.stale_after_s)
+
+    def try_start(self, client_id: str, force: bool = False) -> bool:
+        def start(conn):
+            now = time.time()
+            if not force and self._running_row(self._row(conn, client_id), now):
+                return False
+            conn.execute(
+                "INSERT INTO pipeline_runs (client_id, running, activity, seq) VALUES (?, 1, ?, 0) "
+                "ON CONFLICT(client_id) DO UPDATE SET running = 1, activity = excluded.activity",
+                (client_id, now),
+            )
+            conn.execute("DELETE FROM pipeline_messages WHERE client_id = ?", (client_id,))
+            conn.execute("DELETE FROM pipeline_claims WHERE client_id = ?", (client_id,))
+            return True
+        return self._transaction(start)
+
+    def finish(self, client_id: str):
+        def finish(conn):
+            conn.execute(
+                "UPDATE pipeline_runs SET running = 0, activity = ? WHERE client_id = ?", (time.time(), client_id)
+            )
+            conn.execute("DELETE FROM pipeline_claims WHERE client_id = ?", (client_id,))
+        self._transaction(finish)
+
+    def claim_folder(self, folder: str, client_id: str, limit: int = 1) -> bool:
+        def claim(conn):
+            now = time.time()
+            holders = [cid for (cid,) in conn.execute("SELECT client_id FROM pipeline_claims WHERE folder = ?", (folder,))]
+            if client_id in holders:
+                return True
+            if sum(1 for holder in holders if self._running_row(self._row(conn, holder), now)) >= limit:
+                return False
+            conn.execute("INSERT INTO pipeline_claims (folder, client_id) VALUES (?, ?)", (folder, client_id))
+            return True
+        return self._transaction(claim)
+
+    def release_folder(self, folder: str, client_id: str):
+        self._transaction(lambda conn: conn.execute(
+            "DELETE FROM pipeline_claims WHERE folder = ? AND client_id = ?", (folder, client_id)
+        ))
+
+    def is_running(self, client_id: str) -> bool:
+        with self._lock:
+            row = self._row(self._conn, client_id)
+        return self._running_row(row, time.time())
+
+    def touch(self, client_id: str):
+        self._transaction(lambda conn: conn.execute(
+            "UPDATE pipeline_runs SET activity = ? WHERE client_id = ?", (time.time(), client_id)
+        ))
+
+    def append(self, client_id: str, message: dict) -> int:
+        def append(conn):
+            now = time.time()
+            row = self._row(conn, client_id)
+            seq = (row[2] if row else 0) + 1
+            conn.execute(
+                "INSERT INTO pipeline_runs (client_id, running, activity, seq) VALUES (?, 0, ?, ?) "
+                "ON CONFLICT(client_id) DO UPDATE SET activity = excluded.activity, seq = excluded.seq",
+                (client_id, now, seq),
+            )
+            conn.execute(
+                "INSERT INTO pipeline_messages (client_id, seq, body) VALUES (?, ?, ?)",
+                (client_id, seq, json.dumps(message, ensure_ascii=False)),
+            )
+            conn.execute(
+                "DELETE FROM pipeline_messages WHERE client_id = ? AND seq <= ?", (client_id, seq - self.max_history)
+            )
+            return seq
+        return self._transaction(append)
+
+    def history(self, client_id: str, after: int = 0) -> list[tuple[int, dict]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, body FROM pipeline_messages WHERE client_id = ? AND seq > ? ORDER BY seq",
+                (client_id, after),
+            ).fetchall()
+        return [(seq, json.loads(body)) for seq, body in rows]
+
+    def last_seq(self, client_id: str) -> int:
+        with self._lock:
+            row = self._row(self._conn, client_id)
+        return row[2] if row else 0
+
+    def cleanup(self, max_age_s: float) -> list[str]:
+        def cleanup(conn):
+            cutoff = time.time() - max_age_s
+            expired = [cid for (cid,) in conn.execute(
+                "SELECT client_id FROM pipeline_runs WHERE activity < ?", (cutoff,)
+            )]
+            for table in ("pipeline_messages", "pipeline_claims", "pipeline_runs"):
+                conn.executemany(f"DELETE FROM {table} WHERE client_id = ?", [(cid,) for cid in expired])
+            return expired
+        return self._transaction(cleanup)
+
+
+class RedisPipelineState(PipelineStateBackend):
+    def __init__(self, client, prefix: str = "pipeline:", max_history: int = 500, stale_after_s: float = 300,
+                 max_age_s: float = 24 * 60 * 60):
+        """State in Redis, or any server speaking its protocol, shared by workers on any host.
+
+        Only plain commands are used (SET NX EX, EXISTS, EXPIRE, DEL, INCR, RPUSH, LTRIM, LRANGE), so
+        the client can be a `redis.Redis` connected to Redis, Valkey, KeyDB, Dragonfly or a local
+        stand-in. A folder claimed with a limit of N has N slot keys taken with SET NX. The running
+        flag and the slot held by a run expire after `stale_after_s` unless refreshed, and a client's
+        keys expire after `max_age_s` of inactivity, which replaces `cleanup`.
+
+        Args:
+            client: Redis client returning bytes or str.
+            prefix (str, optional): Key prefix. Defaults to "pipeline:".
+            max_history (int, optional): Messages kept per client. Defaults to 500.
+            stale_after_s (float, optional): Silence after which a run is no longer running. Defaults to 300.
+            max_age_s (float, optional): Inactivity after which a client's history expires. Defaults to one day.
+        """
+        super().__init__(max_history, stale_after_s)
+        self.client = client
+        self.prefix = prefix
+        self.max_age_s = max_age_s
+
+    def _key(self, kind: str, client_id: str) -> str:
+        return f"{self.prefix}{kind}:{client_id}"
+
+    @staticmethod
+    def _text(value) -> str | None:
+        return value.decode("utf-8") if isinstance(value, bytes) else value
+
+    def _release_slot(self, client_id: str, folder: str = None):
+        claim_key = self._key("claim", client_id)
+        slot = self._text(self.client.get(claim_key))
+        if slot is None or (folder is not None and not slot.startswith(self._key("slot", f"{folder}:"))):
+            return
+        if self._text(self.client.get(slot)) == client_id:
+            self.client.delete(slot)
+        self.client.delete(claim_key)
+
+    def try_start(self, client_id: str, force: bool = False) -> bool:
+        started = self.client.set(self._key("run", client_id), "1", ex=int(self.stale_after_s), nx=not force)
+        if not started:
+            return False
+        self._release_slot(client_id)
+        self.client.delete(self._key("history", client_id))
+        return True
+
+    def finish(self, client_id: str):
+        self.client.delete(self._key("run", client_id))
+        self._release_slot(client_id)
+
+    def is_running(self, client_id: str) -> bool:
+        return bool(self.client.exists(self._key("run", client_id)))
+
+    def claim_folder(self, folder: str, client_id: str, limit: int = 1) -> bool:
+        ttl = int(self.stale_after_s)
+        slots = [self._key("slot", f"{folder}:{i}") for i in range(limit)]
+        if any(self._text(self.client.get(slot)) == client_id for slot in slots):
+            return True
+        for slot in slots:
+            if self.client.set(slot, client_id, ex=ttl, nx=True):
+                self.client.set(self._key("claim", client_id), slot, ex=ttl)
+                return True
+        return False
+
+    def release_folder(self, folder: str, client_id: str):
+        self._release_slot(client_id, folder)
+
+    def touch(self, client_id: str):
+        ttl = int(self.stale_after_s)
+        self.client.expire(self._key("run", client_id), ttl)
+        slot = self._text(self.client.get(self._key("claim", client_id)))
+        if slot is not None:
+            self.client.expire(slot, ttl)
+            self.client.expire(self._key("claim", client_id), ttl)
+
+    def append(self, client_id: str, message: dict) -> int:
+        seq_key, history_key = self._key("seq", client_id), self._key("history", client_id)
+        seq = int(self.client.incr(seq_key))
+        self.client.rpush(history_key, json.dumps({"seq": seq, "message": message}, ensure_ascii=False))
+        self.client.ltrim(history_key, -self.max_history, -1)
+        for key in (seq_key, history_key):
+            self.client.expire(key, int(self.max_age_s))
+        self.touch(client_id)
+        return seq
+
+    def history(self, client_id: str, after: int = 0) -> list[tuple[int, dict]]:
+        entries = [json.loads(raw) for raw in self.client.lrange(self._key("history", client_id), 0, -1)]
+        return [(entry["seq"], entry["message"]) for entry in entries if entry["seq"] > after]
+
+    def last_seq(self, client_id: str) -> int:
+        return int(self.client.get(self._key("seq", client_id)) or 0)
+
+    def cleanup(self, max_age_s: float) -> list[str]:
+        # Keys expire on their own
+        return []
+
+
+def create_pipeline_state(backend: str, path: str = None, url: str = None, max_history: int = 500,
+                          stale_after_s: float = 300) -> PipelineStateBackend:
+    """Build the state backend selected in the settings: "memory", "sqlite" (with `path`) or "redis" (with `url`)."""
+
+    if backend == "memory":
+        return MemoryPipelineState(max_history, stale_after_s)
+    if backend == "sqlite":
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        return SQLitePipelineState(path, max_history, stale_after_s)
+    if backend == "redis":
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError("The redis pipeline state backend requires the 'redis' package.") from e
+        return RedisPipelineState(redis.Redis.from_url(url), max_history=max_history, stale_after_s=stale_after_s)
+    raise ValueError(f"Pipeline state backend '{backend}' not supported. Supported: ['memory', 'sqlite', 'redis']")
@@ -0,0 +1,336 @@
+import io
+import sys
+import time
+import queue
+import asyncio
+import logging
+import importlib
+import itertools
+import threading
+import traceback
+import multiprocessing as mp
+
+
+# Prefer uvicorn's logger when running under uvicorn; fall back to module logger
+_uvicorn_logger = logging.getLogger("uvicorn.error")
+logger = _uvicorn_logger if _uvicorn_logger.handlers else logging.getLogger(__name__)
+
+# Workers dying before they finished importing this many times in a row disable the pool
+MAX_STARTUP_FAILURES = 3
+
+# Seconds between checks for crashed workers
+CHECK_INTERVAL_S = 0.5
+
+
+class _LineWriter(io.TextIOBase):
+    """Text stream sending each complete line written during a job to the parent as an event."""
+
+    def __init__(self, events, channel: str):
+        self.events = events
+        self.channel = channel
+        self.job_id = None
+        self._buffer = ""
+        self._lock = threading.Lock()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        with self._lock:
+            self._buffer += text
+            *lines, self._buffer = self._buffer.split("\n")
+            for line in lines:
+                self._emit(line)
+        return len(text)
+
+    def flush(self):
+        with self._lock:
+            if self._buffer:
+                self._emit(self._buffer)
+                self._buffer = ""
+
+    def _emit(self, line: str):
+        if self.job_id is None:
+            # Output between jobs (e.g. at import) goes to the worker's own stderr
+            sys.__stderr__.write(line + "\n")
+        else:
+            self.events.put(("line", self.job_id, self.channel, line))
+
+
+def _worker_main(target: str, ready, jobs, events):
+    """Entry point of a worker process: import `target` once, then run the jobs it is sent."""
+
+    stdout, stderr = _LineWriter(events, "stdout"), _LineWriter(events, "stderr")
+    sys.stdout, sys.stderr = stdout, stderr
+
+    module_name, function_name = target.split(":")
+    run = getattr(importlib.import_module(module_name), function_name)
+    # Log handlers created at import bound the original streams: route them through the writers
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, logging.StreamHandler) and handler.stream in (sys.__stdout__, sys.__stderr__):
+            handler.setStream(stderr)
+    # Set synchronously, unlike queued events which a crashing process may never flush
+    ready.set()
+
+    while True:
+        job = jobs.get()
+        if job is None:
+            return
+        job_id, args, kwargs = job
+        stdout.job_id = stderr.job_id = job_id
+        try:
+            code = run(*args, **kwargs)
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else 1
+        except BaseException:
+            traceback.print_exc()
+            code = 1
+        finally:
+            stdout.flush()
+            stderr.flush()
+            stdout.job_id = stderr.job_id = None
+        events.put(("exit", job_id, code or 0))
+
+
+class _Worker:
+    def __init__(self, slot: int, process, ready, jobs):
+        self.slot = slot
+        self.process = process
+        self.jobs = jobs
+        self.job = None
+        self.steps = 0
+        self._ready = ready
+
+    @property
+    def ready(self) -> bool:
+        """Whether the worker finished importing its target."""
+        return self._ready.is_set()
+
+
+class PipelineWorkerPool:
+    def __init__(self, size: int = 2, target: str = "clearml_pipeline:run_step", max_steps_per_worker: int = 50):
+        """Long-lived worker processes running pipeline steps with their imports and clients already warm.
+
+        Each worker imports `target` once and then runs the steps it is sent, one at a time, in place
+        of a fresh `python clearml_pipeline.py` per step. A step's stdout and stderr lines are forwarded
+        to the caller as they are written, and its return value is the exit code. A worker crashing
+        mid-step fails only that step, with the process exit code, and is replaced; workers are also
+        recycled after `max_steps_per_worker` steps to bound leaks. If workers keep dying before their
+        imports complete, the pool reports itself unavailable so callers can fall back to subprocesses.
+
+        Args:
+            size (int, optional): Number of worker processes. Defaults to 2.
+            target (str, optional): "module:function" run for each step. Defaults to "clearml_pipeline:run_step".
+            max_steps_per_worker (int, optional): Steps after which a worker is replaced. Defaults to 50.
+        """
+        self.size = size
+        self.target = target
+        self.max_steps_per_worker = max_steps_per_worker
+        self._ctx = mp.get_context("spawn")
+        self._events = self._ctx.Queue()
+        self._workers: list[_Worker] = []
+        self._job_ids = itertools.count(1)
+        self._running: dict[int, _Worker] = {}
+        self._outputs: dict[int, asyncio.Queue] = {}
+        self._idle: asyncio.Queue = None
+        self._loop = None
+        self._reader = None
+        self._stopping = threading.Event()
+        self.startup_failures = 0
+        self.crashes = 0
+        self.steps = 0
+
+
+    @property
+    def available(self) -> bool:
+        return self._loop is not None and self.startup_failures < MAX_STARTUP_FAILURES
+
+
+    def start(self):
+        """Spawn the workers; must be called from the event loop the steps will be awaited in."""
+
+        self._loop = asyncio.get_running_loop()
+        self._idle = asyncio.Queue()
+        for slot in range(self.size):
+            self._workers.append(self._spawn(slot))
+        self._reader = threading.Thread(target=self._read_events, name="pipeline-workers", daemon=True)
+        self._reader.start()
+
+
+    def _spawn(self, slot: int, job: tuple = None) -> _Worker:
+        ready, jobs = self._ctx.Event(), self._ctx.Queue()
+        process = self._ctx.Process(
+            target=_worker_main, args=(self.target, ready, jobs, self._events),
+            name=f"pipeline-worker-{slot}", daemon=True,
+        )
+        process.start()
+        worker = _Worker(slot, process, ready, jobs)
+        if job is None:
+            self._idle.put_nowait(worker)
+        else:
+            self._dispatch(worker, job)
+        return worker
+
+
+    def _dispatch(self, worker: _Worker, job: tuple):
+        worker.job = job
+        self._running[job[0]] = worker
+        worker.jobs.put(job)
+
+
+    def _read_events(self):
+        # Runs in a thread: hand events to the loop, and have it check for dead workers periodically
+        next_check = time.monotonic() + CHECK_INTERVAL_S
+        while not self._stopping.is_set():
+            try:
+                event = self._events.get(timeout=CHECK_INTERVAL_S)
+                self._loop.call_soon_threadsafe(self._on_event, event)
+            except queue.Empty:
+                pass
+            except (EOFError, OSError, RuntimeError):
+                # Queue closed, or event loop closed without `stop`
+                return
+            if time.monotonic() >= next_check:
+                try:
+                    self._loop.call_soon_threadsafe(self._check_workers)
+                except RuntimeError:
+                    return
+                next_check = time.monotonic() + CHECK_INTERVAL_S
+
+
+    def _on_event(self, event):
+        kind = event[0]
+        if kind == "line":
+            _, job_id, channel, line = event
+            output = self._outputs.get(job_id)
+            if output is not None:
+                output.put_nowait(("line", channel, line))
+        elif kind == "exit":
+            _, job_id, code = event
+            self._finish(job_id, code)
+
+
+    def _finish(self, job_id: int, code: int):
+        self._notify(job_id, ("exit", code))
+        worker = self._running.pop(job_id, None)
+        if worker is None:
+            return
+        worker.job = None
+        worker.steps += 1
+        self.startup_failures = 0
+        self.steps += 1
+        if worker.steps >= self.max_steps_per_worker:
+            worker.jobs.put(None)
+            self._workers[worker.slot] = self._spawn(worker.slot)
+        else:
+            self._idle.put_nowait(worker)
+
+
+    def _notify(self, job_id: int, message: tuple):
+        output = self._outputs.get(job_id)
+        if output is not None:
+            output.put_nowait(message)
+
+
+    def _check_workers(self):
+        if self._stopping.is_set() or not self.available:
+            return
+        for worker in list(self._workers):
+            if worker.process.is_alive():
+                continue
+            job = worker.job
+            if job is not None:
+                self._running.pop(job[0], None)
+
+            if worker.ready:
+                self.startup_failures = 0
+                if job is not None:
+                    self.crashes += 1
+                    logger.error(f"Pipeline worker {worker.slot} died with exit code {worker.process.exitcode} "
+                                 f"while running a step; replacing it.")
+                    self._notify(job[0], ("exit", worker.process.exitcode or 1))
+                self._workers[worker.slot] = self._spawn(worker.slot)
+                continue
+
+            self.startup_failures += 1
+            logger.error(f"Pipeline worker {worker.slot} exited with code {worker.process.exitcode} before it was ready.")
+            if not self.available:
+                logger.error("Pipeline workers keep failing at startup; running steps as subprocesses instead.")
+                if job is not None:
+                    self._notify(job[0], ("unavailable",))
+                # Wake callers waiting for a worker
+                self._idle.put_nowait(None)
+                return
+            # The step never started: hand it to the replacement
+            self._workers[worker.slot] = self._spawn(worker.slot, job)
+
+
+    async def run(self, args: tuple, kwargs: dict = None, on_line=None) -> int:
+        """Run a step on the next idle worker and return its exit code.
+
+        Args:
+            args (tuple): Positional arguments of the target function.
+            kwargs (dict, optional): Keyword arguments of the target function. Defaults to None.
+            on_line (callable, optional): `await on_line(channel, line)` for each line the step writes
+                to "stdout" or "stderr". Returning False stops forwarding; the step keeps running.
+
+        Returns:
+            int: 0 on success, the step's failure code, or the exit code of a worker that crashed.
+
+        Raises:
+            RuntimeError: When the pool became unavailable while waiting for a worker.
+        """
+
+        while True:
+            worker = await self._idle.get()
+            if worker is None:
+                self._idle.put_nowait(None)
+                raise RuntimeError("Pipeline worker pool unavailable")
+            if worker.process.is_alive() and self._workers[worker.slot] is worker:
+                break
+
+        job_id = next(self._job_ids)
+        output = self._outputs[job_id] = asyncio.Queue()
+        self._dispatch(worker, (job_id, tuple(args), kwargs or {}))
+        forward = on_line is not None
+        try:
+            while True:
+                kind, *payload = await output.get()
+                if kind == "exit":
+                    return payload[0]
+                if kind == "unavailable":
+                    raise RuntimeError("Pipeline worker pool unavailable")
+                if forward:
+                    channel, line = payload
+                    forward = await on_line(channel, line) is not False
+        finally:
+            self._outputs.pop(job_id, None)
+
+
+    def stop(self, timeout: float = 5):
+        """Ask the workers to exit after their current step, terminating those still alive after `timeout`."""
+
+        self._stopping.set()
+        for worker in self._workers:
+            try:
+                worker.jobs.put(None)
+            except (ValueError, OSError):
+                pass
+        for worker in self._workers:
+            worker.process.join(timeout)
+            if worker.process.is_alive():
+                worker.process.terminate()
+        if self._reader is not None:
+            self._reader.join(timeout=1)
+
+
+    def stats(self) -> dict:
+        """Return the number of workers, busy workers, steps run, crashes and availability."""
+
+        return {
+            "workers": len(self._workers),
+            "busy": len(self._running),
+            "steps": self.steps,
+            "crashes": self.crashes,
+            "available": self.available,
+        }
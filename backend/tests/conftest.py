@@ -124,5 +124,12 @@ except Exception:
 			dists = _np.zeros_like(idxs, dtype=float)
 			return dists, idxs
 	faiss.IndexFlatL2 = IndexFlatL2
+	faiss.IndexFlatIP = IndexFlatL2
+	def normalize_L2(arr):
+		import numpy as _np
+		norms = _np.linalg.norm(arr, axis=1, keepdims=True)
+		norms[norms == 0] = 1.0
+		arr /= norms
+	faiss.normalize_L2 = normalize_L2
 	_ensure_stub("faiss", faiss)
 
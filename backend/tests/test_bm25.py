@@ -0,0 +1,48 @@
+import numpy as np
+from models.bm25 import BM25Index, tokenize, reciprocal_rank_fusion
+
+
+CHUNKS = [
+    "Le passeport biométrique est délivré par la police.",
+    "La carte d'identité nationale est gratuite.",
+    "Horaires d'ouverture du ministère.",
+    "Demande de passeport: pièces à fournir pour le passeport.",
+]
+
+
+def test_tokenize_folds_case_and_accents():
+    assert tokenize("Délivré PAR la Police") == ["delivre", "par", "la", "police"]
+
+
+def test_search_ranks_matching_chunks():
+    index = BM25Index().build(CHUNKS)
+    indices, scores = index.search("passeport", k=5)
+
+    assert set(indices) == {0, 3}
+    # the chunk mentioning the term twice ranks first
+    assert indices[0] == 3
+    assert scores[0] >= scores[1] > 0
+    assert index.postings.dtype == np.int32
+
+
+def test_search_without_matching_terms_is_empty():
+    index = BM25Index().build(CHUNKS)
+    indices, scores = index.search("visa", k=5)
+    assert indices.size == 0 and scores.size == 0
+
+
+def test_round_trip_serialization():
+    index = BM25Index().build(CHUNKS)
+    restored = BM25Index.from_bytes(index.to_bytes())
+
+    assert restored.vocabulary == index.vocabulary
+    for query in ("passeport", "carte identite", "ministere"):
+        a, _ = index.search(query, k=2)
+        b, _ = restored.search(query, k=2)
+        assert list(a) == list(b)
+
+
+def test_reciprocal_rank_fusion():
+    indices, scores = reciprocal_rank_fusion([np.array([1, 2, 3]), np.array([3, 1])], k=2)
+    assert list(indices) == [1, 3]
+    assert scores[0] > scores[1]
@@ -0,0 +1,86 @@
+import numpy as np
+from models.cache import SemanticCache
+
+
+def test_hit_on_similar_query_same_folder_and_k():
+    cache = SemanticCache(threshold=0.9)
+    cache.put("site", [1.0, 0.0], k=5, value={"response": "a"}, version=1)
+
+    assert cache.get("site", [0.99, 0.05], k=5, version=1) == {"response": "a"}
+    assert cache.get("site", [0.0, 1.0], k=5, version=1) is None
+    assert cache.get("other", [1.0, 0.0], k=5, version=1) is None
+    assert cache.get("site", [1.0, 0.0], k=3, version=1) is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["folders"] == {"site": {"hits": 1, "misses": 2}, "other": {"hits": 0, "misses": 1}}
+
+
+def test_new_index_version_and_invalidate_drop_entries():
+    cache = SemanticCache(threshold=0.9)
+    cache.put("site", [1.0, 0.0], k=5, value={"response": "a"}, version=1)
+    assert cache.get("site", [1.0, 0.0], k=5, version=2) is None
+    assert cache.stats()["entries"] == 0
+
+    cache.put("site", [1.0, 0.0], k=5, value={"response": "b"}, version=2)
+    cache.invalidate("site")
+    assert cache.get("site", [1.0, 0.0], k=5, version=2) is None
+
+
+def test_ttl_expiry(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("models.cache.time.monotonic", lambda: now[0])
+    cache = SemanticCache(threshold=0.9, ttl_seconds=10)
+    cache.put("site", [1.0, 0.0], k=5, value={"response": "a"})
+
+    now[0] += 11
+    assert cache.get("site", [1.0, 0.0], k=5) is None
+
+
+def test_lru_eviction_respects_entry_and_memory_caps():
+    cache = SemanticCache(threshold=0.9, max_entries=2)
+    cache.put("site", [1.0, 0.0, 0.0], k=5, value={"response": "a"})
+    cache.put("site", [0.0, 1.0, 0.0], k=5, value={"response": "b"})
+    cache.get("site", [1.0, 0.0, 0.0], k=5)
+    cache.put("site", [0.0, 0.0, 1.0], k=5, value={"response": "c"})
+
+    # "b" was the least recently used entry
+    assert cache.get("site", [0.0, 1.0, 0.0], k=5) is None
+    assert cache.get("site", [1.0, 0.0, 0.0], k=5) == {"response": "a"}
+    assert cache.stats()["evictions"] == 1
+
+    small = SemanticCache(threshold=0.9, max_bytes=2000)
+    for i in range(20):
+        small.put("site", np.eye(20)[i], k=5, value={"response": "x" * 100})
+    assert small.stats()["bytes"] <= 2000
+    assert small.folder_nbytes("site") == small.stats()["bytes"]
+
+
+def test_translation_cache_normalizes_keys_and_expires(monkeypatch):
+    from models.cache import TranslationCache
+
+    now = [1000.0]
+    monkeypatch.setattr("models.cache.time.time", lambda: now[0])
+    cache = TranslationCache(max_entries=2, ttl_seconds=10)
+    cache.put("Bonjour  le monde", "English", "m", "Hello world")
+
+    assert cache.get("bonjour le monde ", "english", "m") == "Hello world"
+    assert cache.get("bonjour le monde", "english", "other-model") is None
+
+    now[0] += 11
+    assert cache.get("bonjour le monde", "english", "m") is None
+
+
+def test_translation_cache_persists_and_warms_from_logs(tmp_path):
+    from models.cache import TranslationCache
+
+    path = tmp_path / "translations.jsonl"
+    cache = TranslationCache(path=str(path))
+    cache.put("Bonjour", "english", "m", "Hello")
+
+    restarted = TranslationCache(path=str(path))
+    assert restarted.load() == 1
+    assert restarted.get("bonjour", "english", "m") == "Hello"
+
+    log = tmp_path / "queries.jsonl"
+    log.write_text('{"text": "Merci", "target": "english", "model": "m", "translation": "Thanks"}\nnot json\n')
+    assert restarted.load(str(log)) == 1
+    assert restarted.get("merci", "english", "m") == "Thanks"
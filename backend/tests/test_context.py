@@ -0,0 +1,56 @@
+import numpy as np
+from models.context import ContextAssembler, estimate_tokens
+from outils.dataset import Data, ChunkMetadata, flatten_chunks
+
+
+def _data():
+    data = Data()
+    data.documents = {"url1": "a" * 400 * 3, "url2": "b" * 400 * 2}
+    data.chunks = ["a" * 400, "a" * 400, "a" * 400, "b" * 400, "b" * 400]
+    data.metadata = ChunkMetadata.from_sources(["url1", "url1", "url1", "url2", "url2"])
+    return data
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("abcde") == 2
+
+
+def test_flatten_chunks_matches_embedding_order():
+    assert flatten_chunks([["a", " "], [], ["b", "c"]]) == ["a", "b", "c"]
+    assert flatten_chunks(["a", "b"]) == ["a", "b"]
+
+
+def test_assemble_merges_neighbors_within_document():
+    assembler = ContextAssembler(_data(), token_budget=1000, neighbors=1)
+    passages, metrics = assembler.assemble(np.array([1, 3]), np.array([0.9, 0.5]))
+
+    # chunk 1 pulls chunks 0 and 2 of url1; chunk 3 pulls chunk 4 but never chunk 2 (other document)
+    assert [p["chunks"] for p in passages] == [[0, 1, 2], [3, 4]]
+    assert [p["source"] for p in passages] == ["url1", "url2"]
+    assert passages[0]["score"] == 0.9
+    assert metrics["chunks_used"] == 5
+    assert metrics["tokens_saved"] == 0
+
+
+def test_assemble_respects_token_budget():
+    assembler = ContextAssembler(_data(), token_budget=250, neighbors=1)
+    passages, metrics = assembler.assemble(np.array([3, 0]), np.array([0.9, 0.8]))
+
+    # each chunk is 100 tokens: both hits fit, then no neighbor does
+    assert metrics["context_tokens"] == 200
+    assert [p["chunks"] for p in passages] == [[3], [0]]
+    assert metrics["full_page_tokens"] == 500
+    assert metrics["token_budget"] == 250
+
+
+def test_assemble_expands_only_kept_hits():
+    data = _data()
+    data.chunks[3] = "b" * 2000
+    assembler = ContextAssembler(data, token_budget=300, neighbors=1)
+    passages, metrics = assembler.assemble(np.array([0, 3]), np.array([0.9, 0.8]))
+
+    # hit 3 (500 tokens) is dropped, so its neighbor 4 is not added in its place
+    assert [p["chunks"] for p in passages] == [[0, 1]]
+    assert metrics["context_tokens"] == 200
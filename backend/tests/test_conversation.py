@@ -0,0 +1,71 @@
+import sys
+from models.conversation import ConversationStore
+
+
+def test_sessions_are_isolated_per_folder_and_id():
+    store = ConversationStore()
+    store.append("site", "s1", "q1", "a1")
+    store.append("site", "s2", "q2", "a2")
+    store.append("other", "s1", "q3", "a3")
+
+    assert store.history("site", "s1") == [("q1", "a1")]
+    assert store.history("site", "s2") == [("q2", "a2")]
+    assert store.history("other", "s1") == [("q3", "a3")]
+    assert store.history("site", None) == []
+
+
+def test_history_is_bounded_by_turns_and_tokens():
+    store = ConversationStore(max_turns=2, token_budget=10)
+    store.append("site", "s", "q1", "a1")
+    store.append("site", "s", "q2", "a2")
+    store.append("site", "s", "q3", "a3")
+    assert store.history("site", "s") == [("q2", "a2"), ("q3", "a3")]
+
+    store.append("site", "s", "long question", "x" * 40)
+    assert store.history("site", "s") == []
+    assert store.format_history("site", "s") == ""
+
+
+def test_idle_sessions_expire_and_lru_sessions_are_evicted(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("models.conversation.time.monotonic", lambda: now[0])
+    store = ConversationStore(max_sessions=2, idle_ttl_seconds=10)
+    store.append("site", "s1", "q", "a")
+    store.append("site", "s2", "q", "a")
+    store.append("site", "s1", "q", "a")
+    store.append("site", "s3", "q", "a")
+
+    # s2 was the least recently used session
+    assert store.history("site", "s2") == []
+    assert store.history("site", "s1") != []
+
+    now[0] += 11
+    assert store.history("site", "s1") == []
+    assert store.stats() == {"sessions": 0, "evictions": 3}
+
+
+def test_clear_forgets_only_that_session():
+    store = ConversationStore()
+    store.append("site", "s1", "q1", "a1")
+    store.append("site", "s2", "q2", "a2")
+
+    store.clear("site", "s1")
+    store.clear("site", "missing")
+
+    assert store.history("site", "s1") == []
+    assert store.history("site", "s2") == [("q2", "a2")]
+    assert store.stats()["sessions"] == 1
+
+
+def test_folder_nbytes_counts_only_that_folder():
+    store = ConversationStore()
+    assert store.folder_nbytes("site") == 0
+
+    store.append("site", "s1", "question", "answer")
+    store.append("other", "s1", "x" * 1000, "y" * 1000)
+    site = store.folder_nbytes("site")
+
+    assert site == sys.getsizeof("question") + sys.getsizeof("answer")
+    assert store.folder_nbytes("other") > site
+    store.clear("site", "s1")
+    assert store.folder_nbytes("site") == 0
@@ -16,3 +16,89 @@ def test_data_can_hold_embeddings():
     d = Data()
     d.embeddings = np.array([[1.0, 2.0], [3.0, 4.0]])
     assert d.embeddings.shape == (2, 2)
+
+
+def test_chunk_metadata_interns_sources():
+    from outils.dataset import ChunkMetadata
+
+    meta = ChunkMetadata.from_sources(["a", "a", "b", "c", "c", "c"])
+    assert meta.doc_ids.dtype == np.int32
+    assert meta.urls == ["a", "b", "c"]
+    assert list(meta.offsets) == [0, 2, 3, 6]
+    assert meta.url(4) == "c"
+
+    doc_ids, positions = meta.unique_doc_ids(np.array([5, 0, 3, 1, 2]))
+    assert [meta.urls[d] for d in doc_ids] == ["c", "a", "b"]
+    assert list(positions) == [0, 1, 4]
+
+
+def test_chunk_metadata_ungrouped_sources_have_no_offsets():
+    from outils.dataset import ChunkMetadata
+
+    meta = ChunkMetadata.from_sources(["a", "b", "a"])
+    assert list(meta.doc_ids) == [0, 1, 0]
+    assert meta.offsets is None
+
+
+def test_data_nbytes_counts_texts_and_arrays():
+    import numpy as np
+    from outils.dataset import Data
+
+    data = Data()
+    empty = data.nbytes()
+    data.documents = {"u": "x" * 1000}
+    data.chunks = ["x" * 500]
+    data.embeddings = np.zeros((10, 8), dtype=np.float32)
+
+    assert data.nbytes() - empty >= 1500 + 320
+
+
+def test_data_memory_breakdown_sums_to_nbytes():
+    import numpy as np
+    from outils.dataset import Data
+
+    data = Data()
+    data.documents = {"u": "x" * 1000}
+    data.chunks = ["x" * 500]
+    data.embeddings = np.zeros((10, 8), dtype=np.float32)
+    breakdown = data.memory_breakdown()
+
+    assert breakdown["documents"] >= 1000 and breakdown["chunks"] >= 500
+    assert breakdown["embeddings"] == 320 and breakdown["mapped"] == 0
+    assert sum(breakdown.values()) == data.nbytes()
+
+
+def test_data_memory_breakdown_is_cached_until_the_index_changes():
+    import numpy as np
+    from outils.dataset import Data
+
+    data = Data()
+    data.documents = {"u": "x" * 1000}
+    data.chunks = ["x" * 500]
+    first = data.memory_breakdown()
+
+    # In-place edits within the same index version are not re-walked
+    data.chunks.append("y" * 5000)
+    assert data.memory_breakdown() == first
+
+    data.index_version += 1
+    assert data.memory_breakdown()["chunks"] >= 5500
+
+    data.embeddings = np.zeros((10, 8), dtype=np.float32)
+    assert data.memory_breakdown()["embeddings"] == 320
+
+
+def test_data_reset_empties_the_container_in_place():
+    import numpy as np
+    from outils.dataset import Data
+
+    data = Data(fireworks_api_key="key")
+    data.chunks = ["x"]
+    data.embeddings = np.zeros((1, 2), dtype=np.float32)
+    data.index_version = 3
+    data.memory_breakdown()
+
+    data.reset()
+
+    assert data == Data(fireworks_api_key="key")
+    assert data.memory_breakdown()["chunks"] == 0
@@ -46,3 +46,47 @@ def test_search_similar_documents_and_context():
     assert "doc1 content" in context
     assert "doc2 content" in context
     assert urls == {"url1", "url2"}
+
+
+def test_inner_product_index_returns_cosine_scores():
+    data = Data()
+    data.embeddings = np.array([[3.0, 0.0], [0.0, 2.0], [1.0, 1.0]])
+    data.sources = ["url1", "url2", "url3"]
+
+    faiss_mgr = Faiss(data=data, embeddings=FakeEmb([5.0, 0.0]), metric="ip")
+    faiss_mgr.create_faiss_index()
+
+    # Embeddings are normalized once at ingest
+    assert data.embeddings.dtype == np.float32
+    assert np.allclose(np.linalg.norm(data.embeddings, axis=1), 1.0)
+
+    indices, scores = faiss_mgr.search_with_scores("query", k=3)
+    assert list(indices) == [0, 2, 1]
+    assert np.allclose(scores, [1.0, np.sqrt(0.5), 0.0], atol=1e-6)
+
+    docs = faiss_mgr.search_documents_with_scores("query", k=3, score_threshold=0.5)
+    assert list(docs) == ["url1", "url3"]
+    assert docs["url1"] > docs["url3"]
+
+
+def test_mmr_skips_near_duplicates():
+    from models.faissmanager import maximal_marginal_relevance
+
+    query = np.array([1.0, 0.0])
+    candidates = np.array([[1.0, 0.1], [1.0, 0.11], [0.7, -0.7]])
+
+    assert list(maximal_marginal_relevance(query, candidates, k=2, lambda_mult=1.0)) == [0, 1]
+    assert list(maximal_marginal_relevance(query, candidates, k=2, lambda_mult=0.5)) == [0, 2]
+
+
+def test_search_mmr_uses_stored_embeddings():
+    data = Data()
+    data.embeddings = np.array([[1.0, 0.1], [1.0, 0.11], [0.7, -0.7], [0.0, 1.0]])
+    data.sources = ["url1", "url1", "url2", "url3"]
+
+    faiss_mgr = Faiss(data=data, embeddings=FakeEmb([1.0, 0.0]), metric="ip")
+    faiss_mgr.create_faiss_index()
+
+    indices, scores = faiss_mgr.search_mmr("query", k=2, fetch_k=4, lambda_mult=0.5)
+    assert list(indices) == [0, 2]
+    assert scores[0] > scores[1]
@@ -1,7 +1,11 @@
+import io
 import json
+import hashlib
+import time
 import numpy as np
+import pytest
 from pathlib import Path
-from outils.filesmanager import FileManager
+from outils.filesmanager import FileManager, AWSFileManager, FOLDER_ARTIFACTS
 from outils.dataset import Data
 
 
@@ -33,3 +37,76 @@ def test_save_and_load_embeddings(tmp_path):
     fm.load_embeddings(folder)
 
     assert np.array_equal(data.embeddings, arr)
+
+
+class SlowS3:
+    """In-memory stand-in for the S3 client, each `get_object` taking `delay` seconds."""
+
+    def __init__(self, objects, delay):
+        self.objects = objects
+        self.delay = delay
+
+    def get_object(self, Bucket, Key):
+        time.sleep(self.delay)
+        if Key not in self.objects:
+            raise KeyError(Key)
+        return {"Body": io.BytesIO(self.objects[Key])}
+
+    def head_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise KeyError(Key)
+        return {"ETag": f'"{hashlib.md5(self.objects[Key]).hexdigest()}"'}
+
+
+def test_load_folder_data_downloads_concurrently():
+    buffer = io.BytesIO()
+    np.save(buffer, np.ones((2, 3), dtype=np.float32))
+    objects = {
+        "tenant/crawled_data.json": json.dumps({"https://a": ["Hello"]}).encode(),
+        "tenant/embeddings.npy": buffer.getvalue(),
+        "tenant/crawled_chunks.json": json.dumps([["Hello"]]).encode(),
+        "tenant/crawled_sources.json": json.dumps(["https://a"]).encode(),
+    }
+    fm = AWSFileManager(Data(), "bucket", "key", "secret", base_prefix="tenant")
+    fm.s3 = SlowS3(objects, delay=0.2)
+
+    timings = {}
+    start = time.perf_counter()
+    data = fm.load_folder_data(timings=timings)
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.5
+    assert set(timings) == set(FOLDER_ARTIFACTS)
+    assert data is fm.data
+    assert data.documents == {"https://a": ["Hello"]}
+    assert data.chunks == [["Hello"]]
+    assert data.sources == ["https://a"]
+    np.testing.assert_array_equal(data.embeddings, np.ones((2, 3), dtype=np.float32))
+
+
+def test_download_files_optional_missing():
+    fm = AWSFileManager(Data(), "bucket", "key", "secret", base_prefix="tenant")
+    fm.s3 = SlowS3({"tenant/crawled_sources.json": b'["https://a"]'}, delay=0)
+
+    files = fm.download_files_from_aws(
+        {"sources": ("crawled_sources", "json"), "bm25": ("bm25", "bin")}, optional=("bm25",)
+    )
+    assert files == {"sources": ["https://a"], "bm25": None}
+
+    with pytest.raises(KeyError):
+        fm.download_files_from_aws({"bm25": ("bm25", "bin")})
+
+
+def test_artifacts_build_id_follows_uploads():
+    objects = {f"tenant/{key}.{type_file}": b"v1" for key, type_file in FOLDER_ARTIFACTS.values()}
+    fm = AWSFileManager(Data(), "bucket", "key", "secret", base_prefix="tenant")
+    fm.s3 = SlowS3(objects, delay=0)
+
+    first = fm.artifacts_build_id()
+    assert first is not None and fm.artifacts_build_id() == first
+
+    objects["tenant/embeddings.npy"] = b"v2"
+    assert fm.artifacts_build_id() not in (None, first)
+
+    del objects["tenant/crawled_sources.json"]
+    assert fm.artifacts_build_id() is None
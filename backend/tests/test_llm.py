@@ -44,3 +44,62 @@ def test_detect_language_monkeypatched(monkeypatch):
 
     lang = fw.detect_language("Bonjour tout le monde")
     assert lang == "French"
+
+
+class FailingLLM(FakeLLM):
+    def __init__(self, *args, model=None, **kwargs):
+        super().__init__()
+        self.model = model
+        calls = self.calls = []
+
+        class _Chat:
+            class completions:
+                @staticmethod
+                def create(*a, **k):
+                    calls.append(model)
+                    if model == "primary":
+                        raise RuntimeError("unavailable")
+                    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=model))])
+
+        self.chat = _Chat()
+
+
+def test_generate_falls_back_and_opens_circuit(monkeypatch):
+    monkeypatch.setattr("models.LLM.LLM", FailingLLM)
+
+    data = SimpleNamespace(fireworks_api_key="test-api-key")
+    fw = Fireworks_LLM(data, model="primary", fallback_model="fallback", timeout_s=5, breaker_failures=2)
+
+    assert [fw.generate_QA("q") for _ in range(3)] == ["fallback"] * 3
+    # The primary model is skipped once its circuit is open
+    assert fw.llm.calls == ["primary", "primary"]
+    assert fw.breakers["primary"].state == "open"
+
+
+def test_language_profile_classifies_bounded_prefixes(monkeypatch):
+    monkeypatch.setattr("models.LLM.LLM", FakeLLM)
+    seen = []
+
+    def fake_classify(text):
+        seen.append(len(text))
+        return ("fr", 0.9) if "bonjour" in text else ("en", 0.9)
+
+    monkeypatch.setattr("models.LLM.langid.classify", fake_classify)
+    fw = Fireworks_LLM(SimpleNamespace(fireworks_api_key="test-api-key"))
+
+    profile = fw.language_profile({"u1": "bonjour " * 500, "u2": "bonjour", "u3": "hello", "u4": ""})
+
+    assert profile == {"dominant": "French", "histogram": {"French": 2, "English": 1}, "documents": 3}
+    assert max(seen) == 1000
+
+
+def test_translate_is_served_from_cache(monkeypatch):
+    from models.cache import TranslationCache
+
+    monkeypatch.setattr("models.LLM.LLM", FailingLLM)
+    fw = Fireworks_LLM(SimpleNamespace(fireworks_api_key="test-api-key"), model="translator",
+                       translation_cache=TranslationCache())
+
+    assert fw.translate("Bonjour", "english") == "translator"
+    assert fw.translate("bonjour ", "English") == "translator"
+    assert fw.llm.calls == ["translator"]
@@ -0,0 +1,62 @@
+import asyncio
+from memory_monitor import MemorySampler
+
+
+def test_one_sample_is_broadcast_to_every_subscriber():
+    calls = []
+
+    def sample():
+        calls.append(1)
+        return {"n": len(calls)}
+
+    async def scenario():
+        sampler = MemorySampler(sample, interval_s=0.05)
+        first, second = sampler.subscribe(), sampler.subscribe()
+        a, b = await first.get(), await second.get()
+        sampler.unsubscribe(first)
+        sampler.unsubscribe(second)
+        return sampler, a, b
+
+    sampler, a, b = asyncio.run(scenario())
+    assert a is b
+    assert len(calls) == 1
+    assert sampler.subscribers == 0 and sampler._task is None
+
+
+def test_slow_subscriber_only_keeps_the_latest_snapshot():
+    calls = []
+
+    def sample():
+        calls.append(1)
+        return len(calls)
+
+    async def scenario():
+        sampler = MemorySampler(sample, interval_s=0.01)
+        queue = sampler.subscribe()
+        await asyncio.sleep(0.1)
+        latest = await queue.get()
+        await sampler.stop()
+        return latest, queue.qsize()
+
+    latest, remaining = asyncio.run(scenario())
+    assert latest >= len(calls) - 1 > 1
+    assert remaining == 0
+
+
+def test_sampling_errors_do_not_stop_the_loop():
+    calls = []
+
+    def sample():
+        calls.append(1)
+        if len(calls) == 1:
+            raise OSError("boom")
+        return "ok"
+
+    async def scenario():
+        sampler = MemorySampler(sample, interval_s=0.01)
+        queue = sampler.subscribe()
+        value = await asyncio.wait_for(queue.get(), timeout=1)
+        await sampler.stop()
+        return value
+
+    assert asyncio.run(scenario()) == "ok"
@@ -0,0 +1,63 @@
+import pytest
+from models.metrics import MetricsRegistry
+
+
+def test_render_counters_gauges_and_histograms():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests.", ("folder",))
+    rate = registry.gauge("rate", "Rate.")
+    latency = registry.histogram("latency_seconds", "Latency.", ("folder",), buckets=(0.1, 1))
+
+    requests.inc(folder="a")
+    requests.inc(2, folder="a")
+    rate.set(1.5)
+    latency.observe(0.05, folder="a")
+    latency.observe(0.5, folder="a")
+    text = registry.render()
+
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{folder="a"} 3' in text
+    assert "rate 1.5" in text
+    assert 'latency_seconds_bucket{folder="a",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{folder="a",le="1"} 2' in text
+    assert 'latency_seconds_bucket{folder="a",le="+Inf"} 2' in text
+    assert 'latency_seconds_sum{folder="a"} 0.55' in text
+    assert 'latency_seconds_count{folder="a"} 2' in text
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    registry.counter("c_total", "C.", ("folder",)).inc(folder='a"b\\c')
+    assert 'c_total{folder="a\\"b\\\\c"} 1' in registry.render()
+
+
+def test_declaring_twice_returns_the_same_metric():
+    registry = MetricsRegistry()
+    assert registry.counter("c_total", "C.", ("folder",)) is registry.counter("c_total", "C.", ("folder",))
+    with pytest.raises(ValueError):
+        registry.gauge("c_total", "C.")
+
+
+def test_labels_must_match_declaration():
+    counter = MetricsRegistry().counter("c_total", "C.", ("folder",))
+    with pytest.raises(ValueError):
+        counter.inc(tenant="a")
+    with pytest.raises(ValueError):
+        counter.inc(-1, folder="a")
+
+
+def test_collectors_are_read_at_render_time():
+    registry = MetricsRegistry()
+    hits = {"n": 0}
+    registry.collector(lambda: [("cache_hits_total", "counter", "Hits.", [({"cache": "x"}, hits["n"])])])
+
+    hits["n"] = 4
+    assert 'cache_hits_total{cache="x"} 4' in registry.render()
+
+
+def test_histogram_times_a_block():
+    histogram = MetricsRegistry().histogram("t_seconds", "T.")
+    with pytest.raises(RuntimeError):
+        with histogram.time():
+            raise RuntimeError
+    assert histogram.count() == 1
@@ -0,0 +1,195 @@
+import os
+import faiss
+import numpy as np
+import pytest
+from models.faissmanager import Faiss
+from models.bm25 import BM25Index
+from outils.dataset import Data
+from outils.mmapstore import TextStore, DocumentStore, TenantStore
+
+
+class FakeEmb:
+    def __init__(self, vec):
+        self._vec = np.array(vec)
+
+    def fireworks_encoding_query(self, query):
+        return self._vec
+
+
+def built_data() -> Data:
+    data = Data()
+    data.documents = {"url1": "Passeport biométrique délivré.", "url2": "Carte d'identité gratuite."}
+    data.chunks = [["Passeport biométrique", "délivré."], ["Carte d'identité gratuite."]]
+    data.sources = ["url1", "url1", "url2"]
+    data.embeddings = np.array([[1.0, 0.0], [0.8, 0.2], [0.0, 1.0]])
+    Faiss(data=data, embeddings=FakeEmb([1.0, 0.0])).create_faiss_index()
+    data.bm25 = BM25Index().build(data.chunks)
+    data.documents_language = "fr"
+    return data
+
+
+def test_text_store_reads_back_strings(tmp_path):
+    prefix = str(tmp_path / "texts")
+    texts = ["é", "", "deux mots", "三"]
+    TextStore.write(prefix, texts)
+    store = TextStore(prefix)
+
+    assert len(store) == 4
+    assert list(store) == texts
+    assert store[-1] == "三"
+    assert store[1:3] == ["", "deux mots"]
+    with pytest.raises(IndexError):
+        store[4]
+
+
+def test_empty_stores(tmp_path):
+    TextStore.write(str(tmp_path / "texts"), [])
+    DocumentStore.write(str(tmp_path / "documents"), {})
+
+    assert len(TextStore(str(tmp_path / "texts"))) == 0
+    assert dict(DocumentStore(str(tmp_path / "documents"))) == {}
+
+
+def test_document_store_maps_urls_to_texts(tmp_path):
+    prefix = str(tmp_path / "documents")
+    DocumentStore.write(prefix, {"a": "texte A", "b": "texte B"})
+    store = DocumentStore(prefix)
+
+    assert store["b"] == "texte B"
+    assert store.get("c") is None
+    assert list(store) == ["a", "b"]
+
+
+def test_bm25_save_and_load_memory_mapped(tmp_path):
+    index = BM25Index().build(["le passeport", "la carte", "passeport et carte"])
+    index.save(str(tmp_path / "bm25"))
+    restored = BM25Index.load(str(tmp_path / "bm25"))
+
+    assert isinstance(restored.postings, np.memmap)
+    for query in ("passeport", "carte"):
+        a, sa = index.search(query, k=3)
+        b, sb = restored.search(query, k=3)
+        np.testing.assert_array_equal(a, b)
+        np.testing.assert_allclose(sa, sb)
+
+
+def test_tenant_store_round_trip(tmp_path):
+    store = TenantStore(str(tmp_path))
+    data = built_data()
+    expected = data.index.search(np.array([[1.0, 0.0]], dtype=np.float32), 2)
+
+    version = store.save("site/fr", data, {"dominant": "fr"})
+    mapped = Data()
+    manifest = store.load("site/fr", mapped)
+
+    assert manifest["language"] == {"dominant": "fr"}
+    assert mapped.store_version == version == store.version("site/fr")
+    assert isinstance(mapped.embeddings, np.memmap)
+    assert list(mapped.chunks) == data.chunks
+    assert mapped.documents["url2"] == data.documents["url2"]
+    assert mapped.metadata.urls == data.metadata.urls
+    np.testing.assert_array_equal(mapped.metadata.doc_ids, data.metadata.doc_ids)
+    np.testing.assert_array_equal(mapped.index.search(np.array([[1.0, 0.0]], dtype=np.float32), 2)[1], expected[1])
+    assert mapped.bm25.search("passeport", k=1)[0][0] == 0
+    assert mapped.documents_language == "fr"
+    # Mapped pages are shared between workers, so they are not charged to the model
+    assert mapped.nbytes() < data.nbytes()
+
+
+def test_tenant_store_keeps_latest_versions(tmp_path):
+    store = TenantStore(str(tmp_path), keep_versions=2)
+    data = built_data()
+    versions = [store.save("site", data) for _ in range(3)]
+
+    folder_dir = store._folder_dir("site")
+    assert sorted(name for name in os.listdir(folder_dir) if name.isdigit()) == versions[1:]
+    assert store.version("site") == versions[-1]
+
+
+def test_tenant_store_unknown_folder(tmp_path):
+    data = Data()
+    assert TenantStore(str(tmp_path)).load("missing", data) is None
+    assert data.store_version is None
+
+
+def test_tenant_store_skips_versions_of_another_build(tmp_path):
+    store = TenantStore(str(tmp_path))
+    store.save("site", built_data(), build_id="build-1")
+
+    assert store.load("site", Data(), build_id="build-2") is None
+    data = Data()
+    assert store.load("site", data, build_id="build-1")["build_id"] == "build-1"
+    assert data.store_version == store.version("site")
+
+
+def test_tenant_store_invalidate(tmp_path):
+    store = TenantStore(str(tmp_path))
+    version = store.save("site", built_data())
+
+    store.invalidate("site")
+    store.invalidate("site")
+
+    assert store.version("site") is None
+    assert store.load("site", Data()) is None
+    # Workers still mapping the version keep their files
+    assert os.path.isdir(os.path.join(store._folder_dir("site"), version))
+
+
+def test_rebuilt_index_is_no_longer_counted_as_mapped(tmp_path):
+    store = TenantStore(str(tmp_path))
+    store.save("site", built_data())
+    data = Data()
+    store.load("site", data)
+    assert data.memory_breakdown()["faiss_index"] == 0
+
+    data.embeddings = np.array([[1.0, 0.0], [0.8, 0.2], [0.0, 1.0]])
+    Faiss(data=data, embeddings=FakeEmb([1.0, 0.0])).create_faiss_index()
+
+    breakdown = data.memory_breakdown()
+    assert data.store_version is None
+    assert breakdown["faiss_index"] == 3 * 2 * 4 and breakdown["mapped"] == 0
+
+
+@pytest.mark.skipif(not hasattr(faiss, "IO_FLAG_MMAP_IFC"), reason="FAISS build cannot memory-map flat indexes")
+def test_tenant_store_maps_the_index(tmp_path):
+    store = TenantStore(str(tmp_path))
+    store.save("site", built_data())
+    data = Data()
+    store.load("site", data)
+
+    assert data.index_mapped
+    assert data.memory_breakdown()["faiss_index"] == 0
+
+
+def test_tenant_store_rebuilds_the_index_without_mmap_support(tmp_path, monkeypatch):
+    store = TenantStore(str(tmp_path))
+    built = built_data()
+    query = np.array([[1.0, 0.0]], dtype=np.float32)
+    expected = built.index.search(query, 3)
+    store.save("site", built)
+    monkeypatch.delattr(faiss, "IO_FLAG_MMAP_IFC", raising=False)
+
+    data = Data()
+    store.load("site", data)
+
+    assert not data.index_mapped
+    np.testing.assert_array_equal(data.index.search(query, 3)[1], expected[1])
+    np.testing.assert_allclose(data.index.search(query, 3)[0], expected[0], rtol=1e-6)
+    assert data.memory_breakdown()["faiss_index"] == 3 * 2 * 4
+
+
+def test_tenant_store_remove(tmp_path):
+    store = TenantStore(str(tmp_path))
+    store.save("site", built_data())
+    store.save("other", built_data())
+    mapped = Data()
+    store.load("site", mapped)
+
+    store.remove("site")
+    store.remove("site")
+
+    assert store.version("site") is None
+    assert not os.path.exists(store._folder_dir("site"))
+    assert store.version("other") is not None
+    # A worker still mapping the removed files keeps serving until it reloads
+    assert mapped.bm25.search("passeport", k=1)[0][0] == 0
@@ -0,0 +1,19 @@
+import subprocess
+import sys
+import os
+from model_factory import DataRequest, extract_domain, get_aws_folder_path
+
+
+def test_folder_paths():
+    assert extract_domain("https://www.canada.ca/fr/services.html") == "canada_ca"
+    assert get_aws_folder_path({"data_folder": "default"}, "https://a.com", "default") == "default"
+    assert get_aws_folder_path(DataRequest(data_folder="default"), "https://a.com", "default") == "default"
+    assert get_aws_folder_path({"data_folder": None}, "https://A.com/x", "default") == "httpsacomx"
+
+
+def test_import_does_not_set_up_the_api():
+    # Pipeline worker processes import this module: it must not pull in the API and its settings
+    code = "import sys, model_factory; print(sorted(m for m in ('api', 'fastapi', 'load_settings') if m in sys.modules))"
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", code], cwd=backend, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
@@ -0,0 +1,167 @@
+import os
+import json
+import asyncio
+from pipeline_queue import PipelineJobQueue
+
+
+class Runs:
+    """Runner whose jobs block until released, recording start order and concurrency."""
+
+    def __init__(self):
+        self.started = []
+        self.release = {}
+        self.running = 0
+        self.peak = 0
+
+    async def __call__(self, job):
+        self.started.append(job.client_id)
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        event = self.release.setdefault(job.client_id, asyncio.Event())
+        await event.wait()
+        self.running -= 1
+        return True
+
+    def finish(self, client_id):
+        self.release.setdefault(client_id, asyncio.Event()).set()
+
+
+def test_queue_caps_priority_and_fairness():
+    async def scenario():
+        runs, messages = Runs(), []
+
+        async def notify(job, msg):
+            messages.append((job.client_id, msg["position"]))
+
+        queue = PipelineJobQueue(runs, notify=notify, max_concurrent=2, max_per_folder=1)
+        queue.submit("a1", "a", {})
+        queue.submit("a2", "a", {})
+        queue.submit("a3", "a", {})
+        queue.submit("b1", "b", {})
+        queue.submit("c1", "c", {})
+        assert queue.submit("c1", "c", {}) is queue.active("c1")
+        queue.submit("admin", "d", {}, admin=True)
+        await asyncio.sleep(0)
+        # a1 and a2 never run together; b1 started next as "a" was busy
+        assert runs.started == ["a1", "b1"]
+
+        runs.finish("b1")
+        await asyncio.sleep(0.01)
+        assert runs.started[-1] == "admin"
+
+        runs.finish("a1")
+        await asyncio.sleep(0.01)
+        # "c" was never served, "a" just was
+        assert runs.started[-1] == "c1"
+
+        for client_id in ("admin", "c1", "a2", "a3"):
+            runs.finish(client_id)
+            await asyncio.sleep(0.01)
+        return runs, messages, queue.stats()
+
+    runs, messages, stats = asyncio.run(scenario())
+    assert runs.started == ["a1", "b1", "admin", "c1", "a2", "a3"]
+    assert runs.peak == 2
+    assert ("a3", 2) in messages and ("a3", 1) in messages
+    assert stats["completed"] == 6 and not stats["queued"] and not stats["running"]
+
+
+
+def test_jobs_wait_for_folders_claimed_elsewhere():
+    async def scenario():
+        runs, claimed, released = Runs(), {"site": "other-worker"}, []
+
+        def claim(job):
+            if claimed.get(job.folder, job.client_id) != job.client_id:
+                return False
+            claimed[job.folder] = job.client_id
+            return True
+
+        def release(job):
+            released.append(job.client_id)
+            claimed.pop(job.folder, None)
+
+        queue = PipelineJobQueue(runs, max_concurrent=2, claim=claim, release=release)
+        queue.submit("a", "site", {})
+        queue.submit("b", "free", {})
+        await asyncio.sleep(0)
+        assert runs.started == ["b"]
+        assert [job["folder"] for job in queue.stats()["queued"]] == ["site"]
+
+        # The other worker's run ends: the next poll starts the waiting job
+        del claimed["site"]
+        queue.poll()
+        await asyncio.sleep(0)
+        assert runs.started == ["b", "a"]
+
+        runs.finish("a")
+        runs.finish("b")
+        await asyncio.sleep(0.01)
+        return sorted(released), claimed
+
+    released, claimed = asyncio.run(scenario())
+    assert released == ["a", "b"]
+    assert claimed == {}
+
+
+def _saved_files(tmp_path) -> list:
+    return [p for p in tmp_path.iterdir() if not p.name.endswith(".lock")]
+
+
+def test_queue_restores_unfinished_jobs(tmp_path):
+    path = str(tmp_path / "jobs.json")
+
+    async def interrupted():
+        runs = Runs()
+        queue = PipelineJobQueue(runs, max_concurrent=1, path=path)
+        queue.submit("a", "a", {"url": "https://a"})
+        queue.submit("b", "b", {"url": "https://b"})
+        await asyncio.sleep(0)
+        await queue.stop()
+        return runs.started
+
+    # The restarted process may well get the same PID (e.g. PID 1 in a container): nothing is renamed
+    assert asyncio.run(interrupted()) == ["a"]
+    [saved] = _saved_files(tmp_path)
+    with open(saved) as f:
+        assert [job["client_id"] for job in json.load(f)] == ["a", "b"]
+
+    async def restarted():
+        runs = Runs()
+        queue = PipelineJobQueue(runs, max_concurrent=2, path=path)
+        restored = queue.restore()
+        queue.start()
+        await asyncio.sleep(0)
+        runs.finish("a")
+        runs.finish("b")
+        await asyncio.sleep(0.01)
+        await queue.stop()
+        return restored, runs.started
+
+    restored, started = asyncio.run(restarted())
+    assert [job.data["url"] for job in restored] == ["https://a", "https://b"]
+    assert started == ["a", "b"]
+    assert not list(tmp_path.iterdir())
+
+
+def test_queue_does_not_restore_jobs_of_a_live_worker(tmp_path):
+    path = str(tmp_path / "jobs.json")
+
+    async def scenario():
+        live = PipelineJobQueue(Runs(), max_concurrent=1, path=path)
+        live.submit("a", "a", {})
+        live.submit("b", "b", {})
+        await asyncio.sleep(0)
+
+        sibling = PipelineJobQueue(Runs(), path=path)
+        restored = sibling.restore()
+        sibling.start()
+        saved = _saved_files(tmp_path)
+        await live.stop()
+        await sibling.stop()
+        return restored, saved
+
+    restored, saved = asyncio.run(scenario())
+    assert restored == []
+    # The live worker's file survived the sibling's start
+    assert len(saved) == 1
@@ -0,0 +1,160 @@
+import time
+import pytest
+from pipeline_state import PipelineStateBackend, MemoryPipelineState, SQLitePipelineState, RedisPipelineState
+
+
+class FakeRedis:
+    """Local stand-in for the few Redis commands the state backend uses."""
+
+    def __init__(self):
+        self.values = {}
+        self.expires = {}
+
+    def _alive(self, key):
+        if key in self.expires and time.time() >= self.expires[key]:
+            self.values.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.values
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and self._alive(key):
+            return None
+        self.values[key] = value
+        if ex is not None:
+            self.expires[key] = time.time() + ex
+        return True
+
+    def get(self, key):
+        return self.values.get(key) if self._alive(key) else None
+
+    def exists(self, key):
+        return int(self._alive(key))
+
+    def delete(self, key):
+        self.values.pop(key, None)
+        self.expires.pop(key, None)
+
+    def expire(self, key, seconds):
+        if self._alive(key):
+            self.expires[key] = time.time() + seconds
+
+    def incr(self, key):
+        self.values[key] = int(self.get(key) or 0) + 1
+        return self.values[key]
+
+    def rpush(self, key, value):
+        self.values.setdefault(key, []).append(value)
+
+    def ltrim(self, key, start, end):
+        items = self.values.get(key, [])
+        self.values[key] = items[start:] if end == -1 else items[start:end + 1]
+
+    def lrange(self, key, start, end):
+        items = self.values.get(key, [])
+        return items[start:] if end == -1 else items[start:end + 1]
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def make_backend(request, tmp_path):
+    redis = FakeRedis()
+
+    def make(**kwargs):
+        if request.param == "memory":
+            return MemoryPipelineState(**kwargs)
+        if request.param == "sqlite":
+            return SQLitePipelineState(str(tmp_path / "state.sqlite3"), **kwargs)
+        return RedisPipelineState(redis, **kwargs)
+    return make
+
+
+def test_runs_are_deduplicated_and_history_bounded(make_backend):
+    state = make_backend(max_history=3)
+    assert state.try_start("c")
+    assert not state.try_start("c")
+    assert state.is_running("c")
+
+    seqs = [state.append("c", {"step": "crawling", "value": i}) for i in range(5)]
+    assert seqs == [1, 2, 3, 4, 5]
+    assert [msg["value"] for _, msg in state.history("c")] == [2, 3, 4]
+    assert [seq for seq, _ in state.history("c", after=4)] == [5]
+
+    state.finish("c")
+    assert not state.is_running("c")
+    # Sequence numbers keep increasing across runs so that cursors stay valid
+    assert state.try_start("c")
+    assert state.history("c") == []
+    assert state.append("c", {"step": "initializing"}) == 6
+    assert state.last_seq("c") == 6
+
+
+def test_stale_runs_can_be_taken_over(make_backend):
+    state = make_backend(stale_after_s=1)
+    assert state.try_start("c")
+    assert not state.try_start("c")
+    assert state.try_start("c", force=True)
+    time.sleep(1.1)
+    assert not state.is_running("c")
+    assert state.try_start("c")
+
+
+def test_folder_claims_are_capped(make_backend):
+    state = make_backend()
+    for client_id in "abcd":
+        assert state.try_start(client_id)
+
+    assert state.claim_folder("site", "a")
+    assert state.claim_folder("site", "a")
+    assert not state.claim_folder("site", "b")
+    assert state.claim_folder("other", "c")
+    assert state.claim_folder("site", "b", limit=2)
+    assert not state.claim_folder("site", "d", limit=2)
+
+    state.release_folder("site", "a")
+    assert state.claim_folder("site", "d", limit=2)
+    # Finishing a run releases its claims
+    state.finish("b")
+    assert state.claim_folder("site", "a", limit=2)
+
+
+def test_stale_folder_claims_are_ignored(make_backend):
+    state = make_backend(stale_after_s=1)
+    assert state.try_start("a") and state.try_start("b")
+    assert state.claim_folder("site", "a")
+    time.sleep(1.1)
+    assert state.try_start("b", force=True)
+    assert state.claim_folder("site", "b")
+
+
+def test_backends_must_implement_every_method():
+    class Partial(PipelineStateBackend):
+        def try_start(self, client_id, force=False):
+            return True
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_sqlite_state_is_shared_between_workers(tmp_path):
+    path = str(tmp_path / "state.sqlite3")
+    worker_a, worker_b = SQLitePipelineState(path), SQLitePipelineState(path)
+
+    assert worker_a.try_start("c")
+    assert not worker_b.try_start("c")
+    worker_a.append("c", {"step": "crawling", "status": "in_progress", "value": 40})
+    assert worker_b.history("c") == [(1, {"step": "crawling", "status": "in_progress", "value": 40})]
+
+    worker_a.finish("c")
+    assert not worker_b.is_running("c")
+    assert worker_b.cleanup(max_age_s=-1) == ["c"]
+    assert worker_a.last_seq("c") == 0
+
+
+def test_folder_claims_are_shared_between_workers(tmp_path):
+    path = str(tmp_path / "state.sqlite3")
+    worker_a, worker_b = SQLitePipelineState(path), SQLitePipelineState(path)
+    assert worker_a.try_start("a") and worker_b.try_start("b")
+
+    assert worker_a.claim_folder("site", "a")
+    assert not worker_b.claim_folder("site", "b")
+    worker_a.finish("a")
+    assert worker_b.claim_folder("site", "b")
@@ -0,0 +1,71 @@
+import os
+import asyncio
+import logging
+from pipeline_workers import PipelineWorkerPool
+
+
+def fake_step(step, url, folder, max_depth=250):
+    """Pipeline step run inside the workers: reports its pid, logs progress, or crashes."""
+    if step == "crash":
+        os._exit(3)
+    print(f"pid {os.getpid()}")
+    logging.getLogger("fake_step").warning(f"PROGRESS: 50% - {folder} depth {max_depth}")
+    if step == "raise":
+        raise ValueError("boom")
+    return 0
+
+
+async def run_steps(pool, steps):
+    results = []
+    for args, kwargs in steps:
+        lines = []
+
+        async def on_line(channel, line, lines=lines):
+            lines.append((channel, line))
+
+        code = await pool.run(args, kwargs, on_line=on_line)
+        results.append((code, lines))
+    return results
+
+
+def test_pool_reuses_warm_workers_and_forwards_output():
+    async def scenario():
+        pool = PipelineWorkerPool(size=1, target=f"{__name__}:fake_step")
+        pool.start()
+        try:
+            return await run_steps(pool, [
+                (("ok", "https://a", "folder_a"), {"max_depth": 3}),
+                (("ok", "https://b", "folder_b"), {}),
+                (("raise", "https://c", "folder_c"), {}),
+            ]), pool.stats()
+        finally:
+            await asyncio.to_thread(pool.stop)
+
+    results, stats = asyncio.run(scenario())
+    (code_a, lines_a), (code_b, lines_b), (code_c, lines_c) = results
+
+    assert code_a == 0 and code_b == 0 and code_c == 1
+    assert ("stderr", "PROGRESS: 50% - folder_a depth 3") in lines_a
+    pids = {line for channel, line in lines_a + lines_b if channel == "stdout"}
+    assert len(pids) == 1
+    assert any("ValueError: boom" in line for _, line in lines_c)
+    assert stats["steps"] == 3 and stats["crashes"] == 0
+
+
+def test_pool_replaces_crashed_worker():
+    async def scenario():
+        pool = PipelineWorkerPool(size=1, target=f"{__name__}:fake_step")
+        pool.start()
+        try:
+            results = await run_steps(pool, [
+                (("crash", "https://a", "folder_a"), {}),
+                (("ok", "https://b", "folder_b"), {}),
+            ])
+            return results, pool.stats()
+        finally:
+            await asyncio.to_thread(pool.stop)
+
+    results, stats = asyncio.run(scenario())
+    assert results[0][0] == 3
+    assert results[1][0] == 0
+    assert stats["crashes"] == 1 and stats["available"]
@@ -0,0 +1,267 @@
+import time
+import asyncio
+import numpy as np
+from outils.dataset import Data
+from models.faissmanager import Faiss
+from models.bm25 import BM25Index
+from models.LLM import Fireworks_LLM
+from models.RAG import (FaissRetriever, LangChainRAGAgent, QUERY_EMBEDDING_SECONDS, VECTOR_SEARCH_SECONDS,
+                        LLM_SECONDS, LLM_TOKENS)
+
+
+class SlowEmb:
+    def __init__(self, vec, delay=0.0):
+        self._vec = np.array(vec)
+        self.delay = delay
+
+    def fireworks_encoding_query(self, query):
+        time.sleep(self.delay)
+        return self._vec
+
+
+def _data():
+    data = Data()
+    data.documents = {"url1": "alpha beta", "url2": "gamma passport"}
+    data.chunks = ["alpha beta", "gamma passport"]
+    data.sources = ["url1", "url2"]
+    data.embeddings = np.array([[1.0, 0.0], [0.0, 1.0]])
+    return data
+
+
+def _faiss(data, embeddings):
+    faiss_mgr = Faiss(data=data, embeddings=embeddings, metric="ip")
+    faiss_mgr.create_faiss_index()
+    return faiss_mgr
+
+
+def _retriever(delay):
+    data = _data()
+    faiss_mgr = _faiss(data, SlowEmb([1.0, 0.0], delay=delay))
+    data.bm25 = BM25Index().build(data.chunks)
+    return FaissRetriever(faiss=faiss_mgr, data=data, k=1, neighbors=0, embedding_deadline=0.05)
+
+
+def test_retriever_uses_vector_results_within_deadline():
+    docs = _retriever(delay=0.0).invoke("passport")
+    assert [d.metadata["source"] for d in docs] == ["url1"]
+
+
+def test_retriever_falls_back_to_bm25_past_deadline():
+    start = time.perf_counter()
+    docs = _retriever(delay=0.5).invoke("passport")
+    assert time.perf_counter() - start < 0.4
+    assert [d.metadata["source"] for d in docs] == ["url2"]
+
+
+class FakeLLM(Fireworks_LLM):
+    def __init__(self):
+        self.prompts = []
+
+    def generate_QA(self, prompt):
+        self.prompts.append(prompt)
+        return "answer"
+
+
+def test_agent_answer_runs_direct_path():
+    retriever = _retriever(delay=0.0)
+    llm = FakeLLM()
+    agent = LangChainRAGAgent(retriever.data, retriever.faiss, llm, neighbors=0)
+
+    result = agent.answer("alpha", k=1)
+
+    assert result["response"] == "answer"
+    assert result["sources"] == ["url1"]
+    assert result["passages"][0]["text"] == "alpha beta"
+    assert "Context:\nalpha beta" in llm.prompts[0]
+    assert set(result["metrics"]["timings"]) == {"retrieval_ms", "prompt_ms", "llm_ms", "total_ms", "overhead_ms"}
+
+
+def test_agent_answer_with_chain_reports_overhead_without_touching_shared_retriever():
+    retriever = _retriever(delay=0.0)
+    agent = LangChainRAGAgent(retriever.data, retriever.faiss, FakeLLM(), neighbors=0)
+    k_before = agent.retriever.k
+
+    result = agent.answer_with_chain("alpha", k=1)
+
+    assert result["response"] == "answer"
+    assert result["sources"] == ["url1"]
+    assert set(result["metrics"]["timings"]) == {"retrieval_ms", "llm_ms", "total_ms", "overhead_ms"}
+    assert result["metrics"]["timings"]["overhead_ms"] >= 0
+    assert agent.retriever.k == k_before
+    assert agent.retriever.metrics is None
+
+
+def test_agent_answer_records_phase_metrics_per_folder():
+    retriever = _retriever(delay=0.0)
+    agent = LangChainRAGAgent(retriever.data, retriever.faiss, FakeLLM(), neighbors=0, folder="metrics-tenant")
+
+    agent.answer("alpha", k=1)
+
+    for histogram in (QUERY_EMBEDDING_SECONDS, VECTOR_SEARCH_SECONDS, LLM_SECONDS):
+        assert histogram.count(folder="metrics-tenant") == 1
+    assert LLM_TOKENS.value(folder="metrics-tenant", direction="in") > 0
+    assert LLM_TOKENS.value(folder="metrics-tenant", direction="out") == 2
+
+
+class FakeStreamingLLM(FakeLLM):
+    def stream_QA(self, prompt):
+        self.prompts.append(prompt)
+        yield "ans"
+        yield "wer"
+
+
+def test_agent_stream_answer_sends_sources_tokens_then_done():
+    retriever = _retriever(delay=0.0)
+    agent = LangChainRAGAgent(retriever.data, retriever.faiss, FakeStreamingLLM(), neighbors=0)
+
+    events = list(agent.stream_answer("alpha", k=1))
+
+    assert [e["event"] for e in events] == ["sources", "token", "token", "done"]
+    assert events[0]["sources"] == ["url1"]
+    assert events[-1]["response"] == "answer"
+    assert "ttft_ms" in events[-1]["metrics"]["timings"]
+
+
+def test_agent_serves_repeated_query_from_semantic_cache():
+    from models.cache import SemanticCache
+
+    retriever = _retriever(delay=0.0)
+    llm = FakeLLM()
+    agent = LangChainRAGAgent(retriever.data, retriever.faiss, llm, neighbors=0,
+                              cache=SemanticCache(threshold=0.9), folder="site")
+
+    first = agent.answer("alpha", k=1)
+    second = agent.answer("alpha", k=1)
+
+    assert len(llm.prompts) == 1
+    assert first["metrics"]["cache"] == "miss"
+    assert second["metrics"]["cache"] == "hit"
+    assert second["response"] == first["response"]
+
+
+def test_agent_keeps_conversation_history_per_session():
+    from models.conversation import ConversationStore
+
+    retriever = _retriever(delay=0.0)
+    llm = FakeLLM()
+    agent = LangChainRAGAgent(retriever.data, retriever.faiss, llm, neighbors=0,
+                              conversations=ConversationStore(), folder="site")
+
+    agent.answer("alpha", k=1, session_id="s1")
+    agent.answer("and beta?", k=1, session_id="s1")
+    agent.answer("gamma", k=1, session_id="s2")
+
+    assert "Previous conversation" not in llm.prompts[0]
+    assert "Q: alpha\nA: answer" in llm.prompts[1]
+    assert "Previous conversation" not in llm.prompts[2]
+
+
+class TranslatingLLM(FakeLLM):
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+
+    def translate(self, prompt, target_language):
+        time.sleep(self.delay)
+        return "passport"
+
+
+class TextEmb:
+    vectors = {"passeport": [1.0, 0.0, 0.0], "passport": [0.0, 1.0, 0.0]}
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    def fireworks_encoding_query(self, query):
+        time.sleep(self.delay)
+        return np.array(self.vectors[query])
+
+
+def _translating_retriever(embedding_delay, translation_delay):
+    data = Data()
+    data.documents = {"url1": "a", "url2": "b", "url3": "c"}
+    data.chunks = ["a", "b", "c"]
+    data.sources = ["url1", "url2", "url3"]
+    data.embeddings = np.eye(3)
+    data.documents_language = "english"
+    return FaissRetriever(faiss=_faiss(data, TextEmb(delay=embedding_delay)), data=data,
+                          fw_llm=TranslatingLLM(delay=translation_delay), neighbors=0, score_threshold=0.5)
+
+
+def test_retriever_translates_concurrently_and_fuses_both_rankings():
+    retriever = _translating_retriever(embedding_delay=0.2, translation_delay=0.4)
+
+    start = time.perf_counter()
+    passages, _ = retriever.retrieve("passeport", k=2, query_language="French")
+
+    # Sequential calls would take 0.2 + 0.4 + 0.2 seconds
+    assert time.perf_counter() - start < 0.75
+    assert {p["source"] for p in passages} == {"url1", "url2"}
+
+
+def test_retriever_translates_only_queries_in_another_language():
+    retriever = _translating_retriever(embedding_delay=0, translation_delay=0)
+
+    # The language is per call: one request does not change how the next one is handled
+    french, _ = retriever.retrieve("passeport", k=2, query_language="French")
+    english, _ = retriever.retrieve("passeport", k=2, query_language="English")
+
+    assert {p["source"] for p in french} == {"url1", "url2"}
+    assert {p["source"] for p in english} == {"url1"}
+
+
+class AsyncSlowEmb(SlowEmb):
+    async def afireworks_encoding_query(self, query):
+        await asyncio.sleep(self.delay)
+        return self._vec
+
+
+class AsyncSlowLLM(FakeLLM):
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+
+    async def agenerate_QA(self, prompt):
+        await asyncio.sleep(self.delay)
+        self.prompts.append(prompt)
+        return "answer"
+
+
+def test_agent_aanswer_serves_concurrent_requests_in_parallel():
+    data = _data()
+    faiss_mgr = _faiss(data, AsyncSlowEmb([1.0, 0.0], delay=0.05))
+    llm = AsyncSlowLLM(delay=0.2)
+    agent = LangChainRAGAgent(data, faiss_mgr, llm, neighbors=0)
+
+    async def run(n):
+        return await asyncio.gather(*(agent.aanswer("alpha", k=1) for _ in range(n)))
+
+    start = time.perf_counter()
+    results = asyncio.run(run(16))
+
+    # One request takes ~0.25s; 16 serialized requests would take ~4s
+    assert time.perf_counter() - start < 1.0
+    assert all(r["response"] == "answer" and r["sources"] == ["url1"] for r in results)
+
+
+def test_agent_coalesces_identical_in_flight_queries_and_records_each_session():
+    from models.conversation import ConversationStore
+    from models.singleflight import SingleFlight
+
+    data = _data()
+    faiss_mgr = _faiss(data, AsyncSlowEmb([1.0, 0.0], delay=0.0))
+    llm = AsyncSlowLLM(delay=0.1)
+    conversations = ConversationStore()
+    agent = LangChainRAGAgent(data, faiss_mgr, llm, neighbors=0, folder="site",
+                              conversations=conversations, single_flight=SingleFlight())
+
+    async def run():
+        return await asyncio.gather(*(agent.aanswer(q, k=1, session_id=f"s{i}")
+                                      for i, q in enumerate(["Alpha ", "alpha", "ALPHA"])))
+
+    results = asyncio.run(run())
+
+    assert len(llm.prompts) == 1
+    assert [r.get("metrics", {}).get("coalesced") for r in results] == [None, True, True]
+    assert [r["query"] for r in results] == ["Alpha ", "alpha", "ALPHA"]
+    assert conversations.history("site", "s2") == [("ALPHA", "answer")]
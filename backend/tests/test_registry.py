@@ -0,0 +1,89 @@
+import pytest
+from models.registry import ModelRegistry
+
+
+class Blob:
+    def __init__(self, size):
+        self.size = size
+
+
+def _registry(max_bytes=100, sizes=None):
+    loaded = []
+
+    def loader(folder):
+        if folder not in (sizes or {}):
+            raise ValueError(folder)
+        loaded.append(folder)
+        return Blob(sizes[folder])
+
+    return ModelRegistry(loader=loader, sizer=lambda m: m.size, max_bytes=max_bytes), loaded
+
+
+def test_lru_eviction_under_budget_and_transparent_reload():
+    registry, loaded = _registry(max_bytes=100, sizes={"a": 40, "b": 40, "c": 40})
+    registry.get_or_load("a")
+    registry.get_or_load("b")
+    registry.get_or_load("a")
+    registry.get_or_load("c")
+
+    # "b" was the least recently used folder
+    assert registry.keys() == ["a", "c"]
+    assert registry.get("b") is None
+
+    registry.get_or_load("b")
+    assert loaded == ["a", "b", "c", "b"]
+    assert registry.stats()["evictions"] == 2
+    assert registry.stats()["hits"] == 1 and registry.stats()["misses"] == 4
+
+    with pytest.raises(ValueError):
+        registry.get_or_load("unknown")
+
+
+def test_resize_accounts_for_models_growing_in_place():
+    registry, _ = _registry(max_bytes=100)
+    registry["a"] = Blob(10)
+    registry["b"] = Blob(10)
+    assert registry.nbytes == 20
+
+    registry.get("a").size = 95
+    registry.resize("a")
+
+    # The most recently used model is kept even over budget
+    assert registry.keys() == ["a"]
+    assert registry.pop("a").size == 95
+    assert registry.nbytes == 0
+
+
+def test_concurrent_first_requests_share_one_load():
+    import threading
+    import time
+
+    calls = []
+
+    def loader(folder):
+        calls.append(folder)
+        time.sleep(0.1)
+        return Blob(1)
+
+    registry = ModelRegistry(loader=loader, sizer=lambda m: m.size, max_bytes=100)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get_or_load("a"))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert calls == ["a"]
+    assert len({id(r) for r in results}) == 1
+    assert registry.recent() == ["a"]
+
+
+def test_resident_lists_models_without_marking_them_used():
+    registry, _ = _registry(max_bytes=100)
+    registry["a"] = Blob(10)
+    registry["b"] = Blob(20)
+
+    assert [(folder, size) for folder, _, size in registry.resident()] == [("b", 20), ("a", 10)]
+    # "a" is still the least recently used one
+    registry["c"] = Blob(80)
+    assert registry.keys() == ["b", "c"]
@@ -0,0 +1,57 @@
+import asyncio
+import time
+import pytest
+from models.resilience import CircuitBreaker, LatencyTracker, hedged_call
+
+
+def test_circuit_opens_after_failures_then_half_opens(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("models.resilience.time.monotonic", lambda: now[0])
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout_s=10)
+
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    now[0] = 11
+    assert breaker.allow()
+    # Only one trial call while half-open
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    now[0] = 22
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_latency_percentile_needs_enough_samples():
+    tracker = LatencyTracker(min_samples=3)
+    tracker.record(1.0)
+    assert tracker.percentile(95) is None
+    tracker.record(2.0)
+    tracker.record(3.0)
+    assert 2.0 < tracker.percentile(95) <= 3.0
+
+
+def test_hedged_request_wins_over_slow_first_request():
+    delays = [1.0, 0.05]
+
+    async def request():
+        delay = delays.pop(0)
+        await asyncio.sleep(delay)
+        return delay
+
+    start = time.perf_counter()
+    assert asyncio.run(hedged_call(request, timeout=2.0, hedge_delay=0.05)) == 0.05
+    assert time.perf_counter() - start < 0.5
+
+
+def test_hedged_call_deadline():
+    async def request():
+        await asyncio.sleep(1.0)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(hedged_call(request, timeout=0.05))
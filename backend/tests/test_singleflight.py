@@ -0,0 +1,65 @@
+import asyncio
+import threading
+import time
+import pytest
+from models.singleflight import SingleFlight
+
+
+def test_concurrent_async_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    async def compute(value):
+        calls.append(value)
+        await asyncio.sleep(0.05)
+        return value
+
+    async def run():
+        return await asyncio.gather(
+            *(flight.ado("a", lambda: compute("a")) for _ in range(5)),
+            flight.ado("b", lambda: compute("b")),
+        )
+
+    results = asyncio.run(run())
+
+    assert calls == ["a", "b"]
+    assert [value for value, _ in results] == ["a"] * 5 + ["b"]
+    assert [shared for _, shared in results] == [False, True, True, True, True, False]
+    assert flight.stats() == {"executions": 2, "coalesced": 4, "in_flight": 0}
+
+
+def test_async_error_reaches_every_waiter():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def run():
+        return await asyncio.gather(*(flight.ado("a", fail) for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(r, ValueError) for r in asyncio.run(run()))
+
+
+def test_threads_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+    results = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.1)
+        return "value"
+
+    threads = [threading.Thread(target=lambda: results.append(flight.do("a", compute))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True]
+
+    with pytest.raises(KeyError):
+        flight.do("b", lambda: {}["missing"])
+    assert flight.stats()["in_flight"] == 0
@@ -36,6 +36,11 @@ const AdminCrawler: React.FC = () => {
             setCurrentStep(update.step);
         }
 
+        if (update.status === 'queued') {
+            setCurrentStep(update.step);
+            setValue(update.position);
+        }
+
         if (update.status === 'in_progress' && typeof update.value === 'number') {
             setValue(update.value);
         }
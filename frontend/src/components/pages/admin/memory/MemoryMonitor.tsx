@@ -3,6 +3,28 @@ import { LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip, Legend, Responsi
 import styles from './MemoryMonitor.module.scss';
 import { AdminService } from '../../../../services/AdminService';
 
+interface FolderMemory {
+  folder: string;
+  documents: number;
+  chunks: number;
+  metadata: number;
+  embeddings: number;
+  faiss_index: number;
+  bm25: number;
+  mapped: number;
+  cache: number;
+  conversations: number;
+  total: number;
+  accounted: number | null;
+}
+
+interface RegistryMemory {
+  models: number;
+  bytes: number;
+  max_bytes: number;
+  evictions: number;
+}
+
 interface MemoryStats {
   rss_GB: number;
   vms_GB: number;
@@ -11,9 +33,13 @@ interface MemoryStats {
   total_RAM_GB: number;
   used_RAM_GB: number;
   ram_percent: number;
+  registry?: RegistryMemory;
+  folders?: FolderMemory[];
   timestamp: string;
 }
 
+const formatMB = (bytes: number) => (bytes / (1024 ** 2)).toFixed(1);
+
 const MemoryMonitor = () => {
   const [stats, setStats] = useState<MemoryStats | null>(null);
   const [history, setHistory] = useState<MemoryStats[]>([]);
@@ -39,7 +65,9 @@ const MemoryMonitor = () => {
         
         setStats(dataWithTime);
         setHistory(prev => {
-          const newHistory = [...prev, dataWithTime];
+          // Per-folder details are only shown for the latest sample
+          const sample = { ...dataWithTime, folders: undefined, registry: undefined };
+          const newHistory = [...prev, sample];
           return newHistory.slice(-300); // Keep last 300
         });
       } catch (error) {
@@ -149,6 +177,52 @@ const MemoryMonitor = () => {
             </div>
           </div>
 
+          {stats.folders && stats.folders.length > 0 && (
+            <div className={`${styles.chartCard} ${styles.tenantCard}`}>
+              <h3>
+                Memory per tenant (MB)
+                {stats.registry && (
+                  <span className={styles.registry}>
+                    {' '}registry: {formatMB(stats.registry.bytes)} / {formatMB(stats.registry.max_bytes)} MB,
+                    {' '}{stats.registry.models} models, {stats.registry.evictions} evictions
+                  </span>
+                )}
+              </h3>
+              <table className={styles.tenantTable}>
+                <thead>
+                  <tr>
+                    <th>Folder</th>
+                    <th>Documents</th>
+                    <th>Chunks</th>
+                    <th>Embeddings</th>
+                    <th>FAISS index</th>
+                    <th>BM25</th>
+                    <th>Cache</th>
+                    <th>Conversations</th>
+                    <th>Total</th>
+                    <th>Mapped</th>
+                  </tr>
+                </thead>
+                <tbody>
+                  {[...stats.folders].sort((a, b) => b.total - a.total).map(f => (
+                    <tr key={f.folder}>
+                      <td>{f.folder}{f.accounted === null ? ' (default)' : ''}</td>
+                      <td>{formatMB(f.documents)}</td>
+                      <td>{formatMB(f.chunks + f.metadata)}</td>
+                      <td>{formatMB(f.embeddings)}</td>
+                      <td>{formatMB(f.faiss_index)}</td>
+                      <td>{formatMB(f.bm25)}</td>
+                      <td>{formatMB(f.cache)}</td>
+                      <td>{formatMB(f.conversations)}</td>
+                      <td>{formatMB(f.total)}</td>
+                      <td>{formatMB(f.mapped)}</td>
+                    </tr>
+                  ))}
+                </tbody>
+              </table>
+            </div>
+          )}
+
           <div className={styles.chartsGrid}>
             <div className={styles.chartCard}>
               <h3>Threads over time</h3>
@@ -22,6 +22,12 @@ const CustomChat: React.FC = () => {
   const [value, setValue] = useState<number | undefined>(0);
 
   const handleStep = useCallback((_stepLabel: string, update: PipelineProgressEvent) => {
+    if (update.status === 'queued') {
+      setCurrentStep(update.step);
+      setStatus('queued');
+      setValue(update.position);
+    }
+
 
     if (update.status === 'start') {
       setCurrentStep(update.step);
@@ -14,4 +14,9 @@ describe('PipelineProgess', () => {
     expect(screen.getByAltText(/Exploration du site/i)).toBeTruthy()
     expect(screen.getByText(/Exploration du site.*en cours/i)).toBeTruthy()
   })
+
+  it('shows the queue position while queued', () => {
+    render(<PipelineProgess currentStep="queue" status="queued" value={3} />)
+    expect(screen.getByText(/En file d'attente \(position 3\)/i)).toBeTruthy()
+  })
 })
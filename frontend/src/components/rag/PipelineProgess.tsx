@@ -28,6 +28,16 @@ export const PipelineProgess: React.FC<PipelineProgessProps> = ({ currentStep, s
     return <div className="alert alert-danger">Le pipeline a échoué.</div>;
   }
 
+  if (currentStep === "queue" && status === "queued") {
+    return (
+      <div className="d-flex align-items-center my-auto justify-content-center">
+        <div className="m-2 mt-5">
+          En file d'attente{typeof value === "number" ? ` (position ${value})` : ""}...
+        </div>
+      </div>
+    );
+  }
+
   // When status === 'start' we display the current step animation/label.
   if (currentStep in ICONS && status !== "failed") {
     const gifPath = `/icons/${currentStep}.gif`;
@@ -5,6 +5,22 @@ interface ChatRequestPayload {
   url: string;
   mode: string;
   max_depth?: number;
+  session_id?: string;
+}
+
+const SESSION_KEY = 'chat_session_id';
+
+// One conversation per browser tab: the backend keeps the history of each session separately
+function getSessionId(): string {
+  let sessionId = sessionStorage.getItem(SESSION_KEY);
+  if (!sessionId) {
+    sessionId =
+      typeof crypto !== 'undefined' && 'randomUUID' in crypto
+        ? crypto.randomUUID()
+        : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+    sessionStorage.setItem(SESSION_KEY, sessionId);
+  }
+  return sessionId;
 }
 
 export async function sendQueryToBackend(payload: ChatRequestPayload): Promise<ChatResponse> {
@@ -17,7 +33,7 @@ export async function sendQueryToBackend(payload: ChatRequestPayload): Promise<C
   const response = await fetch(backendUrl, {
     method: 'POST',
     headers: { 'Content-Type': 'application/json' },
-    body: JSON.stringify(payload),
+    body: JSON.stringify({ session_id: getSessionId(), ...payload }),
   });
 
   if (!response.ok) {
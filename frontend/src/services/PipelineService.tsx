@@ -1,7 +1,9 @@
 export interface PipelineProgressEvent {
-  step: "initializing" | "crawling" | "embedding" | "indexing" | "pipeline";
-  status: "start" | "done" | "failed" | "in_progress";
+  step: "queue" | "initializing" | "crawling" | "embedding" | "indexing" | "pipeline";
+  status: "queued" | "start" | "done" | "failed" | "in_progress";
   value?: number;
+  position?: number;
+  size?: number;
   message?: string;
   error?: string;
 }